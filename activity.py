@@ -0,0 +1,65 @@
+# activity.py (Per-chat / per-user message counters: memory mein ginti, periodic job se DB mein batch flush)
+#
+# Har message par DB write (purana message_count) bahut mehenga tha. Ab handler sirf do dict increments karta hai;
+# main.activity_flush_job har ACTIVITY_FLUSH_INTERVAL par pending counts ek batched upsert mein likhta hai.
+# Chat ka title aur last_activity bhi isi flush se update hote hain (register_chat sirf pehli baar chalta hai).
+# Flush fail ho toh counts wapas pending mein jud jaate hain (agli baar phir try).
+
+import os
+import time
+from collections import Counter
+
+ACTIVITY_FLUSH_INTERVAL = int(os.environ.get('ACTIVITY_FLUSH_INTERVAL', '60'))
+
+
+class ActivityCounters:
+    """Pending (abhi flush nahi hue) aur since-restart message counts."""
+
+    def __init__(self):
+        self.chats = Counter() # chat_id -> pending messages
+        self.users = Counter() # user_id -> pending messages
+        self.titles = {} # chat_id -> latest title (flush mein chat_data.title)
+        self.chat_totals = Counter() # chat_id -> restart ke baad se messages
+        self.total = 0
+        self.flushes = 0
+        self.last_flush = None
+
+    def record(self, chat_id, user_id, title=None):
+        self.chats[chat_id] += 1
+        if title is not None: self.titles[chat_id] = title
+        self.users[user_id] += 1
+        self.chat_totals[chat_id] += 1
+        self.total += 1
+
+    def drain(self):
+        """Pending counts nikal kar reset: (chats, users, titles). Khali ho toh (None, None, None)."""
+        if not self.chats and not self.users:
+            return None, None, None
+        chats, users, titles = self.chats, self.users, self.titles
+        self.chats, self.users, self.titles = Counter(), Counter(), {}
+        return chats, users, titles
+
+    def restore(self, chats, users, titles=None):
+        """Flush fail hua: counts wapas pending mein (beech mein aaye naye counts ke saath jud jaate hain)."""
+        self.chats.update(chats)
+        self.users.update(users)
+        for chat_id, title in (titles or {}).items():
+            self.titles.setdefault(chat_id, title) # Beech mein aaya naya title jeete
+
+    def forget_title(self, chat_id):
+        """Chat deactivate hua: pending counts flush hon, par yeh flush use dobara active na kare."""
+        self.titles.pop(chat_id, None)
+
+    def mark_flushed(self, now=None):
+        self.flushes += 1
+        self.last_flush = time.time() if now is None else now
+
+    def stats(self, top=3):
+        return {
+            'total': self.total,
+            'chats': len(self.chat_totals),
+            'pending_chats': len(self.chats),
+            'pending_users': len(self.users),
+            'last_flush': self.last_flush,
+            'top_chats': self.chat_totals.most_common(top),
+        }
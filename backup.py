@@ -0,0 +1,133 @@
+# backup.py (Scores aur chats ka streaming export/import: gzip CSV ya JSONL, constant memory)
+#
+# Usage:
+#   DATABASE_URL=postgres://... python backup.py export users users.csv.gz
+#   DATABASE_URL=postgres://... python backup.py export chats chats.jsonl.gz
+#   DATABASE_URL=postgres://new... python backup.py import users users.csv.gz --merge max   # ya --merge sum
+#
+# Format file ke naam se: .csv / .jsonl, aage .gz ho toh gzip. Postgres par rows COPY se seedhe file aur server ke beech
+# stream hoti hain; SQLite/memory par Python rows BACKUP_BATCH_SIZE ke batches mein. Dono taraf memory table size
+# par depend nahi karti. Import merge karta hai (storage.BACKUP_TABLES rules): scores/message counts 'max' ya 'sum',
+# naam import se, last_activity dono mein se naya. CSV ke columns export wale order mein hone chahiye (header ke saath).
+#
+# Owner commands /export aur /import (main.py) bhi yahi functions use karte hain.
+
+import argparse
+import csv
+import gzip
+import json
+import sys
+import time
+
+from storage import BACKUP_TABLES, MERGE_MODES
+
+TABLE_ALIASES = {'users': 'user_data', 'chats': 'chat_data'}
+FORMATS = ('csv', 'jsonl')
+
+
+def resolve_table(name):
+    table = TABLE_ALIASES.get(name, name)
+    if table not in BACKUP_TABLES:
+        raise ValueError(f"Unknown table '{name}' (use {', '.join(TABLE_ALIASES)})")
+    return table
+
+
+def file_format(path):
+    """'users.csv.gz' -> ('csv', True)."""
+    name = path[:-3] if path.endswith('.gz') else path
+    fmt = name.rsplit('.', 1)[-1]
+    if fmt not in FORMATS:
+        raise ValueError(f"Can't tell the format of '{path}' (use .csv, .jsonl, optionally .gz)")
+    return fmt, path.endswith('.gz')
+
+
+def open_backup(path, mode):
+    """Text mode file ('r'/'w'); .gz ho toh gzip stream (compresslevel 5: speed aur size ka balance)."""
+    _, compressed = file_format(path)
+    if compressed:
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='', compresslevel=5)
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def _coerce(rule, value):
+    """CSV/JSON value ko column ke type mein (CSV mein sab string aata hai, khali = NULL)."""
+    if value is None or value == '':
+        return None
+    if rule == 'key':
+        return str(value)
+    if rule == 'counter':
+        return int(float(value))
+    if rule == 'latest':
+        return float(value)
+    if rule == 'flag':
+        return value if isinstance(value, bool) else str(value).lower() in ('t', 'true', '1', 'yes')
+    return str(value)
+
+
+def write_rows(f, fmt, table, rows):
+    columns = list(BACKUP_TABLES[table])
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_rows(f, fmt, table):
+    """File se rows (BACKUP_TABLES column order mein tuples), ek-ek karke."""
+    rules = BACKUP_TABLES[table]
+    records = csv.DictReader(f) if fmt == 'csv' else (json.loads(line) for line in f if line.strip())
+    for record in records:
+        yield tuple(_coerce(rule, record.get(column)) for column, rule in rules.items())
+
+
+def export_table(store, table, path):
+    """Returns kitni rows likhi gayi."""
+    fmt, _ = file_format(path)
+    with open_backup(path, 'w') as f:
+        if hasattr(store, 'copy_table_out'):
+            return store.copy_table_out(table, f, fmt)
+        return write_rows(f, fmt, table, store.iter_table(table))
+
+
+def import_table(store, table, path, merge='max'):
+    """Returns kitni rows merge hui."""
+    if merge not in MERGE_MODES:
+        raise ValueError(f"Unknown merge mode '{merge}' (use {' or '.join(MERGE_MODES)})")
+    fmt, _ = file_format(path)
+    with open_backup(path, 'r') as f:
+        if hasattr(store, 'copy_table_in'):
+            return store.copy_table_in(table, f, fmt, merge)
+        return store.merge_table(table, read_rows(f, fmt, table), merge)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Stream user_data / chat_data to and from gzip CSV or JSONL files.")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("table", help="users or chats")
+    parser.add_argument("path", help="file.csv, file.jsonl (add .gz to compress)")
+    parser.add_argument("--merge", choices=MERGE_MODES, default="max", help="how imported scores/counts combine with existing rows (default max)")
+    args = parser.parse_args(argv)
+
+    import db_manager # DATABASE_URL yahin padha jaata hai
+    table = resolve_table(args.table)
+    started = time.perf_counter()
+    if args.action == "export":
+        rows = db_manager.export_backup(table, args.path)
+    else:
+        db_manager.setup_database() # Nayi DB mein pehle tables
+        rows = db_manager.import_backup(table, args.path, args.merge)
+    seconds = time.perf_counter() - started
+    print(f"{args.action}ed {rows} {table} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
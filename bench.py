@@ -0,0 +1,249 @@
+# bench.py (Micro-benchmarks: game logic aur text rendering ka per-message CPU cost)
+#
+# Usage:
+#   python bench.py                              # sab benchmarks, table output
+#   python bench.py --json bench_results.json    # machine-readable results save karo
+#   python bench.py --compare old.json           # purane results se compare, regression par exit 1
+#   python bench.py -k feedback                  # sirf naam mein 'feedback' wale benchmarks
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import activity
+import feedback_matrix
+import main
+import word_hustle
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# --- Benchmark cases ---
+# Har case ek setup function hai jo (fn, args) return karta hai; setup ka time measure nahi hota.
+
+WORDS = ["CRANE", "SLATE", "GREAT", "APPLE", "LLAMA", "EERIE", "SASSY", "PIZZA", "QUEUE", "MAMMA"]
+
+
+@benchmark("get_hustle_feedback")
+def bench_feedback():
+    rng = random.Random(1)
+    pairs = [(rng.choice(WORDS), rng.choice(WORDS)) for _ in range(100)]
+
+    def run(pairs):
+        for secret, guess in pairs:
+            main.get_hustle_feedback(secret, guess)
+    return run, (pairs,), 100
+
+
+@benchmark("create_game_board[history=10]")
+def bench_board_short():
+    history = [(w, main.get_hustle_feedback("CRANE", w)) for w in WORDS]
+    return main.create_game_board, (history,), 1
+
+
+@benchmark("create_game_board[history=500]")
+def bench_board_long():
+    rng = random.Random(2)
+    history = [(w, main.get_hustle_feedback("CRANE", w)) for w in (rng.choice(WORDS) for _ in range(500))]
+    return main.create_game_board, (history,), 1
+
+
+@benchmark("scramble_word[distinct]")
+def bench_scramble_distinct():
+    return word_hustle.scramble_word, ("elephant",), 1
+
+
+@benchmark("scramble_word[worst_case_retry]")
+def bench_scramble_worst():
+    # 'aaaab' ke sirf 5 alag arrangements hain, isliye har 5 mein se 1 shuffle retry hota hai
+    return word_hustle.scramble_word, ("aaaab",), 1
+
+
+@benchmark("scramble_word[all_same]")
+def bench_scramble_all_same():
+    # Pehle yeh case kabhi khatam nahi hota tha (har shuffle original jaisa)
+    return word_hustle.scramble_word, ("aaaaa",), 1
+
+
+def synthetic_words(count, length=5, seed=4):
+    """Dictionary file ke bina bhi chalne wale deterministic fake words."""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice("AEIOURSTLNCDMPBGHKWY") for _ in range(length)))
+    return sorted(words)
+
+
+@benchmark("feedback_matrix.batch_feedback[100x2000]")
+def bench_batch_feedback():
+    # Per item = ek (guess, answer) pair; get_hustle_feedback se seedha compare hota hai
+    words = synthetic_words(2000)
+    guesses, answers = feedback_matrix.encode_words(words[:100]), feedback_matrix.encode_words(words)
+    return feedback_matrix.batch_feedback, (guesses, answers), 100 * 2000
+
+
+@benchmark("hustle_hint[2000 words, 1 guess]")
+def bench_hint():
+    words = synthetic_words(2000)
+    engine = feedback_matrix.FeedbackEngine(words) # Build/mmap load setup mein, time nahi hota
+    history = [(words[7], main.get_hustle_feedback(words[1234], words[7]))]
+    return main.hustle_hint, (engine, history), 1
+
+
+@benchmark("activity.record")
+def bench_activity_record():
+    # Har group message par yahi chalta hai (DB write flush job mein)
+    counters = activity.ActivityCounters()
+    rng = random.Random(5)
+    messages = [(-rng.randrange(1000), rng.randrange(50000)) for _ in range(1000)]
+
+    def run(messages):
+        for chat_id, user_id in messages:
+            counters.record(chat_id, user_id)
+    return run, (messages,), 1000
+
+
+@benchmark("render_leaderboard_text")
+def bench_leaderboard():
+    rng = random.Random(3)
+    top_users = [(f"User <{i}> & co", rng.randint(1, 10000)) for i in range(10)]
+    return main.render_leaderboard_text, (top_users, 3, 10, 5000), 1
+
+
+@benchmark("parse_quiz_response")
+def bench_quiz_parse():
+    data = {
+        'response_code': 0,
+        'results': [{
+            'question': "Which of these is NOT a &quot;noble gas&quot; in the &#039;periodic table&#039;?",
+            'correct_answer': "Nitrogen &amp; friends",
+            'incorrect_answers': ["Ne&oacute;n", "Arg&ocirc;n", "Xen&#111;n"],
+        }]
+    }
+    return main.parse_quiz_response, (data,), 1
+
+
+# --- Runner ---
+
+def time_case(fn, args, min_time=0.2, repeats=7):
+    """timeit jaisa: pehle loops calibrate karo, phir `repeats` baar measure karke per-call time lo."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn(*args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        loops *= 2
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn(*args)
+        samples.append((time.perf_counter() - start) / loops)
+    return samples, loops
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(pattern=None, repeats=7, min_time=0.2):
+    random.seed(0) # scramble_word jaise cases reproducible rahein
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        fn, args, items = setup()
+        samples, loops = time_case(fn, args, min_time=min_time, repeats=repeats)
+        per_item = [sample / items for sample in samples]
+        results[name] = {
+            'mean': statistics.mean(per_item),
+            'median': statistics.median(per_item),
+            'stdev': statistics.stdev(per_item) if len(per_item) > 1 else 0.0,
+            'min': min(per_item),
+            'loops': loops,
+            'repeats': repeats,
+            'items_per_call': items,
+        }
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'revision': git_revision(),
+        'timestamp': time.time(),
+        'unit': 'seconds_per_item',
+        'benchmarks': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Median ke basis par compare karta hai. Returns regressions ki list."""
+    regressions = []
+    print(f"\n{'benchmark':40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, result in current['benchmarks'].items():
+        old = baseline.get('benchmarks', {}).get(name)
+        if not old:
+            print(f"{name:40} {'-':>12} {format_time(result['median']):>12} {'new':>9}")
+            continue
+        change = result['median'] / old['median'] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:40} {format_time(old['median']):>12} {format_time(result['median']):>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Game logic and rendering micro-benchmarks.")
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this file")
+    parser.add_argument("--compare", dest="baseline_path", help="compare against a previous --json file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before failing (default 0.10 = 10%%)")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="approx seconds per repeat")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.pattern, args.repeats, args.min_time)
+    print(f"{'benchmark':40} {'median':>12} {'stdev':>12} {'loops':>8}")
+    for name, result in results['benchmarks'].items():
+        print(f"{name:40} {format_time(result['median']):>12} {format_time(result['stdev']):>12} {result['loops']:>8}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline_path:
+        with open(args.baseline_path) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,85 @@
+# chat_settings.py (Per-chat configuration: quiz frequency, word length, hustle points, spam thresholds)
+#
+# Group admins /settings se apne chat ki values badal sakte hain. Spam limits aur hustle guess length har message par
+# chahiye, isliye har baar DB se padhna mehenga hota. Startup par chat_settings table poori memory mein aati hai
+# (sirf woh chats jinhone kuch badla hai, baaki defaults) aur lookup ek dict access hai - hot path par koi I/O nahi.
+# Badlav write-through hain: pehle DB, phir local copy; doosre workers cache_versions ('chat_settings') dekh kar
+# table dobara load karte hain (main.CACHE_INVALIDATORS).
+
+CHAT_SETTINGS_CACHE = 'chat_settings' # cache_versions mein naam
+
+# name -> (minimum, maximum, description). Sab values integers hain.
+SETTINGS = {
+    'quiz_cooldown': (60, 86400, "Seconds between quizzes"),
+    'word_length': (4, 8, "Word Hustle word length"),
+    'win_points': (1, 100, "Points for solving Word Hustle"),
+    'lose_points': (-50, 0, "Points for a wrong guess"),
+    'spam_limit': (2, 100, "Messages in the spam window before a block"),
+    'spam_window': (1, 300, "Spam window (seconds)"),
+    'spam_block': (60, 86400, "Spam block duration (seconds)"),
+}
+
+
+def parse_value(name, text):
+    """
+    '/settings win_points 10' ka value check karta hai; 'default' = None (override hatao).
+    Galat ho toh ValueError (user ko dikhane layak message).
+    """
+    if name not in SETTINGS:
+        raise ValueError(f"Unknown setting '{name}'. Available: {', '.join(SETTINGS)}")
+    if str(text).lower() == 'default':
+        return None
+    minimum, maximum, _ = SETTINGS[name]
+    try:
+        value = int(text)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number.") from None
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}.")
+    return value
+
+
+class ChatSettings:
+    """Defaults + per-chat overrides (chat_id int -> {name: value}); sirf memory, DB main.py likhta hai."""
+
+    def __init__(self, defaults):
+        self.defaults = dict(defaults)
+        self._overrides = {}
+
+    def __len__(self):
+        return len(self._overrides)
+
+    def load(self, rows):
+        """DB ki saari rows ({chat_id: {name: value}}) se cache poora badal deta hai. Hata diye gaye settings ignore."""
+        overrides = {}
+        for chat_id, settings in rows.items():
+            settings = {name: value for name, value in settings.items() if name in SETTINGS}
+            if settings: overrides[int(chat_id)] = settings
+        self._overrides = overrides
+
+    def get(self, chat_id, name):
+        overrides = self._overrides.get(chat_id)
+        if overrides and name in overrides:
+            return overrides[name]
+        return self.defaults[name]
+
+    def for_chat(self, chat_id):
+        return {**self.defaults, **self._overrides.get(chat_id, {})}
+
+    def overrides(self, chat_id):
+        return dict(self._overrides.get(chat_id, {}))
+
+    def changed(self, chat_id, name, value=None):
+        """Naye overrides (cache badle bina). value None ya default ke barabar = woh override hatao."""
+        overrides = self.overrides(chat_id)
+        if value is None or value == self.defaults[name]:
+            overrides.pop(name, None)
+        else:
+            overrides[name] = value
+        return overrides
+
+    def put(self, chat_id, overrides):
+        if overrides:
+            self._overrides[chat_id] = dict(overrides)
+        else:
+            self._overrides.pop(chat_id, None)
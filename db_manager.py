@@ -1,169 +1,210 @@
-# db_manager.py
+# db_manager.py (Bot ka ek hi data module: storage.py backend ke upar saare DB helpers)
 
-import psycopg2 
 import os
+import time
 import logging
-import json
-from urllib.parse import urlparse 
+
+import metrics
+import profiling
+import storage
 
 logger = logging.getLogger(__name__)
 
+# DB Keys
+LOCK_KEY = 'global_quiz_lock' # Legacy boolean lock (setup par delete)
+LAST_GLOBAL_QUIZ_KEY = 'last_global_quiz_time' # Legacy global cooldown; ab quiz_scheduler per-chat (setup par delete)
+LAST_QUIZ_MESSAGE_KEY = 'last_quiz_poll_ids' # Legacy (setup par delete)
+OPEN_QUIZZES_KEY = 'open_quizzes_polls' # Legacy blob, ab quiz_polls table mein (setup par migrate)
+HUSTLE_GAME_KEY = 'word_hustle_games' # Legacy blob, ab hustle_games table mein (setup par migrate)
+VIDEO_COUNTER_KEY = 'video_counter'
+PEXELS_CACHE_KEY = 'pexels_query_cache'
+FILE_ID_CACHE_KEY = 'telegram_file_id_cache'
+
+QUIZ_POLL_RETENTION = 24 * 3600 # Purane quiz polls itne time baad DB se hata do
+SCORE_DAY_OFFSET = 5 * 3600 + 1800 # Daily/weekly leaderboard IST midnight par badalta hai
+SCORE_DAILY_RETENTION_DAYS = 35 # score_daily rows itne din rakhte hain (weekly ko sirf 7 chahiye)
+LEADERBOARD_WINDOWS = {'daily': 1, 'weekly': 7} # window -> kitne din (aaj samet); 'all' = user_data.quiz_score
+DB_VERIFY_SCHEMA = os.environ.get('DB_VERIFY_SCHEMA', '').lower() in ('1', 'true', 'yes') # Version current ho tab bhi DDL chalao
+
 # --- DB Utility Functions ---
 
-def get_db_connection():
-    if not os.environ.get('DATABASE_URL'): raise ValueError("DATABASE_URL not set.")
-    try:
-        result = urlparse(os.environ.get('DATABASE_URL'))
-        conn = psycopg2.connect(
-            dbname=result.path[1:],
-            user=result.username,
-            password=result.password,
-            host=result.hostname,
-            port=result.port
-        )
-        return conn
-    except Exception as e:
-        logger.error(f"Failed to connect to database: {e}")
-        raise
 
-def setup_database():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("CREATE TABLE IF NOT EXISTS bot_data (key TEXT PRIMARY KEY, value JSONB);")
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS user_data (
-            user_id TEXT PRIMARY KEY, username TEXT, first_name TEXT,
-            quiz_score INTEGER DEFAULT 0,
-            spam_blocked_until FLOAT DEFAULT 0, spam_timestamps JSONB DEFAULT '[]'
-        );""")
-    cur.execute("CREATE TABLE IF NOT EXISTS chat_data (chat_id TEXT PRIMARY KEY, title TEXT, is_active BOOLEAN DEFAULT TRUE);")
-    conn.commit()
-    cur.close()
-    conn.close()
-    logger.info("Database tables verified/created successfully.")
-
-# --- Bot Data (Global Key/Value) ---
+_store = None
+
+def get_store():
+    """DATABASE_URL ke hisaab se storage backend (postgres://, sqlite:///, memory://) lazily banata hai."""
+    global _store
+    if _store is None:
+        database_url = os.environ.get('DATABASE_URL')
+        if not database_url: raise ValueError("DATABASE_URL not set.")
+        # Slow query log sirf Postgres cursor par lagta hai; baaki backends psycopg2 import hi nahi karte
+        profile_queries = profiling.PROFILING_ENABLED and database_url.startswith('postgres')
+        _store = storage.open_storage(database_url, cursor_factory=profiling.timed_cursor_class() if profile_queries else None)
+    return _store
 
+@metrics.track_db
+def setup_database():
+    """Schema version current ho toh sirf ek SELECT; DDL aur legacy migration tabhi jab schema badla ho."""
+    if get_store().setup(force=DB_VERIFY_SCHEMA):
+        migrate_legacy_game_state()
+    else:
+        logger.info(f"Database schema v{storage.SCHEMA_VERSION} is current, skipping DDL.")
+
+def migrate_legacy_game_state():
+    """Purane bot_data blobs (saare hustle games / open polls ek JSON mein) ko naye per-item tables mein le jaata hai."""
+    store = get_store()
+    legacy_games = store.get_value(HUSTLE_GAME_KEY)
+    if legacy_games is not None:
+        for chat_id, game in legacy_games.items():
+            if game.get('running'): store.save_hustle_game(chat_id, game)
+        store.delete_value(HUSTLE_GAME_KEY)
+        logger.info(f"Migrated {len(legacy_games)} hustle games out of bot_data.")
+    legacy_polls = store.get_value(OPEN_QUIZZES_KEY)
+    if legacy_polls is not None:
+        for poll_id, info in legacy_polls.items():
+            store.add_quiz_poll(poll_id, info['correct_option_id'])
+            for user_id in info.get('answered_users', []): store.mark_poll_answered(poll_id, user_id)
+        store.delete_value(OPEN_QUIZZES_KEY)
+        logger.info(f"Migrated {len(legacy_polls)} quiz polls out of bot_data.")
+    store.delete_value(LOCK_KEY) # Purana boolean lock
+    store.delete_value(LAST_GLOBAL_QUIZ_KEY)
+    store.delete_value(LAST_QUIZ_MESSAGE_KEY)
+
+@metrics.track_db
 def get_bot_value(key, default=None):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT value FROM bot_data WHERE key = %s", (key,))
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    return result[0] if result else default
+    return get_store().get_value(key, default)
 
+@metrics.track_db
 def set_bot_value(key, value):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO bot_data (key, value) VALUES (%s, %s) ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;", (key, json.dumps(value)))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-def check_and_set_bot_lock(key):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    conn.autocommit = False
-    try:
-        cur.execute("SELECT value FROM bot_data WHERE key = %s FOR UPDATE", (key,))
-        result = cur.fetchone()
-        is_locked = result[0] if result else False
-        if is_locked:
-            conn.commit()
-            return False
-        cur.execute("INSERT INTO bot_data (key, value) VALUES (%s, %s) ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;", (key, json.dumps(True)))
-        conn.commit()
-        return True
-    except Exception as e:
-        logger.error(f"Error in check_and_set_bot_lock: {e}")
-        conn.rollback()
-        return False
-    finally:
-        conn.autocommit = True
-        cur.close()
-        conn.close()
-
-# --- User Data (Score/Spam) ---
-
-def get_spam_data(user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT spam_blocked_until, spam_timestamps FROM user_data WHERE user_id = %s", (str(user_id),))
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    return (result[0], result[1]) if result else (0, [])
-
-def set_spam_data(user_id, blocked_until, timestamps):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO user_data (user_id, spam_blocked_until, spam_timestamps) VALUES (%s, %s, %s) ON CONFLICT (user_id) DO UPDATE SET spam_blocked_until = EXCLUDED.spam_blocked_until, spam_timestamps = EXCLUDED.spam_timestamps;", (str(user_id), blocked_until, json.dumps(timestamps)))
-    conn.commit()
-    cur.close()
-    conn.close()
+    get_store().set_value(key, value)
+
+@metrics.track_db
+def get_spam_data(chat_id, user_id):
+    return get_store().get_spam(chat_id, user_id)
 
+@metrics.track_db
+def set_spam_data(chat_id, user_id, blocked_until):
+    get_store().set_spam(chat_id, user_id, blocked_until)
+
+@metrics.track_db
 def get_user_score(user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT quiz_score FROM user_data WHERE user_id = %s", (str(user_id),))
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    return result[0] if result else 0
+    return get_store().get_score(user_id)
 
+@metrics.track_db
 def set_user_score(user_id, score, first_name=None, username=None):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    # Updated to ensure user record exists or is created on score update
-    if first_name and username:
-        cur.execute("INSERT INTO user_data (user_id, quiz_score, first_name, username) VALUES (%s, %s, %s, %s) ON CONFLICT (user_id) DO UPDATE SET quiz_score = EXCLUDED.quiz_score, first_name = EXCLUDED.first_name, username = EXCLUDED.username;", (str(user_id), score, first_name, username))
-    else:
-        cur.execute("INSERT INTO user_data (user_id, quiz_score) VALUES (%s, %s) ON CONFLICT (user_id) DO UPDATE SET quiz_score = EXCLUDED.quiz_score;", (str(user_id), score))
-    conn.commit()
-    cur.close()
-    conn.close()
+    get_store().set_score(user_id, score, first_name=first_name, username=username)
+
+def score_day(timestamp=None, days_ago=0):
+    """Leaderboard day (IST) 'YYYY-MM-DD' format mein."""
+    timestamp = time.time() if timestamp is None else timestamp
+    return time.strftime('%Y-%m-%d', time.gmtime(timestamp + SCORE_DAY_OFFSET - days_ago * 86400))
+
+@metrics.track_db
+def add_user_score(user_id, delta, first_name=None, username=None, reason=None):
+    """
+    Score mein points jodta/ghatata hai (0 se neeche nahi) aur naya score deta hai - ek hi query mein.
+    reason ('quiz', 'hustle_win', ...) ho toh score_events log mein bhi event judta hai.
+    """
+    return get_store().add_score(user_id, delta, first_name=first_name, username=username, reason=reason, day=score_day() if reason else None)
+
+@metrics.track_db
+def get_leaderboard_data_quiz_only(page=0, per_page=10):
+    return get_store().get_leaderboard(page, per_page)
 
-# --- Leaderboard Data (NEW: Quiz Score only) ---
+@metrics.track_db
+def get_window_leaderboard(window, page=0, per_page=10):
+    """'daily'/'weekly' score_daily rollups se; 'all' (ya anjaan window) all-time quiz_score se."""
+    if window not in LEADERBOARD_WINDOWS:
+        return get_store().get_leaderboard(page, per_page)
+    return get_store().get_window_leaderboard(score_day(days_ago=LEADERBOARD_WINDOWS[window] - 1), page, per_page)
 
-def get_leaderboard_data_quiz_only(page=0, per_page=10):
-    offset = page * per_page
-    conn = get_db_connection()
-    cur = conn.cursor()
-    # Only sort by quiz_score
-    cur.execute("SELECT first_name, quiz_score FROM user_data WHERE quiz_score > 0 ORDER BY quiz_score DESC LIMIT %s OFFSET %s", (per_page, offset))
-    top_users = cur.fetchall()
-    cur.execute("SELECT COUNT(*) FROM user_data WHERE quiz_score > 0")
-    total_users = cur.fetchone()[0]
-    cur.close()
-    conn.close()
-    return top_users, total_users
-
-# --- Chat Data ---
+@metrics.track_db
+def rollup_score_events():
+    """Raw score events ko per-day totals mein jodta hai aur purane events/days hata deta hai."""
+    return get_store().rollup_score_events(time.time(), score_day(days_ago=SCORE_DAILY_RETENTION_DAYS))
+
+@metrics.track_db
+def get_user_score_and_rank(user_id):
+    return get_store().get_score_and_rank(user_id)
 
+@metrics.track_db
 def register_chat(update):
     chat = update.effective_chat
-    if chat.type not in ['group', 'supergroup']: return
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO chat_data (chat_id, title, is_active) VALUES (%s, %s, TRUE) ON CONFLICT (chat_id) DO UPDATE SET title = EXCLUDED.title, is_active = TRUE;", (str(chat.id), chat.title))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-def get_all_active_chat_ids():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT chat_id FROM chat_data WHERE is_active = TRUE")
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
-    return [int(row[0]) for row in results]
+    if not chat or chat.type not in ['group', 'supergroup']: return
+    get_store().register_chat(chat.id, chat.title)
+
+@metrics.track_db
+def get_all_active_chat_ids(active_since=None):
+    """Sabse recent activity wale chats pehle; active_since (timestamp) ho toh sirf uske baad active chats."""
+    return get_store().get_active_chat_ids(active_since)
 
+@metrics.track_db
 def deactivate_chat_in_db(chat_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE chat_data SET is_active = FALSE WHERE chat_id = %s", (str(chat_id),))
-    conn.commit()
-    cur.close()
-    conn.close()
+    get_store().deactivate_chat(chat_id)
+
+@metrics.track_db
+def flush_message_counts(chat_counts, user_counts, titles=None):
+    get_store().add_message_counts(chat_counts, user_counts, seen_at=time.time(), titles=titles)
+
+@metrics.track_db
+def export_backup(table, path):
+    import backup # Sirf /export ya CLI par chahiye
+    return backup.export_table(get_store(), table, path)
+
+@metrics.track_db
+def import_backup(table, path, merge='max'):
+    import backup
+    return backup.import_table(get_store(), table, path, merge)
+
+@metrics.track_db
+def load_hustle_game(chat_id):
+    return get_store().get_hustle_game(chat_id)
+
+@metrics.track_db
+def store_hustle_game(chat_id, game):
+    get_store().save_hustle_game(chat_id, game)
+
+@metrics.track_db
+def remove_hustle_game(chat_id):
+    get_store().delete_hustle_game(chat_id)
+
+@metrics.track_db
+def count_hustle_games():
+    return get_store().count_hustle_games()
+
+@metrics.track_db
+def load_chat_settings():
+    return get_store().get_all_chat_settings()
+
+@metrics.track_db
+def store_chat_settings(chat_id, settings):
+    get_store().save_chat_settings(chat_id, settings)
+
+@metrics.track_db
+def add_quiz_poll(poll_id, correct_option_id):
+    get_store().add_quiz_poll(poll_id, correct_option_id)
+
+@metrics.track_db
+def get_quiz_poll(poll_id):
+    return get_store().get_quiz_poll(poll_id)
+
+@metrics.track_db
+def mark_poll_answered(poll_id, user_id):
+    return get_store().mark_poll_answered(poll_id, user_id)
+
+@metrics.track_db
+def count_quiz_polls():
+    return get_store().count_quiz_polls()
+
+@metrics.track_db
+def prune_quiz_polls():
+    """Band ho chuke polls (open_period 10 min) ko QUIZ_POLL_RETENTION ke baad hata deta hai."""
+    return get_store().prune_quiz_polls(time.time() - QUIZ_POLL_RETENTION)
+
+@metrics.track_db
+def bump_cache_version(name):
+    return get_store().bump_version(name)
+
+@metrics.track_db
+def get_cache_versions():
+    return get_store().get_versions()
@@ -0,0 +1,39 @@
+# dedup.py (Webhook redelivery se aaye duplicate update_ids pehchaanne ke liye)
+
+import threading
+import time
+from collections import OrderedDict
+
+DEDUP_WINDOW = 600 # Telegram retries isse kaafi pehle ho jaate hain
+DEDUP_MAX_IDS = 100000 # Memory ki upper limit
+
+
+class RecentIds:
+    """Pichle `ttl` seconds mein dekhe gaye ids ka bounded set (insertion order = time order)."""
+
+    def __init__(self, ttl=DEDUP_WINDOW, max_size=DEDUP_MAX_IDS):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._seen = OrderedDict() # id -> first seen timestamp
+        self._lock = threading.Lock()
+
+    def seen(self, item_id, now=None):
+        """True agar id window mein pehle aa chuka hai; warna use record karke False."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._seen:
+                oldest_id, first_seen = next(iter(self._seen.items()))
+                if now - first_seen < self.ttl and len(self._seen) < self.max_size:
+                    break
+                del self._seen[oldest_id]
+            if item_id in self._seen:
+                return True
+            self._seen[item_id] = now
+            return False
+
+    def forget(self, item_id):
+        with self._lock:
+            self._seen.pop(item_id, None)
+
+    def __len__(self):
+        return len(self._seen)
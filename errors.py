@@ -0,0 +1,89 @@
+# errors.py (Sampled error reporting: exceptions ko fingerprint karke gino, full dump sirf pehle kuch ka)
+#
+# DB outage jaise time par ek hi exception hazaaron updates par aata hai. Har baar poora update JSON,
+# chat_data aur traceback log karna (aur har chat ko reply bhejna) outage ko aur bada bana deta hai.
+# - Fingerprint = exception type + hamare code ki sabse andar wali frame (file:function:line).
+# - Har fingerprint ke sirf pehle ERROR_SAMPLES_PER_WINDOW exceptions ka full payload log hota hai per window.
+# - Chat ko "something went wrong" reply ERROR_REPLY_INTERVAL mein ek hi baar.
+# - Owner ko digest() ka summary periodic job se jaata hai.
+
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+ERROR_SAMPLE_WINDOW = int(os.environ.get('ERROR_SAMPLE_WINDOW', '300'))
+ERROR_SAMPLES_PER_WINDOW = int(os.environ.get('ERROR_SAMPLES_PER_WINDOW', '3'))
+ERROR_REPLY_INTERVAL = 300 # Ek chat ko error reply itne seconds mein ek hi baar
+ERROR_DIGEST_INTERVAL = int(os.environ.get('ERROR_DIGEST_INTERVAL', '3600'))
+MAX_FINGERPRINTS = 500 # Naye fingerprints ki upper limit (sabse purane hat jaate hain)
+MAX_REPLY_CHATS = 10000
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def fingerprint(error):
+    """'TypeName@file.py:function:line' - hamari files ki sabse andar wali frame; na mile toh aakhri frame."""
+    frames = traceback.extract_tb(error.__traceback__) if error.__traceback__ else []
+    ours = [frame for frame in frames if os.path.abspath(frame.filename).startswith(_PROJECT_DIR) and 'site-packages' not in frame.filename]
+    frame = (ours or frames or [None])[-1]
+    location = f"{os.path.basename(frame.filename)}:{frame.name}:{frame.lineno}" if frame else "unknown"
+    return f"{type(error).__name__}@{location}"
+
+
+class ErrorAggregator:
+    """Fingerprint wise counts, per-window sampling aur per-chat reply rate limit."""
+
+    def __init__(self, window=ERROR_SAMPLE_WINDOW, samples=ERROR_SAMPLES_PER_WINDOW, reply_interval=ERROR_REPLY_INTERVAL):
+        self.window = window
+        self.samples = samples
+        self.reply_interval = reply_interval
+        self._lock = threading.Lock()
+        self._stats = OrderedDict() # fingerprint -> {'window_start', 'window_count', 'since_digest', 'total', 'last_message'}
+        self._last_reply = OrderedDict() # chat_id -> last reply timestamp
+
+    def record(self, error, now=None):
+        """Exception ko gin kar (fingerprint, window_count, should_dump) return karta hai."""
+        now = time.time() if now is None else now
+        key = fingerprint(error)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {'window_start': now, 'window_count': 0, 'since_digest': 0, 'total': 0, 'last_message': ''}
+                while len(self._stats) > MAX_FINGERPRINTS:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(key)
+            if now - stats['window_start'] >= self.window:
+                stats['window_start'], stats['window_count'] = now, 0
+            stats['window_count'] += 1
+            stats['since_digest'] += 1
+            stats['total'] += 1
+            stats['last_message'] = str(error)[:200]
+            return key, stats['window_count'], stats['window_count'] <= self.samples
+
+    def should_reply(self, chat_id, now=None):
+        """Chat ko is window mein error reply ja sakta hai ya nahi (haan ho toh time record bhi karta hai)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            last = self._last_reply.get(chat_id)
+            if last is not None and now - last < self.reply_interval:
+                return False
+            self._last_reply[chat_id] = now
+            self._last_reply.move_to_end(chat_id)
+            while len(self._last_reply) > MAX_REPLY_CHATS:
+                self._last_reply.popitem(last=False)
+            return True
+
+    def digest(self, limit=15):
+        """
+        Pichle digest ke baad aaye errors: ([(fingerprint, count, total, last_message)], total_count).
+        Sabse zyada wale pehle; since-digest counters reset ho jaate hain.
+        """
+        with self._lock:
+            rows = [(key, s['since_digest'], s['total'], s['last_message']) for key, s in self._stats.items() if s['since_digest']]
+            for s in self._stats.values():
+                s['since_digest'] = 0
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:limit], sum(row[1] for row in rows)
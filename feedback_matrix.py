@@ -0,0 +1,187 @@
+# feedback_matrix.py (Word Hustle ka vectorized feedback engine: guess x answer pattern matrix, NumPy memmap)
+#
+# Pattern = base-3 number: position i ka digit 0 (🟥), 1 (🟨) ya 2 (🟩), position 0 sabse chhota digit.
+# 5 letters ke 3^5 = 243 patterns hain, isliye matrix uint8 hai (5000 words = 25 MB).
+# matrix[g, a] = guess g ka feedback jab secret a ho. Matrix ek baar banti hai, FEEDBACK_CACHE_DIR mein
+# .npy file ban kar save hoti hai, aur agli baar (aur baaki workers mein) mmap se lagbhag free load hoti hai.
+#
+# Isi se /hint (bache hue candidates mein sabse achha next guess), secret words ka difficulty score
+# aur benchmarks ka batch feedback chalta hai.
+
+import hashlib
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_CACHE_DIR = os.environ.get('FEEDBACK_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'hustle_feedback'))
+CHUNK_CELLS = 2_000_000 # Ek baar mein itne (guess, answer) pairs; build ki peak memory ~ 26x itne bytes
+HINT_SAMPLE_ANSWERS = 500 # Hint ke liye itne candidates par partition estimate kaafi hai
+HINT_MAX_CELLS = 2_500_000 # Hint ka kaam isse zyada cells ka na ho (milliseconds mein rahe)
+EMOJI = ('🟥', '🟨', '🟩')
+
+
+def pattern_dtype(length):
+    return np.uint8 if 3 ** length <= 256 else np.uint16 if 3 ** length <= 65536 else np.uint32
+
+
+def encode_words(words):
+    """Words (same length, A-Z) -> (N, L) letter codes 0-25."""
+    length = len(words[0]) if words else 0
+    return (np.frombuffer("".join(words).encode('ascii'), dtype=np.uint8).reshape(len(words), length) - ord('A')).astype(np.intp)
+
+
+def feedback_to_pattern(feedback):
+    """'🟩🟨🟥..' -> pattern number."""
+    return sum(EMOJI.index(symbol) * 3 ** i for i, symbol in enumerate(feedback))
+
+
+def pattern_to_feedback(pattern, length):
+    return "".join(EMOJI[(int(pattern) // 3 ** i) % 3] for i in range(length))
+
+
+def batch_feedback(guess_codes, answer_codes, out=None):
+    """
+    Har (guess, answer) pair ka pattern: (G, L) x (A, L) -> (G, A).
+    get_hustle_feedback jaisa hi rule: pehle greens, phir bache letters ki ginti se left-to-right yellows.
+    """
+    guess_count, length = guess_codes.shape
+    answer_count = answer_codes.shape[0]
+    if out is None:
+        out = np.empty((guess_count, answer_count), dtype=pattern_dtype(length))
+    answer_onehot = np.eye(26, dtype=np.int8)[answer_codes] # (A, L, 26)
+    chunk = max(1, CHUNK_CELLS // max(1, answer_count))
+    cols = np.arange(answer_count)[None, :]
+    for start in range(0, guess_count, chunk):
+        guesses = guess_codes[start:start + chunk]
+        rows = np.arange(len(guesses))[:, None]
+        green = guesses[:, None, :] == answer_codes[None, :, :] # (c, A, L)
+        # Secret ke jo letters green nahi hue unki ginti (c, A, 26); yellows inhi mein se bante hain
+        remaining = np.zeros((len(guesses), answer_count, 26), dtype=np.int8)
+        for j in range(length):
+            remaining += answer_onehot[None, :, j, :] * ~green[:, :, j, None]
+        pattern = np.zeros((len(guesses), answer_count), dtype=np.int32)
+        for i in range(length):
+            letter = guesses[:, i, None]
+            yellow = ~green[:, :, i] & (remaining[rows, cols, letter] > 0)
+            remaining[rows, cols, letter] -= yellow
+            pattern += (2 * green[:, :, i] + yellow) * 3 ** i
+        out[start:start + len(guesses)] = pattern
+    return out
+
+
+class FeedbackEngine:
+    """Ek word length ki dictionary ke upar precomputed feedback matrix."""
+
+    def __init__(self, words, cache_dir=FEEDBACK_CACHE_DIR):
+        self.words = tuple(words)
+        self.length = len(self.words[0])
+        self.index = {word: i for i, word in enumerate(self.words)}
+        self.codes = encode_words(self.words)
+        self.patterns = 3 ** self.length
+        digits = (np.arange(self.patterns)[:, None] // 3 ** np.arange(self.length)) % 3
+        self.greens = (digits == 2).sum(axis=1) # pattern -> kitne 🟩
+        self.matrix = self._load_or_build(cache_dir)
+        self._opener = None
+        self._difficulty_raw = None
+        self._difficulty_sorted = None
+
+    def _load_or_build(self, cache_dir):
+        digest = hashlib.sha1("\n".join(self.words).encode()).hexdigest()[:12]
+        path = os.path.join(cache_dir, f"feedback_{self.length}_{len(self.words)}_{digest}.npy")
+        if os.path.exists(path):
+            return np.load(path, mmap_mode='r')
+        shape = (len(self.words), len(self.words))
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=pattern_dtype(self.length), shape=shape)
+            batch_feedback(self.codes, self.codes, out=matrix)
+            matrix.flush()
+            del matrix
+            os.replace(tmp_path, path) # Atomic: doosra worker aadhi likhi file kabhi nahi padhega
+            logger.info(f"Built {shape[0]}x{shape[1]} feedback matrix at {path}.")
+            return np.load(path, mmap_mode='r')
+        except OSError as e:
+            logger.warning(f"Feedback matrix cache unavailable ({e}), keeping it in memory.")
+            return batch_feedback(self.codes, self.codes)
+
+    def feedback_row(self, guess):
+        """Guess ka har dictionary answer ke saath pattern (guess dictionary mein na ho tab bhi)."""
+        i = self.index.get(guess)
+        if i is not None:
+            return self.matrix[i]
+        return batch_feedback(encode_words([guess]), self.codes)[0]
+
+    def candidates(self, history):
+        """History [(guess, feedback_emojis)] se consistent dictionary answers ke indexes."""
+        mask = np.ones(len(self.words), dtype=bool)
+        for guess, feedback in history:
+            mask &= self.feedback_row(guess.upper()) == feedback_to_pattern(feedback)
+        return np.flatnonzero(mask)
+
+    def _expected_remaining(self, guess_rows, answer_cols):
+        """Har guess row ke liye sum(partition size^2) - jitna chhota, utna achha split."""
+        scores = np.empty(len(guess_rows), dtype=np.int64)
+        chunk = max(1, CHUNK_CELLS // max(1, len(answer_cols)))
+        for start in range(0, len(guess_rows), chunk):
+            rows = guess_rows[start:start + chunk]
+            sub = np.asarray(self.matrix[np.ix_(rows, answer_cols)], dtype=np.int64)
+            flat = (sub + np.arange(len(rows))[:, None] * self.patterns).ravel()
+            counts = np.bincount(flat, minlength=len(rows) * self.patterns).reshape(len(rows), self.patterns)
+            scores[start:start + len(rows)] = (counts * counts).sum(axis=1)
+        return scores
+
+    def best_guess(self, candidates):
+        """Bache candidates ko sabse achhe se baantne wala guess (barabari par candidate word, jo jeet bhi sakta hai)."""
+        if len(candidates) <= 2:
+            best = self.words[candidates[0]]
+            if len(candidates) == len(self.words):
+                self._opener = best # Chhoti dictionary: difficulty() ko bhi opener chahiye
+            return best
+        if len(candidates) == len(self.words) and self._opener is not None:
+            return self._opener
+        answer_cols = candidates
+        if len(answer_cols) > HINT_SAMPLE_ANSWERS:
+            answer_cols = answer_cols[np.linspace(0, len(answer_cols) - 1, HINT_SAMPLE_ANSWERS).astype(np.intp)]
+        guess_rows = np.arange(len(self.words))
+        if len(guess_rows) * len(answer_cols) > HINT_MAX_CELLS:
+            guess_rows = candidates[np.linspace(0, len(candidates) - 1, min(len(candidates), HINT_MAX_CELLS // len(answer_cols))).astype(np.intp)]
+        scores = self._expected_remaining(guess_rows, answer_cols) * 2
+        scores[np.isin(guess_rows, candidates)] -= 1
+        best = self.words[int(guess_rows[np.argmin(scores)])]
+        if len(candidates) == len(self.words):
+            self._opener = best
+        return best
+
+    def _raw_difficulty(self, opener_row, near_misses):
+        # Opener ke baad kitne words bachte hain + kitne "ek letter ke fark" wale jaal (jaise _IGHT)
+        return np.log2(np.maximum(opener_row, 1)) + np.log2(1 + near_misses)
+
+    def _difficulties(self):
+        if self._difficulty_raw is None:
+            opener_row = np.asarray(self.feedback_row(self.best_guess(np.arange(len(self.words)))))
+            partition = np.bincount(opener_row, minlength=self.patterns)[opener_row]
+            near_misses = np.empty(len(self.words), dtype=np.int64)
+            chunk = max(1, CHUNK_CELLS // len(self.words))
+            for start in range(0, len(self.words), chunk):
+                near_misses[start:start + chunk] = (self.greens[self.matrix[start:start + chunk]] >= self.length - 1).sum(axis=1) - 1
+            self._difficulty_raw = self._raw_difficulty(partition, near_misses)
+            self._difficulty_sorted = np.sort(self._difficulty_raw)
+        return self._difficulty_raw
+
+    def difficulty(self, word):
+        """0-100 difficulty score (dictionary ke baaki words ke muqable percentile)."""
+        raw_scores = self._difficulties()
+        i = self.index.get(word)
+        if i is not None:
+            raw = raw_scores[i]
+        else:
+            opener_row = np.asarray(self.feedback_row(self._opener))
+            own = batch_feedback(encode_words([self._opener]), encode_words([word]))[0, 0]
+            near_misses = int((self.greens[self.feedback_row(word)] >= self.length - 1).sum())
+            raw = self._raw_difficulty(int((opener_row == own).sum()) + 1, near_misses)
+        return min(100, int(100 * np.searchsorted(self._difficulty_sorted, raw, side='left') / max(1, len(self.words) - 1)))
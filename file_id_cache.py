@@ -0,0 +1,100 @@
+# file_id_cache.py (Source URL/prompt -> Telegram file_id, taaki same media dobara upload/download na ho)
+#
+# URL keys content-addressed hain (wahi URL = wahi media), isliye hamesha rehte hain (sirf LRU size bound).
+# Prompt keys ka jawab "us waqt generate hua image" hai: unhe caller ka ttl milta hai (stable_horde.RESULT_CACHE_TTL),
+# warna ek baar poochha gaya prompt hamesha wahi image deta rehta.
+
+import logging
+import time
+from collections import OrderedDict
+
+import telegram
+
+logger = logging.getLogger(__name__)
+
+FILE_ID_CACHE_SIZE = 2000
+
+_cache = OrderedDict() # key -> file_id
+_expires = {} # key -> expires_at (sirf ttl wale keys)
+cache_dirty = False
+
+
+def url_key(url):
+    return f"url:{url}"
+
+
+def prompt_key(prompt):
+    return f"gen:{' '.join(prompt.lower().split())}"
+
+
+def get_file_id(key):
+    file_id = _cache.get(key)
+    if file_id and key in _expires and _expires[key] <= time.time():
+        forget(key)
+        return None
+    if file_id:
+        _cache.move_to_end(key)
+    return file_id
+
+
+def _store(key, file_id, expires_at=None):
+    _cache[key] = file_id
+    _cache.move_to_end(key)
+    if expires_at is None:
+        _expires.pop(key, None)
+    else:
+        _expires[key] = expires_at
+    while len(_cache) > FILE_ID_CACHE_SIZE:
+        _expires.pop(_cache.popitem(last=False)[0], None)
+
+
+def remember(key, message, ttl=None):
+    """Bheje gaye photo message ka file_id cache mein rakhta hai (ttl diya ho toh itne seconds tak)."""
+    global cache_dirty
+    if not message or not message.photo:
+        return
+    _store(key, message.photo[-1].file_id, time.time() + ttl if ttl else None)
+    cache_dirty = True
+
+
+def forget(key):
+    global cache_dirty
+    _expires.pop(key, None)
+    if _cache.pop(key, None):
+        cache_dirty = True
+
+
+async def reply_photo_cached(reply_to, key, source, ttl=None, **kwargs):
+    """
+    Cached file_id mile toh usse photo bhejta hai, warna source (URL) se bhej kar
+    naya file_id yaad rakhta hai (ttl: remember dekho).
+    """
+    file_id = get_file_id(key)
+    if file_id:
+        try:
+            return await reply_to.reply_photo(file_id, **kwargs)
+        except telegram.error.BadRequest as e:
+            logger.warning(f"Cached file_id for {key} rejected ({e}), re-sending from source.")
+            forget(key)
+    if source is None:
+        return None
+    sent = await reply_to.reply_photo(source, **kwargs)
+    remember(key, sent, ttl)
+    return sent
+
+
+def export_cache():
+    """{key: file_id}; ttl wale keys {key: [file_id, expires_at]} (restart ke baad bhi wahi expiry)."""
+    global cache_dirty
+    cache_dirty = False
+    return {key: [file_id, _expires[key]] if key in _expires else file_id for key, file_id in _cache.items()}
+
+
+def load_cache(data):
+    now = time.time()
+    for key, value in (data or {}).items():
+        if isinstance(value, list):
+            if value[1] > now: _store(key, value[0], value[1])
+        elif not key.startswith('gen:'): # Purane format ke prompt keys bina expiry ke the, unhe chhod do
+            _store(key, value)
+    logger.info(f"Loaded {len(_cache)} cached Telegram file_ids.")
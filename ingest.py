@@ -0,0 +1,139 @@
+# ingest.py (Webhook aur handlers ke beech bounded, per-chat fair ingestion stage)
+#
+# PTB har update ke liye ek task banata hai; yeh processor decide karta hai ki kaunsa update kab chale:
+# - Ek waqt mein zyada se zyada INGEST_MAX_CONCURRENT updates chalte hain.
+# - Baaki chats ke hisaab se round-robin mein wait karte hain, taaki ek bade group ka flood
+#   doosre chats ko na roke. Ek chat ke zyada se zyada INGEST_PER_CHAT updates saath chalte hain.
+# - Queue INGEST_QUEUE_SIZE par bhar jaaye toh naye updates drop hote hain. INGEST_SHED_AT se upar
+#   low-value updates (jaise aam chatter) pehle hi drop ho jaate hain.
+
+import asyncio
+import logging
+import os
+from collections import deque
+
+from telegram.ext import BaseUpdateProcessor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+INGEST_MAX_CONCURRENT = int(os.environ.get('INGEST_MAX_CONCURRENT', '64'))
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', '1000'))
+INGEST_PER_CHAT = int(os.environ.get('INGEST_PER_CHAT', '4'))
+INGEST_SHED_AT = float(os.environ.get('INGEST_SHED_AT', '0.5')) # Queue ka itna hissa bharne par low-value shedding
+
+
+def update_key(update):
+    """Fairness ka unit: chat, aur bina chat wale updates (poll answers) ke liye user."""
+    chat = getattr(update, 'effective_chat', None)
+    if chat:
+        return chat.id
+    user = getattr(update, 'effective_user', None)
+    return user.id if user else None
+
+
+class FairUpdateProcessor(BaseUpdateProcessor):
+    """
+    Bounded queue + per-chat round-robin + per-chat concurrency cap + load shedding.
+    is_low_value(update) batata hai ki queue bharne par kaunse updates pehle chhode ja sakte hain.
+    """
+
+    __slots__ = ("max_running", "max_queue", "per_chat", "shed_threshold", "is_low_value",
+                 "_waiting", "_ring", "_in_ring", "_chat_running", "_running", "_pending")
+
+    def __init__(self, max_running=INGEST_MAX_CONCURRENT, max_queue=INGEST_QUEUE_SIZE,
+                 per_chat=INGEST_PER_CHAT, shed_at=INGEST_SHED_AT, is_low_value=None):
+        # PTB ka apna semaphore kabhi rukna nahi chahiye; asli limit neeche _dispatch lagata hai
+        super().__init__(max_running + max_queue + 1)
+        self.max_running = max_running
+        self.max_queue = max_queue
+        self.per_chat = per_chat
+        self.shed_threshold = int(max_queue * shed_at)
+        self.is_low_value = is_low_value
+        self._waiting = {} # chat key -> deque of futures
+        self._ring = deque() # Round-robin: jin chats ke updates wait kar rahe hain aur cap ke neeche hain
+        self._in_ring = set()
+        self._chat_running = {}
+        self._running = 0
+        self._pending = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self):
+        return {'pending': self._pending, 'running': self._running, 'chats_waiting': len(self._waiting)}
+
+    def _shed_reason(self, update):
+        if self._pending >= self.max_queue:
+            return 'queue_full'
+        if self._pending >= self.shed_threshold and self.is_low_value and self.is_low_value(update):
+            return 'low_value'
+        return None
+
+    def _mark_ready(self, key):
+        if key not in self._in_ring and self._waiting.get(key) and self._chat_running.get(key, 0) < self.per_chat:
+            self._ring.append(key)
+            self._in_ring.add(key)
+
+    def _dispatch(self):
+        while self._running < self.max_running and self._ring:
+            key = self._ring.popleft()
+            self._in_ring.discard(key)
+            waiters = self._waiting.get(key)
+            while waiters and waiters[0].cancelled():
+                waiters.popleft() # Task cancel ho chuka (shutdown), slot dene ki zaroorat nahi
+                self._pending -= 1
+            if not waiters:
+                self._waiting.pop(key, None)
+                continue
+            waiter = waiters.popleft()
+            if not waiters:
+                del self._waiting[key]
+            self._pending -= 1
+            self._running += 1
+            self._chat_running[key] = self._chat_running.get(key, 0) + 1
+            waiter.set_result(None)
+            self._mark_ready(key) # Is chat ke aur updates round-robin line ke peeche lagte hain
+
+    def _finish(self, key):
+        self._running -= 1
+        self._chat_running[key] -= 1
+        if not self._chat_running[key]:
+            del self._chat_running[key]
+        self._mark_ready(key)
+        self._dispatch()
+
+    async def do_process_update(self, update, coroutine):
+        reason = self._shed_reason(update)
+        if reason:
+            coroutine.close()
+            metrics.UPDATES_SHED.inc(reason)
+            logger.warning(f"Shedding update {getattr(update, 'update_id', '?')} ({reason}, {self._pending} pending).")
+            return
+
+        key = update_key(update)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(key, deque()).append(waiter)
+        self._pending += 1
+        self._mark_ready(key)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            coroutine.close()
+            if not waiter.cancelled():
+                self._finish(key) # Slot mil chuka tha
+            elif waiter in self._waiting.get(key, ()):
+                self._waiting[key].remove(waiter)
+                if not self._waiting[key]:
+                    del self._waiting[key]
+                self._pending -= 1
+            raise
+        try:
+            await coroutine
+        finally:
+            self._finish(key)
@@ -1,5 +1,8 @@
 # main.py (Monolithic Bot: Game-focused, Quiz Polls, Advanced Word Hustle V8 - FINAL)
 
+import time
+_BOOT_STARTED = time.perf_counter() # Startup timing report ka zero point (imports se pehle)
+
 import telegram
 from telegram import Update, constants, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -9,42 +12,81 @@ from telegram.ext import (
     MessageHandler, 
     filters, 
     CallbackQueryHandler,
-    PollAnswerHandler
+    PollAnswerHandler,
+    TypeHandler,
+    ApplicationHandlerStop
 )
-from telegram.helpers import escape_markdown
-import requests
 import random
 import os
 import asyncio 
 import html 
-from datetime import datetime, timezone 
+import io
+from datetime import datetime, timezone, timedelta
 import logging 
 import traceback
 import json
-import time 
 import uuid 
-import psycopg2 
-from urllib.parse import urlparse 
-from collections import Counter # Wordle ke liye naya import
-import pytz # Timezone ke liye
+import copy
+import tempfile
+from collections import Counter, OrderedDict # Wordle ke liye naya import
+import sys
+import urllib.parse
+import activity
+import chat_settings
+import file_id_cache
+import metrics
+import profiling
+import quiz_scheduler
+import snapshot
+import storage
+import wordlist
+import workers
+from db_manager import (
+    VIDEO_COUNTER_KEY, PEXELS_CACHE_KEY, FILE_ID_CACHE_KEY,
+    get_store, setup_database, get_bot_value, set_bot_value,
+    get_spam_data, set_spam_data, get_user_score, add_user_score,
+    get_window_leaderboard, rollup_score_events, get_user_score_and_rank,
+    register_chat, get_all_active_chat_ids, deactivate_chat_in_db, flush_message_counts,
+    load_hustle_game, store_hustle_game, remove_hustle_game, count_hustle_games, load_chat_settings, store_chat_settings,
+    add_quiz_poll, get_quiz_poll, mark_poll_answered, count_quiz_polls, prune_quiz_polls,
+    bump_cache_version, get_cache_versions, export_backup, import_backup
+)
+import dedup
+import errors
+import ingest
+from telegram.request import HTTPXRequest
+
+# --- ⏱️ Startup Timing ---
+# Cold start mein har phase kitna time leta hai; report webhook bind hone ke baad ek baar log hoti hai
+_boot_phases = [] # (phase, seconds)
+_boot_mark = _BOOT_STARTED
+
+def mark_boot_phase(name):
+    """Pichle mark se ab tak ka time `name` phase ke naam record karta hai."""
+    global _boot_mark
+    now = time.perf_counter()
+    _boot_phases.append((name, now - _boot_mark))
+    _boot_mark = now
+
+async def boot_report_job(context: ContextTypes.DEFAULT_TYPE):
+    mark_boot_phase('webhook' if context.application.updater else 'start')
+    phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in _boot_phases)
+    logger.info(f"Startup timing: {phases} (total {(_boot_mark - _BOOT_STARTED) * 1000:.0f}ms)")
+
+mark_boot_phase('imports')
 
 # --- ⚙️ Constants and Setup ---
-GLOBAL_QUIZ_COOLDOWN = 600 # 10 minute (600s) global cooldown
-QUIZ_BROADCAST_DELAY = 7 # 💡 NAYA: 7 second delay
-IST = pytz.timezone('Asia/Kolkata') # Indian Standard Time
-
-# DB Keys
-LOCK_KEY = 'global_quiz_lock' 
-LAST_GLOBAL_QUIZ_KEY = 'last_global_quiz_time'
-LAST_QUIZ_MESSAGE_KEY = 'last_quiz_poll_ids' 
-OPEN_QUIZZES_KEY = 'open_quizzes_polls' 
-VIDEO_COUNTER_KEY = 'video_counter'
+QUIZ_TICK_INTERVAL = 5 # Scheduler itne seconds mein due chats check karta hai
+QUIZ_SENDS_PER_MINUTE = 30 # Per worker; backlog ho toh polls time mein phail jaate hain (burst nahi)
+QUIZ_PRUNE_INTERVAL = 600 # Purane quiz_polls rows itne seconds mein ek baar saaf
+IST = timezone(timedelta(hours=5, minutes=30), 'IST') # Indian Standard Time (fixed offset, DST nahi hota)
 
 # --- 💡 Word Hustle (Wordle-style) Constants ---
-HUSTLE_GAME_KEY = 'word_hustle_games' # Global key for all games
 HUSTLE_WORD_LENGTH = 5
 HUSTLE_WIN_POINTS = 5
 HUSTLE_LOSE_POINTS = -1 # Har galat guess par point katega
+# Intro ka example guess, chat ki word_length ke hisaab se (chat_settings.SETTINGS mein 4-8 allowed)
+HUSTLE_EXAMPLE_WORDS = {4: 'GAME', 5: 'GREAT', 6: 'PLANET', 7: 'JOURNEY', 8: 'QUESTION'}
 
 # Environment Variables (baaki sab same)
 WELCOME_VIDEO_URLS = [
@@ -60,178 +102,182 @@ STABLE_HORDE_API_KEY = os.environ.get('STABLE_HORDE_API_KEY', '0000000000')
 START_PHOTO_ID = os.environ.get('START_PHOTO_ID') 
 ABOUT_PHOTO_ID = os.environ.get('ABOUT_PHOTO_ID') 
 DATABASE_URL = os.environ.get('DATABASE_URL')
+PEXELS_CACHE_PERSIST = os.environ.get('PEXELS_CACHE_PERSIST', '').lower() in ('1', 'true', 'yes')
+MEDIA_CACHE_SAVE_INTERVAL = 600
+BROADCAST_ACTIVE_DAYS = 30 # Itne din se chup chats "dormant" hain; /broadcast unhe sirf --all par bhejta hai
+BROADCAST_DELAY = 0.2
+BROADCAST_DORMANT_DELAY = 1.0 # Dormant chats ko dheere (rate budget pehle active chats par)
+SCORE_ROLLUP_INTERVAL = 60 # score_events -> score_daily; daily/weekly ranking itna hi peeche rehti hai
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9090')) # 0 = /metrics disabled
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_COLLECT_INTERVAL = 15 # State/queue gauges itne seconds mein event loop par update; /metrics scrape sirf padhta hai
 SPAM_MESSAGE_LIMIT = 5 
 SPAM_TIME_WINDOW = 5 
 SPAM_BLOCK_DURATION = 1200
 
+# --- 🗂️ Per-worker State ---
+# Ek chat ke saare updates hamesha isi process mein aate hain (single process, ya workers.py ki chat_id sharding),
+# isliye hustle games aur spam window memory mein rehte hain; DB sirf write-through persistence hai.
+HUSTLE_CACHE_SIZE = 10000
+SPAM_CACHE_SIZE = 50000
+CACHE_SYNC_INTERVAL = 5 # Multi-worker mode mein cache_versions itne seconds mein check hote hain
+_hustle_games = OrderedDict() # chat_id -> game dict, ya None (DB mein game nahi hai)
+_spam_state = OrderedDict() # (chat_id, user_id) -> [blocked_until, timestamps]; spam har chat mein alag (chat sharding)
+# Per-chat /settings (defaults upar wale constants); lookup sirf dict access, table post_init mein load hoti hai
+chat_config = chat_settings.ChatSettings({
+    'quiz_cooldown': quiz_scheduler.QUIZ_CHAT_COOLDOWN, 'word_length': HUSTLE_WORD_LENGTH,
+    'win_points': HUSTLE_WIN_POINTS, 'lose_points': HUSTLE_LOSE_POINTS,
+    'spam_limit': SPAM_MESSAGE_LIMIT, 'spam_window': SPAM_TIME_WINDOW, 'spam_block': SPAM_BLOCK_DURATION,
+})
+quiz_schedule = quiz_scheduler.QuizScheduler(cooldown_for=lambda chat_id: chat_config.get(chat_id, 'quiz_cooldown')) # Har chat ka next quiz due time (heap)
+_last_quiz_prune = 0
+_cache_versions = {} # name -> last seen version
+_recent_updates = dedup.RecentIds() # Webhook redelivery wale update_ids
+_update_processor = None # build_application set karta hai (queue depth metrics ke liye)
+error_reports = errors.ErrorAggregator()
+chat_activity = activity.ActivityCounters() # Message counts, activity_flush_job DB mein likhta hai
+_registered_chats = set() # Is process mein register_chat ho chuke chats; aage title/last_activity flush job likhta hai
+
+# --- 👋 Welcome Batching ---
+WELCOME_BATCH_WINDOW = 5 # Itne seconds ke joins ek message mein
+WELCOME_MIN_INTERVAL = 30 # Ek chat mein do welcome messages ke beech kam se kam itna gap
+WELCOME_MAX_MENTIONS = 15 # Caption limit (1024 chars) ke andar rehne ke liye
+WELCOME_CACHE_SIZE = 10000 # _last_welcome_sent LRU; purani entries WELCOME_MIN_INTERVAL ke baad kaam ki nahi
+VIDEO_COUNTER_CHECKPOINT_EVERY = 10
+_video_counter = None # DB se pehli baar lazily load hota hai
+_video_counter_saved = None
+_pending_welcomes = {} # chat_id -> {'mentions': [...], 'chat_name': ..., 'task': ...}
+_last_welcome_sent = OrderedDict() # chat_id -> timestamp (LRU)
+
 # ======================================================================
-# --- 💾 DATABASE FUNCTIONS (Unchanged) ---
+# --- 🗂️ PER-WORKER STATE (hustle games, spam window, shared cache invalidation) ---
 # ======================================================================
 
-def get_db_connection():
-    if not os.environ.get('DATABASE_URL'): raise ValueError("DATABASE_URL not set.")
-    try:
-        result = urlparse(os.environ.get('DATABASE_URL'))
-        conn = psycopg2.connect(
-            dbname=result.path[1:],
-            user=result.username,
-            password=result.password,
-            host=result.hostname,
-            port=result.port
-        )
-        return conn
-    except Exception as e:
-        logger.error(f"Failed to connect to database: {e}")
-        raise
+def _remember(cache, key, value, max_size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+def get_hustle_game(chat_id):
+    """Chat ka game memory se (pehli baar DB se). Caller ko copy milti hai; badlav save_hustle_game se."""
+    chat_id = str(chat_id)
+    if chat_id in _hustle_games:
+        _hustle_games.move_to_end(chat_id)
+    else:
+        _remember(_hustle_games, chat_id, load_hustle_game(chat_id), HUSTLE_CACHE_SIZE)
+    game = _hustle_games[chat_id]
+    return copy.deepcopy(game) if game else None
 
-def setup_database():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("CREATE TABLE IF NOT EXISTS bot_data (key TEXT PRIMARY KEY, value JSONB);")
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS user_data (
-            user_id TEXT PRIMARY KEY, username TEXT, first_name TEXT,
-            quiz_score INTEGER DEFAULT 0,
-            spam_blocked_until FLOAT DEFAULT 0, spam_timestamps JSONB DEFAULT '[]'
-        );""")
-    cur.execute("CREATE TABLE IF NOT EXISTS chat_data (chat_id TEXT PRIMARY KEY, title TEXT, is_active BOOLEAN DEFAULT TRUE);")
-    conn.commit()
-    cur.close()
-    conn.close()
-    logger.info("Database tables verified/created successfully.")
-
-def get_bot_value(key, default=None):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT value FROM bot_data WHERE key = %s", (key,))
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    return result[0] if result else default
-
-def set_bot_value(key, value):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO bot_data (key, value) VALUES (%s, %s) ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;", (key, json.dumps(value)))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-def check_and_set_bot_lock(key):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    conn.autocommit = False
-    try:
-        cur.execute("SELECT value FROM bot_data WHERE key = %s FOR UPDATE", (key,))
-        result = cur.fetchone()
-        is_locked = result[0] if result else False
-        if is_locked:
-            conn.commit()
-            return False
-        cur.execute("INSERT INTO bot_data (key, value) VALUES (%s, %s) ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;", (key, json.dumps(True)))
-        conn.commit()
-        return True
-    except Exception as e:
-        logger.error(f"Error in check_and_set_bot_lock: {e}")
-        conn.rollback()
-        return False
-    finally:
-        conn.autocommit = True
-        cur.close()
-        conn.close()
-
-def get_spam_data(user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT spam_blocked_until, spam_timestamps FROM user_data WHERE user_id = %s", (str(user_id),))
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    return (result[0], result[1]) if result else (0, [])
-
-def set_spam_data(user_id, blocked_until, timestamps):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO user_data (user_id, spam_blocked_until, spam_timestamps) VALUES (%s, %s, %s) ON CONFLICT (user_id) DO UPDATE SET spam_blocked_until = EXCLUDED.spam_blocked_until, spam_timestamps = EXCLUDED.spam_timestamps;", (str(user_id), blocked_until, json.dumps(timestamps)))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-def get_user_score(user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT quiz_score FROM user_data WHERE user_id = %s", (str(user_id),))
-    result = cur.fetchone()
-    cur.close()
-    conn.close()
-    return result[0] if result else 0
-
-def set_user_score(user_id, score, first_name=None, username=None):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    if first_name and username:
-        cur.execute("INSERT INTO user_data (user_id, quiz_score, first_name, username) VALUES (%s, %s, %s, %s) ON CONFLICT (user_id) DO UPDATE SET quiz_score = EXCLUDED.quiz_score, first_name = EXCLUDED.first_name, username = EXCLUDED.username;", (str(user_id), score, first_name, username))
+def save_hustle_game(chat_id, game):
+    store_hustle_game(chat_id, game)
+    _remember(_hustle_games, str(chat_id), copy.deepcopy(game), HUSTLE_CACHE_SIZE)
+
+def delete_hustle_game(chat_id):
+    remove_hustle_game(chat_id)
+    _remember(_hustle_games, str(chat_id), None, HUSTLE_CACHE_SIZE)
+
+def record_message_for_spam(chat_id, user_id, current_time, limit=SPAM_MESSAGE_LIMIT, window=SPAM_TIME_WINDOW, block=SPAM_BLOCK_DURATION):
+    """
+    Is chat mein user ki spam sliding window update karta hai. Returns (is_blocked, just_blocked).
+    Window aur block per chat hain: chat hamesha isi worker par aata hai, isliye state poori yahin hai.
+    Window memory mein rehti hai; DB mein sirf naya block likha jaata hai (restart ke baad bhi lage rahe).
+    limit/window/block us chat ki settings se aate hain.
+    """
+    key = (chat_id, user_id)
+    state = _spam_state.get(key)
+    if state is None:
+        state = [get_spam_data(chat_id, user_id), []]
+        _remember(_spam_state, key, state, SPAM_CACHE_SIZE)
     else:
-        cur.execute("INSERT INTO user_data (user_id, quiz_score) VALUES (%s, %s) ON CONFLICT (user_id) DO UPDATE SET quiz_score = EXCLUDED.quiz_score;", (str(user_id), score))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-def get_leaderboard_data_quiz_only(page=0, per_page=10):
-    offset = page * per_page
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT first_name, quiz_score FROM user_data WHERE quiz_score > 0 ORDER BY quiz_score DESC LIMIT %s OFFSET %s", (per_page, offset))
-    top_users = cur.fetchall()
-    cur.execute("SELECT COUNT(*) FROM user_data WHERE quiz_score > 0")
-    total_users = cur.fetchone()[0]
-    cur.close()
-    conn.close()
-    return top_users, total_users
-
-def register_chat(update):
-    chat = update.effective_chat
-    if not chat or chat.type not in ['group', 'supergroup']: return
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO chat_data (chat_id, title, is_active) VALUES (%s, %s, TRUE) ON CONFLICT (chat_id) DO UPDATE SET title = EXCLUDED.title, is_active = TRUE;", (str(chat.id), chat.title))
-    conn.commit()
-    cur.close()
-    conn.close()
-
-def get_all_active_chat_ids():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT chat_id FROM chat_data WHERE is_active = TRUE")
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
-    return [int(row[0]) for row in results]
-
-def deactivate_chat_in_db(chat_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE chat_data SET is_active = FALSE WHERE chat_id = %s", (str(chat_id),))
-    conn.commit()
-    cur.close()
-    conn.close()
+        _spam_state.move_to_end(key)
+
+    if current_time < state[0]: return True, False
+    timestamps = [t for t in state[1] if t > current_time - window]
+    timestamps.append(current_time)
+    if len(timestamps) >= limit:
+        state[0], state[1] = current_time + block, []
+        set_spam_data(chat_id, user_id, state[0])
+        return True, True
+    state[1] = timestamps
+    return False, False
+
+def snapshot_file():
+    worker_index = os.environ.get('BOT_WORKER_INDEX')
+    return snapshot.snapshot_path(worker_index, workers.WORKER_COUNT)
+
+def build_snapshot():
+    """Warm restart ke liye hot state: hustle games (LRU order), spam windows aur quiz scheduler."""
+    return {
+        'hustle_games': list(_hustle_games.items()),
+        'spam': [[chat_id, user_id, state[0], state[1]] for (chat_id, user_id), state in _spam_state.items()],
+        'quiz_schedule': quiz_schedule.export_state(),
+    }
+
+def restore_snapshot(state):
+    for chat_id, game in state.get('hustle_games', []):
+        _remember(_hustle_games, chat_id, game, HUSTLE_CACHE_SIZE)
+    for chat_id, user_id, blocked_until, timestamps in state.get('spam', []):
+        _remember(_spam_state, (chat_id, user_id), [blocked_until, timestamps], SPAM_CACHE_SIZE)
+    quiz_schedule.load_state(state.get('quiz_schedule', {}))
+    logger.info(f"Warm start: restored {len(_hustle_games)} hustle games, {len(_spam_state)} spam windows, {len(quiz_schedule)} scheduled quizzes.")
+
+def save_snapshot():
+    size = snapshot.write_snapshot(build_snapshot(), snapshot_file())
+    if size is not None: logger.info(f"Wrote state snapshot ({size} bytes).")
+
+def reload_chat_settings():
+    chat_config.load(load_chat_settings())
+
+def update_chat_settings(chat_id, overrides):
+    """Write-through: pehle DB (fail ho toh cache purana hi rehta hai), phir local cache, phir doosre workers ko khabar."""
+    store_chat_settings(chat_id, overrides)
+    chat_config.put(chat_id, overrides)
+    invalidate_shared_cache(chat_settings.CHAT_SETTINGS_CACHE)
+
+# Doosre worker ne cache badla ho toh yeh callbacks local copy hata dete hain
+CACHE_INVALIDATORS = {chat_settings.CHAT_SETTINGS_CACHE: reload_chat_settings}
+
+def invalidate_shared_cache(name):
+    if workers.WORKER_COUNT > 1:
+        _cache_versions[name] = bump_cache_version(name) # Apna bump dobara invalidate na kare
+
+async def sync_cache_versions_job(context: ContextTypes.DEFAULT_TYPE):
+    """Multi-worker mode: ek query mein saare versions, jo badle unki local copy invalidate."""
+    for name, version in get_cache_versions().items():
+        seen = _cache_versions.get(name)
+        _cache_versions[name] = version
+        if seen is not None and seen != version and name in CACHE_INVALIDATORS:
+            CACHE_INVALIDATORS[name]()
+
+async def drop_duplicate_updates(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Sabse pehle chalne wala handler (group -1). Slow handler ki wajah se Telegram webhook dobara bheje toh
+    wahi guess/answer do baar score na ho: dekha hua update_id yahin rok diya jaata hai.
+    """
+    if _recent_updates.seen(update.update_id):
+        metrics.DUPLICATE_UPDATES.inc('worker')
+        logger.info(f"Dropping duplicate update {update.update_id} (webhook redelivery).")
+        raise ApplicationHandlerStop
 
 # ======================================================================
 # --- 🔠 WORD HUSTLE (WORDLE-STYLE) GAME LOGIC (UPDATED) ---
 # ======================================================================
 
-async def fetch_hustle_word_from_api():
-    """API se ek 5-letter word fetch karta hai."""
+async def fetch_hustle_word_from_api(length=HUSTLE_WORD_LENGTH):
+    """API se ek `length`-letter word fetch karta hai."""
     try:
-        url = f"https://random-word-api.herokuapp.com/word?length={HUSTLE_WORD_LENGTH}&number=1"
-        response = requests.get(url, timeout=5)
+        url = f"https://random-word-api.herokuapp.com/word?length={length}&number=1"
+        import requests # Lazy: sirf game start par chahiye, boot par nahi
+        with metrics.track_http(url):
+            response = requests.get(url, timeout=5)
         response.raise_for_status()
         word = response.json()[0].upper() # Return upper directly
-        if len(word) == HUSTLE_WORD_LENGTH and word.isalpha():
+        if len(word) == length and word.isalpha():
             return word
         else:
             logger.warning(f"API returned a non-alpha or wrong length word: {word}. Retrying...")
-            return await fetch_hustle_word_from_api() # Retry
+            return await fetch_hustle_word_from_api(length) # Retry
     except Exception as e:
         logger.error(f"Error fetching random word from API: {e}")
         return None
@@ -245,17 +291,18 @@ def get_hustle_feedback(secret_word: str, guess: str) -> str:
     YELLOW = '🟨'
     RED = '🟥' # Black se Red
     
-    result_array = [None] * HUSTLE_WORD_LENGTH
+    word_length = len(secret_word) # Chat ki word_length setting ke hisaab se alag ho sakti hai
+    result_array = [None] * word_length
     secret_counts = Counter(secret_word)
     
     # Step 1: Green
-    for i in range(HUSTLE_WORD_LENGTH):
+    for i in range(word_length):
         if guess[i] == secret_word[i]:
             result_array[i] = GREEN
             secret_counts[guess[i]] -= 1
 
     # Step 2: Yellow and Red
-    for i in range(HUSTLE_WORD_LENGTH):
+    for i in range(word_length):
         if result_array[i] is None: 
             if secret_counts.get(guess[i], 0) > 0:
                 result_array[i] = YELLOW
@@ -265,6 +312,41 @@ def get_hustle_feedback(secret_word: str, guess: str) -> str:
                 
     return "".join(result_array)
 
+# --- 💡 Word Hustle Hints (feedback matrix engine) ---
+_feedback_engine_task = None
+
+def _load_feedback_engine():
+    words = wordlist.load_words(HUSTLE_WORD_LENGTH)
+    if not words:
+        logger.warning("No Word Hustle dictionary found (set HUSTLE_WORDLIST), hints disabled.")
+        return None
+    try:
+        import feedback_matrix # NumPy import startup par mehenga hai, isliye engine thread mein hi
+        return feedback_matrix.FeedbackEngine(words)
+    except Exception as e:
+        logger.warning(f"Feedback engine unavailable, hints disabled: {e}")
+        return None
+
+def start_feedback_engine():
+    """Engine ko background thread mein load/build karna shuru karta hai (ek hi baar)."""
+    global _feedback_engine_task
+    if _feedback_engine_task is None:
+        _feedback_engine_task = asyncio.ensure_future(asyncio.to_thread(_load_feedback_engine))
+    return _feedback_engine_task
+
+async def get_feedback_engine():
+    return await start_feedback_engine()
+
+def feedback_engine_if_ready():
+    """Engine ready ho toh engine, warna None (aur load shuru) - game start iske liye wait nahi karta."""
+    task = start_feedback_engine()
+    return task.result() if task.done() else None
+
+def hustle_hint(engine, guesses_history):
+    """(bache candidates ki ginti, best next guess ya None)."""
+    candidates = engine.candidates(guesses_history)
+    return len(candidates), (engine.best_guess(candidates) if len(candidates) else None)
+
 def create_game_board(guesses_history: list) -> str:
     """History se formatted game board HTML <pre> tag ke liye banata hai."""
     board_text = ""
@@ -276,16 +358,17 @@ def create_game_board(guesses_history: list) -> str:
 async def start_hustle_game(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """/hustle command handler."""
     chat_id_str = str(update.effective_chat.id)
-    active_games = get_bot_value(HUSTLE_GAME_KEY, {})
+    game = get_hustle_game(chat_id_str)
     
-    if active_games.get(chat_id_str, {}).get('running', False):
+    if game and game.get('running', False):
         await update.message.reply_text(
             "⏳ <b>Word Hustle</b> pehle se hi chal raha hai! Word guess karo ya <code>/stophustle</code> se khatam karo.", 
             parse_mode=constants.ParseMode.HTML
         )
         return
 
-    secret_word = await fetch_hustle_word_from_api()
+    settings = chat_config.for_chat(update.effective_chat.id)
+    secret_word = await fetch_hustle_word_from_api(settings['word_length'])
     
     if not secret_word:
         await update.message.reply_text(
@@ -294,26 +377,32 @@ async def start_hustle_game(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return
 
-    active_games[chat_id_str] = {
+    game = {
         'word': secret_word,
         'running': True,
         'guesses': [] 
     }
-    set_bot_value(HUSTLE_GAME_KEY, active_games)
+    engine = feedback_engine_if_ready() if len(secret_word) == HUSTLE_WORD_LENGTH else None # Dictionary sirf default length ki hai
+    if engine:
+        game['difficulty'] = await asyncio.to_thread(engine.difficulty, secret_word)
+    save_hustle_game(chat_id_str, game)
+    difficulty_line = f"📊 Difficulty: <b>{game['difficulty']}/100</b>\n" if 'difficulty' in game else ""
     
     # 💡 Naya "Sundar" Interface
     intro_message = (
         "<b>🎲 Word Hustle START!</b>\n\n"
-        f"Ek {HUSTLE_WORD_LENGTH} letters ka shabdh chuna gaya hai. \n"
-        f"Aapke paas <b>UNLIMITED</b> attempts hain.\n\n"
+        f"Ek {len(secret_word)} letters ka shabdh chuna gaya hai. \n"
+        f"Aapke paas <b>UNLIMITED</b> attempts hain.\n"
+        f"{difficulty_line}\n"
         "<b>RULES:</b>\n"
-        "✅ Sahi guess: <b>+5 Points</b>\n"
-        "❌ Galat guess: <b>-1 Point</b> (Score 0 se kam nahi hoga)\n\n"
+        f"✅ Sahi guess: <b>+{settings['win_points']} Points</b>\n"
+        f"❌ Galat guess: <b>{settings['lose_points']} Point</b> (Score 0 se kam nahi hoga)\n\n"
         "<b>FEEDBACK:</b>\n"
         "🟩: Letter sahi jagah par hai.\n"
         "🟨: Letter shabdh mein hai, lekin galat jagah par hai.\n"
         "🟥: Letter shabdh mein nahi hai.\n\n"
-        f"Ab apna pehla {HUSTLE_WORD_LENGTH} letter ka shabdh bhejo! (Example: <code>GREAT</code>)"
+        f"Ab apna pehla {len(secret_word)} letter ka shabdh bhejo! (Example: <code>{HUSTLE_EXAMPLE_WORDS.get(len(secret_word), 'GREAT')}</code>)\n"
+        "Atak gaye? <code>/hint</code> se agla achha guess pucho."
     )
     
     await update.message.reply_text(intro_message, parse_mode=constants.ParseMode.HTML)
@@ -321,17 +410,14 @@ async def start_hustle_game(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def stop_hustle_game(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """/stophustle - Game end karne ke liye"""
     chat_id_str = str(update.effective_chat.id)
-    active_games = get_bot_value(HUSTLE_GAME_KEY, {})
+    game = get_hustle_game(chat_id_str)
     
-    if not active_games.get(chat_id_str, {}).get('running', False):
+    if not game or not game.get('running', False):
         await update.message.reply_text("Word Hustle abhi chal nahi raha hai.", parse_mode=constants.ParseMode.HTML)
         return
 
-    secret_word = active_games[chat_id_str].get('word', '??????')
-    
-    if chat_id_str in active_games:
-        del active_games[chat_id_str]
-    set_bot_value(HUSTLE_GAME_KEY, active_games)
+    secret_word = game.get('word', '??????')
+    delete_hustle_game(chat_id_str)
     
     await update.message.reply_text(
         f"❌ <b>Word Hustle ENDED!</b>\n"
@@ -340,6 +426,25 @@ async def stop_hustle_game(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         parse_mode=constants.ParseMode.HTML
     )
 
+async def hint_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/hint - ab tak ke guesses ke hisaab se bache words ko sabse achha baantne wala next guess."""
+    game = get_hustle_game(str(update.effective_chat.id))
+    if not game or not game.get('running', False):
+        await update.message.reply_text("Word Hustle abhi chal nahi raha hai. <code>/hustle</code> se shuru karo!", parse_mode=constants.ParseMode.HTML)
+        return
+    engine = await get_feedback_engine() if len(game['word']) == HUSTLE_WORD_LENGTH else None
+    if not engine:
+        await update.message.reply_text("Hints abhi available nahi hain.")
+        return
+    remaining, guess = await asyncio.to_thread(hustle_hint, engine, game['guesses'])
+    if remaining == 0:
+        text = "🤔 Dictionary ka koi bhi word in clues mein fit nahi hota. Khud dimaag lagao!"
+    elif remaining == 1:
+        text = "🔥 Sirf <b>ek</b> word bacha hai! Ab khud dhoondo 😉"
+    else:
+        text = f"💡 <b>Hint:</b> <code>{guess}</code> try karo. Abhi <b>{remaining}</b> words possible hain."
+    await update.message.reply_text(text, parse_mode=constants.ParseMode.HTML)
+
 async def handle_hustle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """
     Har message ko Word Hustle guess ki tarah check karne ke liye.
@@ -351,21 +456,20 @@ async def handle_hustle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE
         return False
 
     chat_id_str = str(message.chat.id)
-    active_games = get_bot_value(HUSTLE_GAME_KEY, {})
+    game_state = get_hustle_game(chat_id_str)
     
-    if not active_games.get(chat_id_str, {}).get('running', False):
+    if not game_state or not game_state.get('running', False):
         return False
 
     text = message.text.strip().upper()
     
-    if len(text) != HUSTLE_WORD_LENGTH or not text.isalpha():
+    secret_word = game_state['word']
+    if len(text) != len(secret_word) or not text.isalpha():
         return False
     
     if text.startswith('/'):
         return False
     
-    game_state = active_games[chat_id_str]
-    secret_word = game_state['word']
     guesses_history = game_state['guesses']
     user = update.effective_user
     
@@ -377,35 +481,30 @@ async def handle_hustle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE
     # --- WIN Condition ---
     if text == secret_word:
         
-        if chat_id_str in active_games:
-            del active_games[chat_id_str]
-        set_bot_value(HUSTLE_GAME_KEY, active_games)
-        
-        current_score = get_user_score(user.id)
-        new_score = current_score + HUSTLE_WIN_POINTS
-        set_user_score(user.id, new_score, first_name=user.first_name, username=user.username)
+        delete_hustle_game(chat_id_str)
+        win_points = chat_config.get(message.chat.id, 'win_points')
+        new_score = add_user_score(user.id, win_points, first_name=user.first_name, username=user.username, reason='hustle_win')
         
         reply_text = (
             f"🏆 <b>WINNER!</b> {user.mention_html()} ne Word Hustle <b>{len(guesses_history)}</b> attempts mein jeet liya!\n\n"
             f"Sahi shabdh tha: <b>{secret_word}</b>\n"
-            f"Aapko <b>+{HUSTLE_WIN_POINTS} points</b> mile! Total score: {new_score}\n\n"
+            f"Aapko <b>+{win_points} points</b> mile! Total score: {new_score}\n\n"
             f"<pre>{current_board}</pre>"
         )
         await message.reply_text(reply_text, parse_mode=constants.ParseMode.HTML)
         return True # Handled
 
     # --- Game Continuing (WRONG GUESS) ---
-    current_score = get_user_score(user.id)
-    new_score = max(0, current_score + HUSTLE_LOSE_POINTS) # Score 0 se neeche na jaaye
-    set_user_score(user.id, new_score, first_name=user.first_name, username=user.username)
+    lose_points = chat_config.get(message.chat.id, 'lose_points')
+    new_score = add_user_score(user.id, lose_points, first_name=user.first_name, username=user.username, reason='hustle_loss') # Score 0 se neeche nahi jaata
 
-    active_games[chat_id_str]['guesses'] = guesses_history
-    set_bot_value(HUSTLE_GAME_KEY, active_games)
+    game_state['guesses'] = guesses_history
+    save_hustle_game(chat_id_str, game_state)
 
     reply_text = (
         f"🎯 <b>Guess #{len(guesses_history)}</b> by {user.first_name}:\n\n"
         f"<pre>{current_board}</pre>\n"
-        f"❌ Galat guess! <b>{HUSTLE_LOSE_POINTS} point</b>. (Total: {new_score})\n"
+        f"❌ Galat guess! <b>{lose_points} point</b>. (Total: {new_score})\n"
         f"Try again!"
     )
     
@@ -419,24 +518,29 @@ async def handle_hustle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def fetch_quiz_data_from_api():
     TRIVIA_API_URL = "https://opentdb.com/api.php?amount=1&type=multiple"
     try:
-        response = requests.get(TRIVIA_API_URL, timeout=5)
+        import requests
+        with metrics.track_http(TRIVIA_API_URL):
+            response = requests.get(TRIVIA_API_URL, timeout=5)
         response.raise_for_status() 
-        data = response.json()
-        if data['response_code'] != 0 or not data['results']: return None
-        q = data['results'][0]
-        options = [html.unescape(requests.utils.unquote(ans)) for ans in q['incorrect_answers']]
-        correct = html.unescape(requests.utils.unquote(q['correct_answer']))
-        options.append(correct)
-        random.shuffle(options)
-        return {
-            'question': html.unescape(requests.utils.unquote(q['question'])),
-            'options': options,
-            'correct_option_id': options.index(correct),
-            'explanation': f"Correct Answer: {correct}"
-        }
+        return parse_quiz_response(response.json())
     except Exception as e:
         logger.error(f"Error fetching quiz data: {e}"); return None
 
+def parse_quiz_response(data):
+    """opentdb response ko poll ke liye question/options mein badalta hai (HTML entities unescape karke)."""
+    if data['response_code'] != 0 or not data['results']: return None
+    q = data['results'][0]
+    options = [html.unescape(urllib.parse.unquote(ans)) for ans in q['incorrect_answers']]
+    correct = html.unescape(urllib.parse.unquote(q['correct_answer']))
+    options.append(correct)
+    random.shuffle(options)
+    return {
+        'question': html.unescape(urllib.parse.unquote(q['question'])),
+        'options': options,
+        'correct_option_id': options.index(correct),
+        'explanation': f"Correct Answer: {correct}"
+    }
+
 async def send_quiz_poll(context: ContextTypes.DEFAULT_TYPE, chat_id, quiz_data):
     try:
         sent_message = await context.bot.send_poll(
@@ -452,71 +556,44 @@ async def send_quiz_poll(context: ContextTypes.DEFAULT_TYPE, chat_id, quiz_data)
         return sent_message.poll.id 
     except (telegram.error.Forbidden, telegram.error.BadRequest) as e:
         logger.warning(f"Failed to send poll to {chat_id}: {e}. Deactivating chat.")
-        deactivate_chat_in_db(chat_id)
+        deactivate_chat(chat_id)
         raise
     except Exception as e:
         logger.error(f"Failed to send quiz poll to {chat_id}: {e}")
         raise
 
-async def staggered_broadcast_job(context: ContextTypes.DEFAULT_TYPE):
-    logger.info("Starting STAGGERED broadcast job in background (Polls)...")
+async def send_scheduled_quiz(context: ContextTypes.DEFAULT_TYPE, chat_id):
+    """Ek due chat ko quiz poll. Bot chat se nikal gaya ho toh chat scheduler se bhi hat jaata hai."""
+    quiz_data = await fetch_quiz_data_from_api()
+    if not quiz_data:
+        logger.error(f"Failed to fetch quiz data for chat {chat_id}. Skipping.")
+        metrics.BROADCAST_MESSAGES.inc('quiz', 'failed'); return
     try:
-        chat_ids = get_all_active_chat_ids()
-        if not chat_ids:
-            logger.warning("No active chats for staggered broadcast."); return
-        
-        open_quizzes = get_bot_value(OPEN_QUIZZES_KEY, {})
-        new_quiz_poll_ids = {}
-        successful_sends = 0
-        
-        active_hustle_games = get_bot_value(HUSTLE_GAME_KEY, {})
-
-        for chat_id in chat_ids:
-            try:
-                # 💡 FIX: Check hata diya gaya hai. Ab quiz hamesha bhejega.
-                # if active_hustle_games.get(str(chat_id), {}).get('running', False):
-                #     logger.info(f"Skipping quiz for chat {chat_id}, Word Hustle is active.")
-                #     continue
-                
-                quiz_data = await fetch_quiz_data_from_api()
-                if not quiz_data:
-                    logger.error(f"Failed to fetch quiz data for chat {chat_id}. Skipping."); continue
-                
-                telegram_poll_id = await send_quiz_poll(context, chat_id, quiz_data)
-                
-                open_quizzes[telegram_poll_id] = {
-                    'correct_option_id': quiz_data['correct_option_id'],
-                    'answered_users': []
-                }
-                
-                new_quiz_poll_ids[str(chat_id)] = telegram_poll_id 
-                successful_sends += 1
-                logger.info(f"Quiz Poll {telegram_poll_id} sent to chat {chat_id}.")
-
-            except (telegram.error.Forbidden, telegram.error.BadRequest):
-                logger.warning(f"Chat {chat_id} is deactivated. Skipping.")
-            except Exception as e:
-                logger.error(f"Unhandled error sending to chat {chat_id}: {e}")
-            
-            # 💡 FIX: Delay ko 7 second kar diya
-            logger.info(f"Waiting for {QUIZ_BROADCAST_DELAY} seconds...")
-            await asyncio.sleep(QUIZ_BROADCAST_DELAY)
-
-        set_bot_value(OPEN_QUIZZES_KEY, open_quizzes)
-        set_bot_value(LAST_QUIZ_MESSAGE_KEY, new_quiz_poll_ids)
-        
-        # 💡 FIX: Timer ko hamesha reset karo, broadcast ke ant mein
-        set_bot_value(LAST_GLOBAL_QUIZ_KEY, datetime.now(timezone.utc).timestamp())
-        logger.info(f"Staggered broadcast FINISHED. Sent to {successful_sends}/{len(chat_ids)} chats. Global timer reset.")
-
-    except Exception as e:
-        logger.error(f"CRITICAL error in staggered_broadcast_job: {e}")
-        # 💡 FIX: Agar job fail ho jaaye, tab bhi timer reset karo (aur lock release karo)
-        set_bot_value(LAST_GLOBAL_QUIZ_KEY, datetime.now(timezone.utc).timestamp())
-        logger.warning("Resetting global timer due to job failure.")
-    finally:
-        set_bot_value(LOCK_KEY, False)
-        logger.info("Staggered broadcast job ended. Lock released.")
+        telegram_poll_id = await send_quiz_poll(context, chat_id, quiz_data)
+    except (telegram.error.Forbidden, telegram.error.BadRequest):
+        quiz_schedule.forget(chat_id)
+        metrics.BROADCAST_MESSAGES.inc('quiz', 'failed'); return
+    except Exception:
+        metrics.BROADCAST_MESSAGES.inc('quiz', 'failed'); return
+    # Turant save karo taaki answers count hon
+    add_quiz_poll(telegram_poll_id, quiz_data['correct_option_id'])
+    metrics.BROADCAST_MESSAGES.inc('quiz', 'sent')
+    logger.info(f"Quiz Poll {telegram_poll_id} sent to chat {chat_id}.")
+
+async def quiz_scheduler_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Har QUIZ_TICK_INTERVAL par sirf woh chats jinka cooldown poora hua (aur jinme activity hai).
+    Ek tick mein QUIZ_SENDS_PER_MINUTE ke hisaab se limited sends; baaki agle tick par (heap mein hi rehte hain).
+    """
+    global _last_quiz_prune
+    now = time.time()
+    limit = max(1, QUIZ_SENDS_PER_MINUTE * QUIZ_TICK_INTERVAL // 60)
+    for chat_id in quiz_schedule.pop_due(now, limit):
+        quiz_schedule.mark_sent(chat_id, now) # Fail ho tab bhi: agla try naye messages + cooldown ke baad
+        await send_scheduled_quiz(context, chat_id)
+    if now - _last_quiz_prune >= QUIZ_PRUNE_INTERVAL:
+        _last_quiz_prune = now
+        prune_quiz_polls()
 
 async def handle_poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     poll_answer = update.poll_answer
@@ -527,21 +604,16 @@ async def handle_poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not poll_answer.option_ids: return
 
     chosen_option_index = poll_answer.option_ids[0]
-    open_quizzes = get_bot_value(OPEN_QUIZZES_KEY, {})
+    quiz_info = get_quiz_poll(poll_id)
     
-    if poll_id not in open_quizzes: return
-        
-    quiz_info = open_quizzes[poll_id]
+    if not quiz_info: return
     
     if user_id in quiz_info['answered_users']: return
 
     if chosen_option_index == quiz_info['correct_option_id']:
-        current_score = get_user_score(user_id)
-        new_score = current_score + 1 # Quiz ke liye 1 point
-        set_user_score(user_id, new_score, first_name=user.first_name, username=user.username) 
-        
-        quiz_info['answered_users'].append(user_id)
-        set_bot_value(OPEN_QUIZZES_KEY, open_quizzes)
+        # Atomic check: do workers/retries ek hi answer ko do baar score na karein
+        if not mark_poll_answered(poll_id, user_id): return
+        new_score = add_user_score(user_id, 1, first_name=user.first_name, username=user.username, reason='quiz') # Quiz ke liye 1 point
         
         try:
             await context.bot.send_message(
@@ -560,19 +632,24 @@ async def handle_poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
 # ======================================================================
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
-    logger.error("Exception while handling an update:", exc_info=context.error)
-    tb_list = traceback.format_exception(None, context.error, context.error.__traceback__)
-    tb_string = "".join(tb_list)
-    update_str = update.to_dict() if isinstance(update, Update) else str(update)
-    message = (
-        f"An exception was raised while handling an update\n"
-        f"<pre>update = {html.escape(json.dumps(update_str, indent=2, ensure_ascii=False))}</pre>\n\n"
-        f"<pre>context.chat_data = {html.escape(str(context.chat_data))}</pre>\n\n"
-        f"<pre>context.user_data = {html.escape(str(context.user_data))}</pre>\n\n"
-        f"<pre>{html.escape(tb_string)}</pre>"
-    )
-    logger.error(message) 
-    if update and isinstance(update, Update) and update.effective_chat:
+    # 💡 Outage mein ek hi error hazaaron baar aata hai: full dump sirf har fingerprint ke pehle kuch ka
+    error_key, window_count, should_dump = error_reports.record(context.error)
+    metrics.ERRORS_REPORTED.inc(type(context.error).__name__, 'yes' if should_dump else 'no')
+    if should_dump:
+        tb_list = traceback.format_exception(None, context.error, context.error.__traceback__)
+        tb_string = "".join(tb_list)
+        update_str = update.to_dict() if isinstance(update, Update) else str(update)
+        message = (
+            f"An exception was raised while handling an update ({error_key}, #{window_count} in window)\n"
+            f"<pre>update = {html.escape(json.dumps(update_str, indent=2, ensure_ascii=False))}</pre>\n\n"
+            f"<pre>context.chat_data = {html.escape(str(context.chat_data))}</pre>\n\n"
+            f"<pre>context.user_data = {html.escape(str(context.user_data))}</pre>\n\n"
+            f"<pre>{html.escape(tb_string)}</pre>"
+        )
+        logger.error(message)
+    else:
+        logger.error(f"Exception {error_key} (#{window_count} in window, payload not logged): {context.error}")
+    if update and isinstance(update, Update) and update.effective_chat and error_reports.should_reply(update.effective_chat.id):
         try:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
@@ -582,18 +659,30 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
         except Exception as e:
             logger.error(f"Failed to send error message to chat: {e}")
 
+async def error_digest_job(context: ContextTypes.DEFAULT_TYPE):
+    """Owner ko pichle digest ke baad ke errors ka summary (fingerprint wise counts)."""
+    rows, total = error_reports.digest()
+    if not rows or not OWNER_ID: return
+    worker = f" (worker {workers.WORKER_INDEX})" if workers.WORKER_INDEX is not None else ""
+    lines = [f"<b>⚠️ Error digest{worker}:</b> {total} errors in the last {errors.ERROR_DIGEST_INTERVAL // 60} min\n"]
+    for error_key, count, all_time, last_message in rows:
+        lines.append(f"<b>{count}x</b> <code>{html.escape(error_key)}</code> ({all_time} total)\n<i>{html.escape(last_message)}</i>")
+    try:
+        await context.bot.send_message(chat_id=OWNER_ID, text="\n".join(lines), parse_mode=constants.ParseMode.HTML)
+    except Exception as e:
+        logger.error(f"Failed to send error digest to owner: {e}")
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     register_chat(update)
-    bot = await context.bot.get_me()
-    bot_name = html.escape(bot.first_name)
+    bot_name = html.escape(context.bot.first_name)
     user_name = html.escape(update.effective_user.first_name)
     
     start_text = (
         f"👋 <b>Hi {user_name}, I'm {bot_name}</b>!\n\n"
         f"I'm a <b>Game-focused Bot</b> here to bring fun with Quizzes and Word Hustle challenges.\n\n"
         f"<b>What I can do:</b>\n"
-        f"• 🏆 Track Quiz/Hustle scores (/ranking)\n"
+        f"• 🏆 Track Quiz/Hustle scores (/ranking daily|weekly|all)\n"
         f"• 👤 Check your score with (/profile)\n"
         f"• 🧠 Trigger automatic Quiz Polls as you chat\n"
         f"• 🔠 Start a <b>Word Hustle</b> game with (/hustle)\n"
@@ -610,31 +699,69 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         await update.message.reply_text(start_text, parse_mode=constants.ParseMode.HTML)
 
+def next_welcome_video_id():
+    """Welcome video rotation memory mein; DB mein sirf har VIDEO_COUNTER_CHECKPOINT_EVERY par checkpoint."""
+    global _video_counter, _video_counter_saved
+    if not WELCOME_VIDEO_URLS: return None
+    if _video_counter is None:
+        _video_counter = _video_counter_saved = get_bot_value(VIDEO_COUNTER_KEY, 0)
+    video_id = WELCOME_VIDEO_URLS[_video_counter % len(WELCOME_VIDEO_URLS)]
+    _video_counter += 1
+    if _video_counter % VIDEO_COUNTER_CHECKPOINT_EVERY == 0:
+        checkpoint_video_counter()
+    return video_id
+
+def checkpoint_video_counter():
+    global _video_counter_saved
+    if _video_counter is not None and _video_counter != _video_counter_saved:
+        set_bot_value(VIDEO_COUNTER_KEY, _video_counter)
+        _video_counter_saved = _video_counter
+
 async def welcome_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message.new_chat_members: return
     register_chat(update)
     chat_id = update.effective_chat.id
-    chat_name = html.escape(update.effective_chat.title or "this chat")
-    video_id = None
-    if WELCOME_VIDEO_URLS:
-        video_index = get_bot_value(VIDEO_COUNTER_KEY, 0)
-        video_id = WELCOME_VIDEO_URLS[video_index % len(WELCOME_VIDEO_URLS)]
-        set_bot_value(VIDEO_COUNTER_KEY, video_index + 1)
-    for member in update.message.new_chat_members:
-        if member.is_bot: continue
-        welcome_message = f"👋 <b>Welcome to {chat_name}</b>!\n\nUser: {member.mention_html()}\n\nStart playing quizzes and hustle to earn your spot on the leaderboard! 🏆"
+    mentions = [member.mention_html() for member in update.message.new_chat_members if not member.is_bot]
+    if not mentions: return
+
+    # 💡 Ek window ke andar aaye saare joins ek hi welcome message mein merge honge
+    pending = _pending_welcomes.setdefault(chat_id, {'mentions': [], 'task': None})
+    pending['chat_name'] = html.escape(update.effective_chat.title or "this chat")
+    pending['mentions'].extend(mentions)
+    if pending['task'] is None:
+        # Per-chat rate cap: pichle welcome ke WELCOME_MIN_INTERVAL baad hi agla
+        delay = max(WELCOME_BATCH_WINDOW, _last_welcome_sent.get(chat_id, 0) + WELCOME_MIN_INTERVAL - time.time())
+        # application.create_task reference rakhta hai (GC nahi hota) aur exceptions error_handler tak jaati hain
+        pending['task'] = context.application.create_task(flush_welcome(context, chat_id, delay), update=update)
+
+async def flush_welcome(context: ContextTypes.DEFAULT_TYPE, chat_id, delay):
+    await asyncio.sleep(delay)
+    pending = _pending_welcomes.pop(chat_id, None)
+    if not pending: return
+    _remember(_last_welcome_sent, chat_id, time.time(), WELCOME_CACHE_SIZE)
+
+    mentions = pending['mentions']
+    users_text = ", ".join(mentions[:WELCOME_MAX_MENTIONS])
+    if len(mentions) > WELCOME_MAX_MENTIONS:
+        users_text += f" and {len(mentions) - WELCOME_MAX_MENTIONS} more"
+    label = "User" if len(mentions) == 1 else "Users"
+    welcome_message = f"👋 <b>Welcome to {pending['chat_name']}</b>!\n\n{label}: {users_text}\n\nStart playing quizzes and hustle to earn your spot on the leaderboard! 🏆"
+
+    video_id = next_welcome_video_id()
+    try:
+        if video_id:
+            await context.bot.send_video(chat_id=chat_id, video=video_id, caption=welcome_message, parse_mode=constants.ParseMode.HTML)
+        else:
+            await context.bot.send_message(chat_id=chat_id, text=welcome_message, parse_mode=constants.ParseMode.HTML)
+    except Exception as e:
+        logger.error(f"Error during welcome message: {e}")
         try:
-            if video_id:
-                await context.bot.send_video(chat_id=chat_id, video=video_id, caption=welcome_message, parse_mode=constants.ParseMode.HTML)
-            else:
-                await context.bot.send_message(chat_id=chat_id, text=welcome_message, parse_mode=constants.ParseMode.HTML)
-        except Exception as e:
-            logger.error(f"Error during welcome message: {e}")
             await context.bot.send_message(chat_id=chat_id, text=welcome_message, parse_mode=constants.ParseMode.HTML)
+        except Exception as e:
+            logger.error(f"Failed to send fallback welcome message to {chat_id}: {e}")
 
 async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    bot = await context.bot.get_me()
-    bot_name = html.escape(bot.first_name)
+    bot_name = html.escape(context.bot.first_name)
     about_text = (
         f"👋 <b>About Me</b>\n\nHi, I'm {bot_name}!\n\n"
         f"I was created for gaming and group engagement.\n\n"
@@ -642,7 +769,8 @@ async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"• Quiz/Hustle rankings (/ranking)\n"
         f"• User profiles (/profile)\n"
         f"• Automatic quizzes (via polls)\n"
-        f"• Word Hustle game (/hustle)\n"
+        f"• Word Hustle game (/hustle, /hint)\n"
+        f"• Group admins: /settings (quiz frequency, word length, points, spam limits)\n"
         f"• Personal score tracking (/myscore)\n"
         f"• Image search (/img)\n"
         f"• AI Image generation (/gen)\n\n"
@@ -684,108 +812,133 @@ async def get_id_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         await update.message.reply_text("Could not find a File ID.")
 
+def get_pexels():
+    """Pexels module pehli /img par import hota hai (persisted query cache bhi tabhi load hota hai)."""
+    pexels = sys.modules.get('pexels')
+    if pexels is None:
+        import pexels
+        if PEXELS_CACHE_PERSIST:
+            pexels.load_cache(get_bot_value(PEXELS_CACHE_KEY, {}))
+    return pexels
+
+def get_stable_horde():
+    """Stable Horde client pehli /gen par import hota hai."""
+    import stable_horde
+    return stable_horde
+
 async def img_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not PEXELS_API_KEY: await update.message.reply_text("Image search is disabled."); return
     if not context.args: await update.message.reply_text("Example: `/img nature`"); return
     query = " ".join(context.args)
-    url = f"https://api.pexels.com/v1/search?query={query}&per_page=15"
-    headers = {"Authorization": PEXELS_API_KEY}
+    pexels = get_pexels()
     try:
-        response = requests.get(url, headers=headers, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        if not data.get('photos'): await update.message.reply_text(f"No images found for '{query}'."); return
-        photo_url = random.choice(data['photos'])['src']['large']
-        await update.message.reply_photo(photo_url, caption=f"Requested: {query}")
+        # 💡 Popular queries cache se serve hoti hain, API call sirf cache miss par
+        photo_url = await pexels.search_photo(query, PEXELS_API_KEY)
+        if not photo_url: await update.message.reply_text(f"No images found for '{query}'."); return
+        await file_id_cache.reply_photo_cached(update.message, file_id_cache.url_key(photo_url), photo_url, caption=f"Requested: {query}")
+    except pexels.PexelsRateLimited:
+        await update.message.reply_text("Image search is busy right now. Please try again later.")
     except Exception as e:
         logger.error(f"Pexels API error: {e}"); await update.message.reply_text("Error with image search.")
 
+def save_media_caches():
+    """Pexels query cache aur file_id cache ko DB mein save karta hai (sirf jab kuch naya aaya ho)."""
+    pexels = sys.modules.get('pexels') # Import hi nahi hua toh save karne ko kuch nahi
+    if PEXELS_CACHE_PERSIST and pexels and pexels.cache_dirty:
+        set_bot_value(PEXELS_CACHE_KEY, pexels.export_cache())
+    if file_id_cache.cache_dirty:
+        set_bot_value(FILE_ID_CACHE_KEY, file_id_cache.export_cache())
+
+async def save_media_caches_job(context: ContextTypes.DEFAULT_TYPE):
+    save_media_caches()
+
 async def gen_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not STABLE_HORDE_API_KEY or STABLE_HORDE_API_KEY == '0000000000': await update.message.reply_text("Image generation is disabled."); return
     if not context.args: await update.message.reply_text("Example: `/gen a cat in space`"); return
     prompt = " ".join(context.args)
-    sent_msg = await update.message.reply_text(f"🎨 Generating '{prompt}'...")
-    try:
-        post_url = "https://stablehorde.net/api/v2/generate/async"
-        headers = {"apikey": STABLE_HORDE_API_KEY, "Client-Agent": "TelegramBot/1.0"}
-        payload = {"prompt": prompt, "params": { "n": 1, "width": 512, "height": 512 }}
-        post_response = requests.post(post_url, json=payload, headers=headers, timeout=10)
-        post_response.raise_for_status()
-        generation_id = post_response.json()['id']
-        start_time = time.time()
-        while time.time() - start_time < 120:
-            await asyncio.sleep(5)
-            check_url = f"https://stablehorde.net/api/v2/generate/check/{generation_id}"
-            check_response = requests.get(check_url, timeout=5)
-            check_data = check_response.json()
-            if check_data.get('done', False):
-                status_url = f"https://stablehorde.net/api/v2/generate/status/{generation_id}"
-                status_response = requests.get(status_url, timeout=5)
-                img_url = status_response.json()['generations'][0]['img']
-                await sent_msg.delete()
-                await update.message.reply_photo(img_url, caption=f"*Prompt:* {escape_markdown(prompt, version=2)}", parse_mode=constants.ParseMode.MARKDOWN_V2)
-                return
-        await sent_msg.edit_text("Generation timed out.")
-    except Exception as e:
-        logger.error(f"Stable Horde error: {e}"); await sent_msg.edit_text(f"Sorry, an error occurred: {e}")
+    stable_horde = get_stable_horde()
+
+    # 💡 Same prompt ka result (file_id ya img URL) cache mein hai toh seedha bhej do
+    cached_img_url = stable_horde.get_cached_result(prompt)
+    if cached_img_url or file_id_cache.get_file_id(file_id_cache.prompt_key(prompt)):
+        try:
+            if await stable_horde.deliver_photo(update.message, prompt, cached_img_url): return
+        except Exception as e:
+            logger.warning(f"Cached Stable Horde image failed, regenerating: {e}")
+
+    # Job manager queue + polling sambhalta hai, handler turant free ho jaata hai
+    sent_msg = await update.message.reply_text(f"⏳ Queued '{prompt}'...")
+    error_text = stable_horde.queue_generation(prompt, update.effective_user.id, STABLE_HORDE_API_KEY, sent_msg, update.message)
+    if error_text:
+        await sent_msg.edit_text(error_text)
 
 async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not OWNER_ID or str(update.effective_user.id) != str(OWNER_ID):
         await update.message.reply_text("This is an owner-only command.")
         return
     message_text = update.message.text.split(' ', 1)
-    if len(message_text) < 2: await update.message.reply_text("Usage: /broadcast <message>"); return
+    include_dormant = len(message_text) > 1 and message_text[1].split(maxsplit=1)[0] == '--all'
+    if include_dormant: message_text = message_text[1].split(maxsplit=1)
+    if len(message_text) < 2: await update.message.reply_text("Usage: /broadcast [--all] <message>"); return
     text_to_send = message_text[1]
-    chat_ids = get_all_active_chat_ids()
+    flush_activity_counts() # Abhi tak ki activity bhi targeting mein gine
+    # Recent activity wale chats pehle (chat_data_recent index); dormant sirf --all par, dheere aur aakhir mein
+    chat_ids = get_all_active_chat_ids(active_since=time.time() - BROADCAST_ACTIVE_DAYS * 86400)
+    recent = set(chat_ids)
+    dormant_ids = [chat_id for chat_id in get_all_active_chat_ids() if chat_id not in recent] if include_dormant else []
     sent_count, failed_count = 0, 0
-    await update.message.reply_text(f"Starting broadcast to {len(chat_ids)} chats...")
-    for chat_id in chat_ids:
+    broadcast_started = time.time()
+    if include_dormant:
+        await update.message.reply_text(f"Starting broadcast to {len(chat_ids)} active + {len(dormant_ids)} dormant chats...")
+    else:
+        await update.message.reply_text(f"Starting broadcast to {len(chat_ids)} chats active in the last {BROADCAST_ACTIVE_DAYS} days (use /broadcast --all to include dormant chats)...")
+    for chat_id, delay in [(c, BROADCAST_DELAY) for c in chat_ids] + [(c, BROADCAST_DORMANT_DELAY) for c in dormant_ids]:
         try:
             await context.bot.send_message(chat_id=chat_id, text=text_to_send, parse_mode=constants.ParseMode.HTML)
             sent_count += 1
+            metrics.BROADCAST_MESSAGES.inc('owner', 'sent')
         except (telegram.error.Forbidden, telegram.error.BadRequest) as e:
-            deactivate_chat_in_db(chat_id)
+            deactivate_chat(chat_id)
             failed_count += 1
+            metrics.BROADCAST_MESSAGES.inc('owner', 'failed')
         except Exception as e:
             logger.error(f"Failed to send broadcast to {chat_id}: {e}")
             failed_count += 1
-        await asyncio.sleep(0.2)
+            metrics.BROADCAST_MESSAGES.inc('owner', 'failed')
+        await asyncio.sleep(delay)
+    metrics.BROADCAST_DURATION.observe(time.time() - broadcast_started, 'owner')
     await update.message.reply_text(f"Broadcast complete.\nSent: {sent_count}\nFailed: {failed_count}")
 
-async def release_lock_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not OWNER_ID or str(update.effective_user.id) != str(OWNER_ID):
-        await update.message.reply_text("This is an owner-only command."); return
-    set_bot_value(LOCK_KEY, False)
-    set_bot_value(LAST_GLOBAL_QUIZ_KEY, datetime.now(timezone.utc).timestamp()) 
-    await update.message.reply_text("✅ Global quiz lock released, and global timer reset.")
+LEADERBOARD_TITLES = {'daily': "Today's", 'weekly': "This Week's", 'all': "All-Time"}
 
-def get_leaderboard_data(page=0, per_page=10):
-    return get_leaderboard_data_quiz_only(page, per_page)
+def get_leaderboard_data(page=0, per_page=10, window='all'):
+    return get_window_leaderboard(window, page, per_page)
 
 async def ranking_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await send_leaderboard_page(update, context, page=0)
+    # /ranking, /ranking daily, /ranking weekly, /ranking all
+    window = context.args[0].lower() if context.args else 'all'
+    if window not in LEADERBOARD_TITLES:
+        await update.message.reply_text("Usage: /ranking [daily|weekly|all]"); return
+    await send_leaderboard_page(update, context, page=0, window=window)
 
-async def send_leaderboard_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page=0):
+async def send_leaderboard_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page=0, window='all'):
     per_page = 10
-    top_users, total_users = get_leaderboard_data(page, per_page)
-    if not top_users:
-        await update.message.reply_text("No one has earned a score yet.")
-        return
-    total_pages = (total_users + per_page - 1) // per_page
-    text = "🧠 <b>Quiz & Hustle Score Leaderboard</b> 🏆\n\n"
-    rank_start = page * per_page
-    for i, (first_name, score) in enumerate(top_users):
-        rank = rank_start + i + 1
-        name = html.escape(first_name or "Anonymous")
-        emoji = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "🔹"
-        text += f"{emoji} <b>{rank}.</b> {name} - {score} points\n"
-    text += f"\nPage {page + 1} of {total_pages}"
+    top_users, total_users = get_leaderboard_data(page, per_page, window)
     buttons = []
-    row = []
-    if page > 0: row.append(InlineKeyboardButton("⬅️ Previous", callback_data=f"lb_page_{page - 1}"))
-    if (page + 1) < total_pages: row.append(InlineKeyboardButton("Next ➡️", callback_data=f"lb_page_{page + 1}"))
-    if row: buttons.append(row)
-    reply_markup = InlineKeyboardMarkup(buttons) if buttons else None
+    if top_users:
+        total_pages = (total_users + per_page - 1) // per_page
+        text = render_leaderboard_text(top_users, page, per_page, total_pages, window)
+        row = []
+        if page > 0: row.append(InlineKeyboardButton("⬅️ Previous", callback_data=f"lb_{window}_{page - 1}"))
+        if (page + 1) < total_pages: row.append(InlineKeyboardButton("Next ➡️", callback_data=f"lb_{window}_{page + 1}"))
+        if row: buttons.append(row)
+    elif window == 'all':
+        text = "No one has earned a score yet."
+    else:
+        text = f"No one has scored {'today' if window == 'daily' else 'this week'} yet."
+    # Daily/Weekly/All-Time switch (current window par •)
+    buttons.append([InlineKeyboardButton(("• " if w == window else "") + w.capitalize(), callback_data=f"lb_{w}_0") for w in LEADERBOARD_TITLES])
+    reply_markup = InlineKeyboardMarkup(buttons)
     if isinstance(update, Update) and update.callback_query:
         try:
             await update.callback_query.edit_message_text(text, parse_mode=constants.ParseMode.HTML, reply_markup=reply_markup)
@@ -795,78 +948,266 @@ async def send_leaderboard_page(update: Update, context: ContextTypes.DEFAULT_TY
     else:
         await update.message.reply_text(text, parse_mode=constants.ParseMode.HTML, reply_markup=reply_markup)
 
+def render_leaderboard_text(top_users, page, per_page, total_pages, window='all'):
+    text = f"🧠 <b>{LEADERBOARD_TITLES.get(window, 'All-Time')} Quiz & Hustle Leaderboard</b> 🏆\n\n"
+    rank_start = page * per_page
+    for i, (first_name, score) in enumerate(top_users):
+        rank = rank_start + i + 1
+        name = html.escape(first_name or "Anonymous")
+        emoji = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else "🔹"
+        text += f"{emoji} <b>{rank}.</b> {name} - {score} points\n"
+    text += f"\nPage {page + 1} of {total_pages}"
+    return text
+
 async def leaderboard_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
-    page = int(query.data.split('_')[-1])
-    await send_leaderboard_page(update, context, page=page)
+    _, window, page = query.data.split('_')
+    if window not in LEADERBOARD_TITLES: window = 'all' # Purane 'lb_page_N' buttons
+    await send_leaderboard_page(update, context, page=int(page), window=window)
+
+def register_chat_once(update):
+    """Har group message par DB upsert nahi: process mein pehli baar dikhe chat ka hi register_chat."""
+    chat_id = update.effective_chat.id
+    if chat_id not in _registered_chats:
+        register_chat(update)
+        _registered_chats.add(chat_id)
+
+def deactivate_chat(chat_id):
+    deactivate_chat_in_db(chat_id)
+    _registered_chats.discard(chat_id) # Bot wapas add ho toh agla message phir register kare
+    chat_activity.forget_title(chat_id)
+
+def flush_activity_counts():
+    chats, users, titles = chat_activity.drain()
+    if chats is None: return
+    try:
+        flush_message_counts(chats, users, titles)
+    except Exception as e:
+        chat_activity.restore(chats, users, titles)
+        logger.error(f"Failed to flush message counters ({len(chats)} chats, {len(users)} users): {e}")
+        return
+    chat_activity.mark_flushed()
+
+async def activity_flush_job(context: ContextTypes.DEFAULT_TYPE):
+    """Pending per-chat / per-user message counts ka batched upsert."""
+    flush_activity_counts()
+
+async def metrics_gauges_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    COUNT(*) wale aur queue gauges yahin (event loop par) bharte hain. /metrics server alag thread par chalta hai,
+    wahan se DB queries ya loop ki dicts (quiz_schedule) chhoona na rate-limited hai na thread-safe.
+    """
+    collect_queue_metrics()
+    collect_state_metrics()
+
+async def score_rollup_job(context: ContextTypes.DEFAULT_TYPE):
+    """score_events -> score_daily rollup; daily/weekly rankings isi se bante hain."""
+    rolled_up = rollup_score_events()
+    if rolled_up: logger.info(f"Rolled up {rolled_up} score events.")
 
 async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_to_check = update.message.reply_to_message.from_user if update.message.reply_to_message else update.effective_user
     user_id = str(user_to_check.id)
     mention = user_to_check.mention_html()
     
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT quiz_score FROM user_data WHERE user_id = %s", (user_id,))
-    result = cur.fetchone()
-    quiz_score = result[0] if result else 0
-    
-    cur.execute("SELECT rank FROM (SELECT user_id, ROW_NUMBER() OVER (ORDER BY quiz_score DESC) as rank FROM user_data WHERE quiz_score > 0) as ranked_users WHERE user_id = %s", (user_id,))
-    rank_result = cur.fetchone()
-    rank = rank_result[0] if rank_result else "N/A"
-    cur.close()
-    conn.close()
+    quiz_score, rank = get_user_score_and_rank(user_id)
     
     text = f"👤 <b>User Profile</b>\n\n<b>Name:</b> {mention}\n<b>User ID:</b> <code>{user_id}</code>\n\n--- <b>Game Stats</b> ---\n🏆 <b>Score Rank:</b> {rank}\n🧠 <b>Total Score:</b> {quiz_score} points"
     await update.message.reply_text(text, parse_mode=constants.ParseMode.HTML)
 
+async def is_chat_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Group admin/creator (ya bot owner). Sirf settings badalte waqt ek get_chat_member call."""
+    if OWNER_ID and str(update.effective_user.id) == str(OWNER_ID):
+        return True
+    try:
+        member = await context.bot.get_chat_member(update.effective_chat.id, update.effective_user.id)
+    except telegram.error.TelegramError as e:
+        logger.warning(f"Admin check failed in {update.effective_chat.id}: {e}")
+        return False
+    return member.status in (constants.ChatMemberStatus.ADMINISTRATOR, constants.ChatMemberStatus.OWNER)
+
+def render_chat_settings(chat_id):
+    overrides = chat_config.overrides(chat_id)
+    lines = ["⚙️ <b>Chat Settings</b>\n"]
+    for name, value in chat_config.for_chat(chat_id).items():
+        marker = " ✏️" if name in overrides else ""
+        lines.append(f"<code>{name}</code>: <b>{value}</b>{marker} - {chat_settings.SETTINGS[name][2]}")
+    lines.append("\n✏️ = changed in this chat. Admins: <code>/settings name value</code>, <code>/settings name default</code> or <code>/settings reset</code>.")
+    return "\n".join(lines)
+
+async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/settings [name value | name default | reset] - is group ki quiz/hustle/spam settings (badalna sirf admins)."""
+    chat_id = update.effective_chat.id
+    if update.effective_chat.type not in (constants.ChatType.GROUP, constants.ChatType.SUPERGROUP):
+        await update.message.reply_text("Settings sirf groups mein hoti hain."); return
+    args = context.args or []
+    if not args:
+        await update.message.reply_text(render_chat_settings(chat_id), parse_mode=constants.ParseMode.HTML); return
+    if not await is_chat_admin(update, context):
+        await update.message.reply_text("❌ Only group admins can change settings."); return
+
+    if args[0].lower() == 'reset':
+        overrides = {}
+    elif len(args) == 2:
+        name = args[0].lower()
+        try:
+            value = chat_settings.parse_value(name, args[1])
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}"); return
+        overrides = chat_config.changed(chat_id, name, value)
+    else:
+        await update.message.reply_text("Usage: /settings, /settings name value, /settings name default, /settings reset"); return
+
+    update_chat_settings(chat_id, overrides)
+    await update.message.reply_text(render_chat_settings(chat_id), parse_mode=constants.ParseMode.HTML)
+
 async def timer_status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not OWNER_ID or str(update.effective_user.id) != str(OWNER_ID):
         await update.message.reply_text("❌ This is an owner-only command."); return
     
-    current_time_ts = time.time()
-    last_quiz_time_ts = get_bot_value(LAST_GLOBAL_QUIZ_KEY, 0)
-    is_locked = get_bot_value(LOCK_KEY, False)
-    
-    if last_quiz_time_ts == 0:
+    schedule = quiz_schedule.stats()
+    if schedule['last_sent'] is None:
         last_quiz_time_str = "N/A (Never sent)"
-        time_remaining_str = "✅ READY"
     else:
         # 💡 FIX: Convert to IST
-        last_quiz_dt_utc = datetime.fromtimestamp(last_quiz_time_ts, timezone.utc)
-        last_quiz_dt_ist = last_quiz_dt_utc.astimezone(IST)
+        last_quiz_dt_ist = datetime.fromtimestamp(schedule['last_sent'], timezone.utc).astimezone(IST)
         last_quiz_time_str = last_quiz_dt_ist.strftime("%Y-%m-%d %I:%M:%S %p IST") # IST format
-        
-        time_elapsed = current_time_ts - last_quiz_time_ts
-        time_remaining = max(0, GLOBAL_QUIZ_COOLDOWN - time_elapsed)
-        
-        if time_remaining <= 0:
-            time_remaining_str = "✅ READY"
-        else:
-            # 💡 FIX: Show countdown in M:S format
-            minutes, seconds = divmod(int(time_remaining), 60)
-            time_remaining_str = f"⏳ approx {minutes}m {seconds}s"
-
-    status = "🔴 ACTIVE (Broadcast in progress)" if is_locked else "🟢 FREE"
     
-    quiz_polls_count = len(get_bot_value(OPEN_QUIZZES_KEY, {}))
-    active_games = get_bot_value(HUSTLE_GAME_KEY, {})
-    active_hustle_games_count = sum(1 for game in active_games.values() if game.get('running'))
+    if schedule['next_in'] is None:
+        time_remaining_str = "— (no active chats)"
+    elif schedule['next_in'] <= 0:
+        time_remaining_str = f"✅ DUE ({schedule['overdue']} chats waiting)"
+    else:
+        # 💡 FIX: Show countdown in M:S format
+        minutes, seconds = divmod(int(schedule['next_in']), 60)
+        time_remaining_str = f"⏳ approx {minutes}m {seconds}s"
+    
+    # 💡 Counts /metrics wale gauges se aate hain (yahan abhi refresh, warna metrics_gauges_job bharta hai)
+    collect_state_metrics()
+    quiz_polls_count = int(metrics.OPEN_QUIZ_POLLS.get())
+    active_hustle_games_count = int(metrics.ACTIVE_HUSTLE_GAMES.get())
+    
+    msg_p50 = metrics.HANDLER_LATENCY.quantile(0.5, 'send_quiz_after_n_messages')
+    msg_p99 = metrics.HANDLER_LATENCY.quantile(0.99, 'send_quiz_after_n_messages')
+    latency_str = f"{msg_p50 * 1000:.0f}ms / {msg_p99 * 1000:.0f}ms" if msg_p50 is not None else "N/A"
+    db_queries = sum(metrics.DB_QUERIES.values.values())
+    db_seconds = sum(metrics.DB_LATENCY.total(*labels) for labels in list(metrics.DB_LATENCY.values))
+    quiz_sent = metrics.BROADCAST_MESSAGES.get('quiz', 'sent')
+    quiz_failed = metrics.BROADCAST_MESSAGES.get('quiz', 'failed')
+    collect_queue_metrics()
+    counts = chat_activity.stats()
+    last_flush_str = f"{int(time.time() - counts['last_flush'])}s ago" if counts['last_flush'] else "never"
+    busiest_str = ", ".join(f"{chat_id}: {n}" for chat_id, n in counts['top_chats']) or "N/A"
+    ingest_str = f"{int(metrics.QUEUE_DEPTH.get('ingest_pending'))} waiting, {int(metrics.QUEUE_DEPTH.get('ingest_running'))} running, {sum(metrics.UPDATES_SHED.values.values())} shed"
     
     # 💡 FIX: Using HTML for stability
     text = (
-        f"<b>⌛ Global Timer Status (Owner Only)</b>\n\n"
-        f"<b>Quiz Broadcast Lock:</b> <code>{status}</code>\n"
-        f"<b>Last Broadcast (IST):</b> <code>{last_quiz_time_str}</code>\n"
-        f"<b>Next Quiz Trigger:</b> <code>{time_remaining_str}</code>\n\n"
+        f"<b>⌛ Quiz Timer Status (Owner Only)</b>\n\n"
+        f"<b>Chats Scheduled:</b> <code>{schedule['scheduled']} (default cooldown {quiz_schedule.cooldown // 60}m, {len(chat_config)} chats customised)</code>\n"
+        f"<b>Last Quiz Sent (IST):</b> <code>{last_quiz_time_str}</code>\n"
+        f"<b>Next Quiz Due:</b> <code>{time_remaining_str}</code>\n\n"
         f"--- <b>Active Games</b> --- \n" 
         f"<b>Open Quizzes (Polls):</b> <code>{quiz_polls_count}</code>\n"
-        f"<b>Open Word Hustle:</b> <code>{active_hustle_games_count}</code>"
+        f"<b>Open Word Hustle:</b> <code>{active_hustle_games_count}</code>\n\n"
+        f"--- <b>Chat Activity (since restart)</b> --- \n"
+        f"<b>Messages:</b> <code>{counts['total']} in {counts['chats']} chats</code>\n"
+        f"<b>Busiest chats:</b> <code>{busiest_str}</code>\n"
+        f"<b>Pending flush:</b> <code>{counts['pending_chats']} chats, {counts['pending_users']} users (last flush {last_flush_str})</code>\n\n"
+        f"--- <b>Performance (since restart)</b> --- \n"
+        f"<b>Message handler p50/p99:</b> <code>{latency_str}</code>\n"
+        f"<b>DB queries:</b> <code>{db_queries} ({db_seconds:.1f}s total)</code>\n"
+        f"<b>Quiz polls sent/failed:</b> <code>{quiz_sent}/{quiz_failed}</code>\n"
+        f"<b>Update queue:</b> <code>{ingest_str}</code>"
     )
     
     await update.message.reply_text(text, parse_mode=constants.ParseMode.HTML)
 
+async def pyprofile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/pyprofile [seconds] - live process ka cProfile capture (Owner only)."""
+    if not OWNER_ID or str(update.effective_user.id) != str(OWNER_ID):
+        await update.message.reply_text("❌ This is an owner-only command."); return
+    try:
+        seconds = int(context.args[0]) if context.args else 30
+    except ValueError:
+        await update.message.reply_text("Usage: /pyprofile [seconds]"); return
+    seconds = max(1, min(seconds, profiling.MAX_CAPTURE_SECONDS))
+    
+    await update.message.reply_text(f"🔬 Profiling the bot for {seconds}s...")
+    # Capture background mein chalta hai taaki ye handler baaki updates ko block na kare
+    context.application.create_task(send_profile_capture(context, update.effective_chat.id, seconds))
+
+async def send_profile_capture(context: ContextTypes.DEFAULT_TYPE, chat_id, seconds):
+    report = await profiling.capture_profile(seconds)
+    if report is None:
+        await context.bot.send_message(chat_id=chat_id, text="A profile capture is already running."); return
+    await context.bot.send_document(
+        chat_id=chat_id,
+        document=io.BytesIO(report.encode()),
+        filename=f"profile_{int(time.time())}.txt",
+        caption=f"cProfile capture ({seconds}s)"
+    )
+
+async def slow_queries_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not OWNER_ID or str(update.effective_user.id) != str(OWNER_ID):
+        await update.message.reply_text("❌ This is an owner-only command."); return
+    if not profiling.PROFILING_ENABLED:
+        await update.message.reply_text("Profiling mode is off. Set BOT_PROFILE=1 to record slow queries."); return
+    await update.message.reply_text(f"<pre>{html.escape(profiling.format_slow_queries()[-3900:])}</pre>", parse_mode=constants.ParseMode.HTML)
+
+BACKUP_UPLOAD_LIMIT = 50 * 1024 * 1024 # Bot API sendDocument limit
+BACKUP_DOWNLOAD_LIMIT = 20 * 1024 * 1024 # Bot API getFile limit; badi files ke liye backup.py CLI
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/export users|chats [csv|jsonl] - table ki gzip file (Owner only)."""
+    if not OWNER_ID or str(update.effective_user.id) != str(OWNER_ID):
+        await update.message.reply_text("❌ This is an owner-only command."); return
+    args = context.args or []
+    fmt = args[1].lower() if len(args) > 1 else 'csv'
+    if not args or args[0] not in backup_tables() or fmt not in ('csv', 'jsonl'):
+        await update.message.reply_text("Usage: /export users|chats [csv|jsonl]"); return
+    table = backup_tables()[args[0]]
+    filename = f"{args[0]}-{datetime.now(IST).strftime('%Y%m%d-%H%M')}.{fmt}.gz"
+    path = os.path.join(tempfile.gettempdir(), filename)
+    try:
+        rows = await asyncio.to_thread(export_backup, table, path) # COPY stream; event loop free rehta hai
+        size = os.path.getsize(path)
+        if size > BACKUP_UPLOAD_LIMIT:
+            await update.message.reply_text(f"Export is {size / 1e6:.0f} MB, too big for Telegram. Use: python backup.py export {args[0]} {filename}"); return
+        with open(path, 'rb') as f:
+            await update.message.reply_document(f, filename=filename, caption=f"{rows} {table} rows ({size / 1e6:.1f} MB)")
+    finally:
+        if os.path.exists(path): os.remove(path)
+
+async def import_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/import users|chats [max|sum] - export file wale message ko reply karke (Owner only)."""
+    if not OWNER_ID or str(update.effective_user.id) != str(OWNER_ID):
+        await update.message.reply_text("❌ This is an owner-only command."); return
+    args = context.args or []
+    merge = args[1].lower() if len(args) > 1 else 'max'
+    reply = update.message.reply_to_message
+    document = reply.document if reply else None
+    if not args or args[0] not in backup_tables() or merge not in ('max', 'sum') or not document:
+        await update.message.reply_text("Usage: reply to an export file with /import users|chats [max|sum]"); return
+    if document.file_size and document.file_size > BACKUP_DOWNLOAD_LIMIT:
+        await update.message.reply_text("File is over 20 MB (Telegram download limit). Use: python backup.py import ..."); return
+    table = backup_tables()[args[0]]
+    path = os.path.join(tempfile.gettempdir(), f"import-{document.file_unique_id}-{os.path.basename(document.file_name or 'backup.csv.gz')}")
+    try:
+        tg_file = await context.bot.get_file(document.file_id)
+        await tg_file.download_to_drive(path)
+        started = time.time()
+        rows = await asyncio.to_thread(import_backup, table, path, merge)
+        await update.message.reply_text(f"✅ Merged {rows} {table} rows ({merge}) in {time.time() - started:.1f}s.")
+    except ValueError as e: # Format/table galat
+        await update.message.reply_text(f"❌ {e}")
+    finally:
+        if os.path.exists(path): os.remove(path)
+
+def backup_tables():
+    import backup # Sirf owner backup commands ke liye
+    return backup.TABLE_ALIASES
+
 # ======================================================================
 # --- 📨 CORE MESSAGE HANDLER (UPDATED) ---
 # ======================================================================
@@ -878,28 +1219,23 @@ async def send_quiz_after_n_messages(update: Update, context: ContextTypes.DEFAU
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     
+    chat_activity.record(chat_id, user_id, update.effective_chat.title) # Sirf memory counters; DB write flush job mein
+    
     # --- 1. Spam Protection ---
     current_time = time.time()
-    blocked_until, message_timestamps = get_spam_data(user_id) 
-    is_blocked = False
-    
-    if current_time < blocked_until: is_blocked = True
-    else:
-        message_timestamps = [t for t in message_timestamps or [] if t > current_time - SPAM_TIME_WINDOW]
-        message_timestamps.append(current_time)
-        if len(message_timestamps) >= SPAM_MESSAGE_LIMIT:
-            is_blocked = True
-            set_spam_data(user_id, current_time + SPAM_BLOCK_DURATION, [])
-            try:
-                await update.message.reply_text(
-                    f"{update.effective_user.mention_html()} <b>You are blocked for {int(SPAM_BLOCK_DURATION/60)} min for spamming!</b>",
-                    parse_mode=constants.ParseMode.HTML
-                )
-            except: pass
-        else: set_spam_data(user_id, blocked_until, message_timestamps)
+    spam_block = chat_config.get(chat_id, 'spam_block')
+    is_blocked, just_blocked = record_message_for_spam(
+        chat_id, user_id, current_time, chat_config.get(chat_id, 'spam_limit'), chat_config.get(chat_id, 'spam_window'), spam_block)
+    if just_blocked:
+        try:
+            await update.message.reply_text(
+                f"{update.effective_user.mention_html()} <b>You are blocked for {int(spam_block/60)} min for spamming!</b>",
+                parse_mode=constants.ParseMode.HTML
+            )
+        except: pass
 
     # --- 2. Registration and Quiz/Hustle Check ---
-    register_chat(update)
+    register_chat_once(update)
     
     if is_blocked: return
     
@@ -911,47 +1247,94 @@ async def send_quiz_after_n_messages(update: Update, context: ContextTypes.DEFAU
         logger.info(f"Message from {user_id} was a Word Hustle guess. Skipping quiz trigger.")
         return
 
-    # --- 4. Check for Quiz Trigger ---
-    # (Sirf tab run hoga jab message ek hustle guess NAHI tha)
-    last_quiz_time = get_bot_value(LAST_GLOBAL_QUIZ_KEY, 0)
-    
-    if current_time - last_quiz_time > GLOBAL_QUIZ_COOLDOWN:
-        # 💡 FIX: Yahan se Word Hustle check hata diya gaya hai
-        # Ab broadcast *hamesha* trigger hoga agar cooldown poora ho gaya hai.
-        
-        if not check_and_set_bot_lock(LOCK_KEY):
-            logger.info("Quiz trigger attempted, but lock is already held."); return 
-        
-        logger.info(f"Global quiz cooldown over. Triggered by user {user_id}. ACQUIRING LOCK.")
-        
-        asyncio.create_task(staggered_broadcast_job(context))
-        
-        logger.info(f"Created background task for staggered broadcast. Handler is now free.")
-    else:
-        pass
+    # --- 4. Quiz Scheduling ---
+    # (Sirf tab count hoga jab message ek hustle guess NAHI tha)
+    # Chat ka apna cooldown hai; poll quiz_scheduler_job bhejta hai, handler sirf activity note karta hai
+    quiz_schedule.note_activity(chat_id, current_time)
 
 
 # ======================================================================
 # --- 🚀 MAIN EXECUTION ---
 # ======================================================================
 
-def main(): 
-    if not TOKEN or not WEBHOOK_URL or not DATABASE_URL:
-        logger.critical("FATAL ERROR: Environment variables missing (TOKEN, WEBHOOK_URL, or DATABASE_URL).")
-        return
-        
-    setup_database()
-
-    application = (
+async def post_init(application: Application):
+    # Bot identity (get_me) initialize() mein ek hi baar fetch hoti hai, handlers context.bot.first_name use karte hain
+    logger.info(f"Running as @{application.bot.username}.")
+    warm_state = snapshot.read_snapshot(snapshot_file())
+    if warm_state: restore_snapshot(warm_state)
+    file_id_cache.load_cache(get_bot_value(FILE_ID_CACHE_KEY, {}))
+    reload_chat_settings()
+    application.job_queue.run_repeating(save_media_caches_job, interval=MEDIA_CACHE_SAVE_INTERVAL, first=MEDIA_CACHE_SAVE_INTERVAL)
+    if workers.WORKER_COUNT > 1:
+        application.job_queue.run_repeating(sync_cache_versions_job, interval=CACHE_SYNC_INTERVAL, first=0)
+    application.job_queue.run_repeating(quiz_scheduler_job, interval=QUIZ_TICK_INTERVAL, first=QUIZ_TICK_INTERVAL)
+    application.job_queue.run_repeating(activity_flush_job, interval=activity.ACTIVITY_FLUSH_INTERVAL, first=activity.ACTIVITY_FLUSH_INTERVAL)
+    application.job_queue.run_repeating(score_rollup_job, interval=SCORE_ROLLUP_INTERVAL, first=SCORE_ROLLUP_INTERVAL)
+    application.job_queue.run_repeating(error_digest_job, interval=errors.ERROR_DIGEST_INTERVAL, first=errors.ERROR_DIGEST_INTERVAL)
+    if METRICS_PORT:
+        application.job_queue.run_repeating(metrics_gauges_job, interval=METRICS_COLLECT_INTERVAL, first=0)
+    mark_boot_phase('post_init')
+    application.job_queue.run_once(boot_report_job, when=0) # Job queue webhook bind hone ke baad start hoti hai
+
+async def post_shutdown(application: Application):
+    save_media_caches()
+    flush_activity_counts()
+    save_snapshot()
+    checkpoint_video_counter()
+
+def collect_state_metrics():
+    metrics.ACTIVE_HUSTLE_GAMES.set(count_hustle_games())
+    metrics.OPEN_QUIZ_POLLS.set(count_quiz_polls())
+
+def collect_queue_metrics():
+    stable_horde = sys.modules.get('stable_horde')
+    gen_stats = stable_horde.get_queue_stats() if stable_horde else {'queued': 0, 'inflight': 0}
+    metrics.QUEUE_DEPTH.set(gen_stats['queued'], 'gen_pending')
+    metrics.QUEUE_DEPTH.set(gen_stats['inflight'], 'gen_inflight')
+    if isinstance(_update_processor, ingest.FairUpdateProcessor):
+        ingest_stats = _update_processor.stats()
+        metrics.QUEUE_DEPTH.set(ingest_stats['pending'], 'ingest_pending')
+        metrics.QUEUE_DEPTH.set(ingest_stats['running'], 'ingest_running')
+    metrics.QUEUE_DEPTH.set(quiz_schedule.overdue(), 'quiz_due')
+
+def is_low_value_update(update):
+    """Queue bharne par sabse pehle chhodne layak: group ki aam chatter jo command ya hustle guess nahi ho sakti."""
+    message = update.message if isinstance(update, Update) else None
+    if not message or not message.text or message.chat.type not in (constants.ChatType.GROUP, constants.ChatType.SUPERGROUP):
+        return False
+    text = message.text.strip()
+    if text.startswith('/'): return False
+    # Chalte game ki length (beech mein word_length badli ho toh bhi guesses na girein); peek only, LRU order nahi badalta
+    game = _hustle_games.get(str(message.chat.id))
+    word_length = len(game['word']) if game else chat_config.get(message.chat.id, 'word_length')
+    return not (len(text) == word_length and text.isalpha())
+
+def build_application(token=TOKEN, base_url=None, concurrent_updates=None, webhook=True):
+    """
+    Saare handlers ke saath Application banata hai (webhook start nahi karta).
+    Default update processor ingest.FairUpdateProcessor hai (bounded queue, per-chat fairness, load shedding).
+    base_url / concurrent_updates load harness (loadtest.py) fake Bot API ke liye override karta hai.
+    webhook=False: updater ke bina (workers.py ke worker processes, jinhe updates dispatcher deta hai).
+    """
+    # Profiling mode mein Bot API calls bhi time hoti hain (update breakdown ka 'telegram' hissa)
+    request_class = profiling.TimedRequest if profiling.PROFILING_ENABLED else HTTPXRequest
+    global _update_processor
+    if concurrent_updates is None:
+        concurrent_updates = ingest.FairUpdateProcessor(is_low_value=is_low_value_update)
+    _update_processor = concurrent_updates
+    builder = (
         Application.builder()
-        .token(TOKEN)
-        .concurrent_updates(True)
-        .connect_timeout(10)   
-        .read_timeout(15)      
-        .write_timeout(15)     
-        .http_version('1.1')
-        .build()
+        .token(token)
+        .concurrent_updates(concurrent_updates)
+        .request(request_class(connect_timeout=10, read_timeout=15, write_timeout=15, http_version='1.1'))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
     )
+    if base_url:
+        builder = builder.base_url(base_url)
+    if not webhook:
+        builder = builder.updater(None)
+    application = builder.build()
     
     application.add_error_handler(error_handler)
     
@@ -970,13 +1353,18 @@ def main():
     application.add_handler(CommandHandler("myscore", myscore_command))
     application.add_handler(CommandHandler("hustle", start_hustle_game)) # Word Hustle
     application.add_handler(CommandHandler("stophustle", stop_hustle_game)) # 💡 NEW
+    application.add_handler(CommandHandler("hint", hint_command)) # Word Hustle hint (feedback matrix)
+    application.add_handler(CommandHandler("settings", settings_command)) # Group admins: per-chat settings
     
     # Utility Commands (Owner commands added here)
     application.add_handler(CommandHandler("img", img_command))
     application.add_handler(CommandHandler("gen", gen_command))
     application.add_handler(CommandHandler("get_id", get_id_command))
-    application.add_handler(CommandHandler("release_lock", release_lock_command))
     application.add_handler(CommandHandler("timer_status", timer_status_command)) # Owner Command
+    application.add_handler(CommandHandler("pyprofile", pyprofile_command)) # Owner Command
+    application.add_handler(CommandHandler("slowqueries", slow_queries_command)) # Owner Command
+    application.add_handler(CommandHandler("export", export_command)) # Owner Command
+    application.add_handler(CommandHandler("import", import_command)) # Owner Command
 
     # Message Handlers
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, welcome_new_member))
@@ -993,8 +1381,40 @@ def main():
         )
     )
     
+    # 💡 Har registered handler ki latency /metrics mein jaati hai
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = metrics.track_handler(handler.callback)
+            if profiling.PROFILING_ENABLED:
+                handler.callback = profiling.profile_handler(handler.callback)
+    # Dedup metrics wrapper ke bahar hai: ApplicationHandlerStop koi handler error nahi hai
+    application.add_handler(TypeHandler(Update, drop_duplicate_updates), group=-1)
+    if profiling.PROFILING_ENABLED:
+        logger.info(f"Profiling mode ON (slow update > {profiling.SLOW_UPDATE_THRESHOLD * 1000:.0f}ms, slow query > {profiling.SLOW_QUERY_THRESHOLD * 1000:.0f}ms).")
+    return application
+
+def main(): 
+    if not TOKEN or not WEBHOOK_URL or not DATABASE_URL:
+        logger.critical("FATAL ERROR: Environment variables missing (TOKEN, WEBHOOK_URL, or DATABASE_URL).")
+        return
+        
+    setup_database()
+    mark_boot_phase('database')
     PORT = int(os.environ.get("PORT", "8000")) 
     
+    if workers.WORKER_COUNT > 1:
+        if isinstance(get_store(), storage.MemoryStorage):
+            logger.critical("FATAL ERROR: BOT_WORKERS > 1 needs a shared database (postgres:// or sqlite:///), not memory://.")
+            return
+        logger.info(f"Starting multi-worker mode with {workers.WORKER_COUNT} workers...")
+        workers.run_dispatcher(TOKEN, f"{WEBHOOK_URL}/{TOKEN}", PORT, METRICS_PORT, METRICS_HOST)
+        return
+    
+    application = build_application()
+    mark_boot_phase('build_application')
+    if METRICS_PORT:
+        metrics.start_metrics_server(METRICS_PORT, METRICS_HOST)
+    
     logger.info("Starting FULL Bot (Game-focused, NATIVE QUIZ POLLS, Word Hustle)...")
     application.run_webhook(
         listen="0.0.0.0",
@@ -1006,5 +1426,7 @@ def main():
 if __name__ == "__main__":
     try:
         main()
-    except (KeyboardInterrupt, SystemExit):
+    except (KeyboardInterrupt, SystemExit) as e:
+        if isinstance(e, SystemExit) and e.code: # Dispatcher ka worker crash loop: platform ko non-zero exit dikhe
+            raise
         logger.info("Bot shutdown gracefully.")
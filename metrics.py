@@ -0,0 +1,235 @@
+# metrics.py (In-process counters + Prometheus text format /metrics endpoint)
+
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock() # DB helpers worker threads se bhi call ho sakte hain
+_registry = []
+_collectors = [] # Scrape se pehle chalne wale callbacks (queue depth jaise gauges ke liye)
+
+# Profiling mode mein har update ke liye DB/HTTP/Telegram time yahan jama hota hai (profiling.py set karta hai)
+update_breakdown = contextvars.ContextVar('update_breakdown', default=None)
+
+
+def _label_str(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = [f'{name}="{_escape(value)}"' for name, value in pairs]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help_text, self.label_names = name, help_text, tuple(labels)
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        return [f"{self.name}{_label_str(self.label_names, lv)} {v}" for lv, v in sorted(self.values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, *label_values):
+        with _lock:
+            self.values[label_values] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help_text, self.label_names = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {} # label_values -> [bucket_counts, sum, count]
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        with _lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *label_values):
+        entry = self.values.get(label_values)
+        return entry[2] if entry else 0
+
+    def total(self, *label_values):
+        entry = self.values.get(label_values)
+        return entry[1] if entry else 0.0
+
+    def quantile(self, q, *label_values):
+        """Bucket counts se quantile ka linear-interpolated estimate (Prometheus histogram_quantile jaisa)."""
+        entry = self.values.get(label_values)
+        if not entry or not entry[2]:
+            return None
+        rank = q * entry[2]
+        prev_bound, prev_count = 0.0, 0
+        for bound, cumulative in zip(self.buckets, entry[0]):
+            if cumulative >= rank:
+                in_bucket = cumulative - prev_count
+                return prev_bound + (bound - prev_bound) * ((rank - prev_count) / in_bucket if in_bucket else 1)
+            prev_bound, prev_count = bound, cumulative
+        return self.buckets[-1]
+
+    def render(self):
+        lines = []
+        for lv, (bucket_counts, total, count) in sorted(self.values.items()):
+            for bound, cumulative in zip(self.buckets, bucket_counts):
+                lines.append(f"{self.name}_bucket{_label_str(self.label_names, lv, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_str(self.label_names, lv, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_label_str(self.label_names, lv)} {total}")
+            lines.append(f"{self.name}_count{_label_str(self.label_names, lv)} {count}")
+        return lines
+
+
+# --- Bot metrics ---
+HANDLER_LATENCY = Histogram("bot_handler_duration_seconds", "Time spent in each update handler.", ["handler"])
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Exceptions raised by each update handler.", ["handler"])
+DB_QUERIES = Counter("bot_db_queries_total", "DB helper calls.", ["helper"])
+DB_LATENCY = Histogram("bot_db_query_duration_seconds", "Time spent in each DB helper.", ["helper"])
+HTTP_LATENCY = Histogram("bot_http_request_duration_seconds", "Outbound API request latency per host.", ["host"])
+HTTP_ERRORS = Counter("bot_http_request_errors_total", "Failed outbound API requests per host.", ["host"])
+BROADCAST_MESSAGES = Counter("bot_broadcast_messages_total", "Broadcast messages by result.", ["kind", "result"])
+BROADCAST_DURATION = Histogram("bot_broadcast_duration_seconds", "Duration of a full broadcast run.", ["kind"], buckets=(10, 30, 60, 120, 300, 600, 1800, 3600))
+ACTIVE_HUSTLE_GAMES = Gauge("bot_active_hustle_games", "Running Word Hustle games.")
+OPEN_QUIZ_POLLS = Gauge("bot_open_quiz_polls", "Quiz polls tracked for answers.")
+QUEUE_DEPTH = Gauge("bot_queue_depth", "Items waiting in internal queues.", ["queue"])
+UPDATES_SHED = Counter("bot_updates_shed_total", "Updates dropped by the ingestion stage under load.", ["reason"])
+DUPLICATE_UPDATES = Counter("bot_duplicate_updates_total", "Redelivered updates dropped before any handler ran.", ["stage"])
+ERRORS_REPORTED = Counter("bot_errors_total", "Exceptions reaching the error handler, by type and whether the full payload was logged.", ["type", "sampled"])
+DISPATCHED_UPDATES = Counter("bot_dispatched_updates_total", "Webhook updates routed by the multi-worker dispatcher.", ["worker", "result"])
+WORKER_RESTARTS = Counter("bot_worker_restarts_total", "Worker processes restarted by the dispatcher after dying.", ["worker"])
+
+
+def track_handler(callback):
+    """Async handler ko wrap karke latency aur errors record karta hai."""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - start, name)
+    return wrapper
+
+
+def track_db(func):
+    """DB helper (sync) ka call count aur duration record karta hai."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_QUERIES.inc(name)
+            DB_LATENCY.observe(elapsed, name)
+            add_update_time('db', elapsed)
+    return wrapper
+
+
+@contextmanager
+def track_http(url):
+    host = urlparse(url).hostname or "unknown"
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        HTTP_ERRORS.inc(host)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        HTTP_LATENCY.observe(elapsed, host)
+        add_update_time('http', elapsed)
+
+
+def add_update_time(kind, seconds):
+    breakdown = update_breakdown.get()
+    if breakdown is not None:
+        breakdown[kind] += seconds
+        breakdown[f"{kind}_calls"] += 1
+
+
+def register_collector(callback):
+    _collectors.append(callback)
+
+
+def collect():
+    for callback in _collectors:
+        try:
+            callback()
+        except Exception as e:
+            logger.warning(f"Metrics collector {callback.__name__} failed: {e}")
+
+
+def render():
+    collect()
+    lines = []
+    with _lock:
+        for metric in _registry:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Har scrape par access log nahi chahiye
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """/metrics endpoint ek daemon thread mein start karta hai (webhook server se alag port par)."""
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,118 @@
+# pexels.py (/img ke liye Pexels search + query result cache)
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+
+import requests
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PEXELS_SEARCH_URL = "https://api.pexels.com/v1/search"
+PEXELS_PER_PAGE = 15
+PEXELS_CACHE_SIZE = 500 # Itni alag queries ke result sets memory mein
+PEXELS_CACHE_TTL = 6 * 3600 # 6 ghante baad fresh results laao
+PEXELS_HOURLY_QUOTA = 180 # Pexels 200/hour deta hai, thoda margin rakha
+
+_cache = OrderedDict() # normalized query -> {'photos': [...], 'fetched_at': ts}
+_recent_requests = deque() # Pichle 1 ghante ke API call timestamps
+_blocked_until = 0 # X-Ratelimit-Remaining 0 hone par reset time tak ruko
+_in_flight = {} # normalized query -> chal raha fetch (asyncio.Task); ek query ke liye ek hi API call
+cache_dirty = False
+
+
+class PexelsRateLimited(Exception):
+    pass
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def _quota_available(now):
+    while _recent_requests and _recent_requests[0] < now - 3600:
+        _recent_requests.popleft()
+    return now >= _blocked_until and len(_recent_requests) < PEXELS_HOURLY_QUOTA
+
+
+def _store(key, photos, fetched_at):
+    global cache_dirty
+    _cache[key] = {'photos': photos, 'fetched_at': fetched_at}
+    _cache.move_to_end(key)
+    while len(_cache) > PEXELS_CACHE_SIZE:
+        _cache.popitem(last=False)
+    cache_dirty = True
+
+
+async def _fetch_photos(query, api_key):
+    global _blocked_until
+    _recent_requests.append(time.time())
+    with metrics.track_http(PEXELS_SEARCH_URL):
+        response = await asyncio.to_thread(
+            requests.get, PEXELS_SEARCH_URL,
+            params={'query': query, 'per_page': PEXELS_PER_PAGE},
+            headers={"Authorization": api_key}, timeout=5
+        )
+    remaining = response.headers.get('X-Ratelimit-Remaining')
+    if response.status_code == 429 or remaining == '0':
+        _blocked_until = float(response.headers.get('X-Ratelimit-Reset') or time.time() + 3600)
+        logger.warning(f"Pexels rate limit reached, pausing API calls until {_blocked_until}.")
+    response.raise_for_status()
+    return [photo['src']['large'] for photo in response.json().get('photos', [])]
+
+
+async def _refresh(key, api_key, now):
+    _store(key, await _fetch_photos(key, api_key), now)
+    return _cache[key]
+
+
+async def search_photo(query, api_key):
+    """
+    Query ke liye ek random photo URL deta hai (cache se agar ho sake).
+    Koi result na mile toh None. Quota khatam aur cache khaali ho toh PexelsRateLimited.
+    """
+    key = normalize_query(query)
+    now = time.time()
+    entry = _cache.get(key)
+
+    if entry and now - entry['fetched_at'] < PEXELS_CACHE_TTL:
+        _cache.move_to_end(key)
+    elif key in _in_flight or _quota_available(now):
+        # Single-flight: same query par saath aaye misses pehle wale fetch ka hi result lete hain
+        task = _in_flight.get(key)
+        if task is None:
+            task = _in_flight[key] = asyncio.ensure_future(_refresh(key, api_key, now))
+            task.add_done_callback(lambda _: _in_flight.pop(key, None))
+        try:
+            entry = await asyncio.shield(task) # Ek caller cancel ho toh baaki ka fetch na ruke
+        except Exception:
+            if not entry: raise
+            logger.warning(f"Pexels fetch failed for '{key}', serving stale cached results.")
+    elif not entry:
+        raise PexelsRateLimited()
+    # else: quota khatam hai, purane (stale) results hi serve karo
+
+    if not entry['photos']:
+        return None
+    return random.choice(entry['photos'])
+
+
+def export_cache():
+    """Persistence ke liye cache ko JSON-friendly dict mein deta hai."""
+    global cache_dirty
+    cache_dirty = False
+    return {key: entry for key, entry in _cache.items()}
+
+
+def load_cache(data):
+    now = time.time()
+    for key, entry in (data or {}).items():
+        if now - entry.get('fetched_at', 0) < PEXELS_CACHE_TTL:
+            _cache[key] = entry
+    while len(_cache) > PEXELS_CACHE_SIZE:
+        _cache.popitem(last=False)
+    logger.info(f"Loaded {len(_cache)} cached Pexels queries.")
@@ -0,0 +1,121 @@
+# profiling.py (Opt-in hot-path profiling: slow update log, slow query log, cProfile capture)
+
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import time
+from collections import deque
+
+from telegram.request import HTTPXRequest
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.environ.get('BOT_PROFILE', '').lower() in ('1', 'true', 'yes')
+SLOW_UPDATE_THRESHOLD = float(os.environ.get('BOT_PROFILE_SLOW_UPDATE_MS', '500')) / 1000
+SLOW_QUERY_THRESHOLD = float(os.environ.get('BOT_PROFILE_SLOW_QUERY_MS', '100')) / 1000
+MAX_CAPTURE_SECONDS = 300
+
+slow_queries = deque(maxlen=200) # (timestamp, duration, sql) - owner ke liye recent slow queries
+_capture_running = False
+
+
+def _new_breakdown():
+    return {'db': 0.0, 'db_calls': 0, 'http': 0.0, 'http_calls': 0, 'telegram': 0.0, 'telegram_calls': 0}
+
+
+def profile_handler(callback):
+    """Handler ke har call ka DB/HTTP/Telegram breakdown banata hai aur slow updates log karta hai."""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context, *args, **kwargs):
+        breakdown = _new_breakdown()
+        token = metrics.update_breakdown.set(breakdown)
+        start = time.perf_counter()
+        try:
+            return await callback(update, context, *args, **kwargs)
+        finally:
+            total = time.perf_counter() - start
+            metrics.update_breakdown.reset(token)
+            if total >= SLOW_UPDATE_THRESHOLD:
+                other = max(0.0, total - breakdown['db'] - breakdown['http'] - breakdown['telegram'])
+                logger.warning(
+                    f"SLOW UPDATE {getattr(update, 'update_id', '?')} in {name}: {total * 1000:.0f}ms "
+                    f"(db {breakdown['db'] * 1000:.0f}ms/{breakdown['db_calls']} calls, "
+                    f"http {breakdown['http'] * 1000:.0f}ms/{breakdown['http_calls']} calls, "
+                    f"telegram {breakdown['telegram'] * 1000:.0f}ms/{breakdown['telegram_calls']} calls, "
+                    f"other {other * 1000:.0f}ms)"
+                )
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def timed_cursor_class():
+    """TimedCursor class banata hai; psycopg2 sirf Postgres backend + profiling par import hota hai."""
+    import psycopg2.extensions
+
+    class TimedCursor(psycopg2.extensions.cursor):
+        """Har SQL statement time karta hai; SLOW_QUERY_THRESHOLD se slow queries log hoti hain."""
+
+        def execute(self, query, vars=None):
+            start = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                elapsed = time.perf_counter() - start
+                if elapsed >= SLOW_QUERY_THRESHOLD:
+                    sql = " ".join(query.split()) if isinstance(query, str) else str(query)
+                    slow_queries.append((time.time(), elapsed, sql))
+                    logger.warning(f"SLOW QUERY {elapsed * 1000:.0f}ms: {sql}")
+
+    return TimedCursor
+
+
+class TimedRequest(HTTPXRequest):
+    """Bot API calls ka time current update ke breakdown mein 'telegram' ke under jodta hai."""
+
+    async def do_request(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().do_request(*args, **kwargs)
+        finally:
+            metrics.add_update_time('telegram', time.perf_counter() - start)
+
+
+async def capture_profile(seconds, limit=40):
+    """
+    Event loop thread ko `seconds` tak cProfile karta hai aur pstats text report deta hai.
+    Ek time par ek hi capture chal sakta hai.
+    """
+    global _capture_running
+    if _capture_running:
+        return None
+    _capture_running = True
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        await asyncio.sleep(min(seconds, MAX_CAPTURE_SECONDS))
+    finally:
+        profiler.disable()
+        _capture_running = False
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
+    return out.getvalue()
+
+
+def format_slow_queries(limit=20):
+    if not slow_queries:
+        return "No slow queries recorded."
+    lines = []
+    for ts, elapsed, sql in list(slow_queries)[-limit:]:
+        lines.append(f"{time.strftime('%H:%M:%S', time.localtime(ts))} {elapsed * 1000:.0f}ms {sql}")
+    return "\n".join(lines)
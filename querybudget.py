@@ -0,0 +1,176 @@
+# querybudget.py (Per-handler I/O budget: har update type kitni DB calls, DB connections, HTTP aur Bot API calls karta hai)
+#
+# Performance regressions yahan aksar aise aate hain ki koi handler chupke se ek aur get_bot_value ya
+# get_db_connection() round-trip le leta hai. Yeh script bot ka asli Application (main.build_application) chalati hai,
+# Bot API calls loadtest.FakeBotAPI par jaati hain, aur har scenario ke updates ek-ek karke process hote hain.
+# Har measured update ki ginti BUDGETS se compare hoti hai; koi bhi budget se upar gaya toh exit 1 (CI mein lagao).
+#
+# Usage:
+#   DATABASE_URL=memory:// python querybudget.py                     # DB helper calls, HTTP, Bot API
+#   DATABASE_URL=postgres://localhost/bot_budget python querybudget.py   # + asli DB connections
+#   python querybudget.py -k hustle --json budget.json
+#
+# Budget badhana ho toh BUDGETS mein badlo - review mein dikhega ki kis handler ne nayi I/O li.
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+
+from telegram import Update
+
+import db_manager
+import loadtest
+import main
+import metrics
+import snapshot
+
+# Scenario -> per update maximum. db = @track_db helper calls, connections = Postgres get_db_connection() calls
+# (doosre backends par 0), http = metrics.track_http calls (opentdb, word API, pexels...), api = Bot API requests.
+BUDGETS = {
+    'chatter (known user)': {'db': 0, 'connections': 0, 'http': 0, 'api': 0},
+    'chatter (new user)': {'db': 1, 'connections': 1, 'http': 0, 'api': 0},
+    'hustle guess (wrong)': {'db': 2, 'connections': 2, 'http': 0, 'api': 1},
+    'hustle guess (win)': {'db': 2, 'connections': 2, 'http': 0, 'api': 1},
+    '/hustle (already running)': {'db': 0, 'connections': 0, 'http': 0, 'api': 1},
+    'poll answer (first)': {'db': 3, 'connections': 3, 'http': 0, 'api': 1},
+    'poll answer (repeat)': {'db': 1, 'connections': 1, 'http': 0, 'api': 0},
+    '/ranking': {'db': 1, 'connections': 1, 'http': 0, 'api': 1},
+    '/ranking daily': {'db': 1, 'connections': 1, 'http': 0, 'api': 1},
+    'leaderboard page button': {'db': 1, 'connections': 1, 'http': 0, 'api': 2},
+    '/myscore': {'db': 1, 'connections': 1, 'http': 0, 'api': 1},
+    '/profile': {'db': 1, 'connections': 1, 'http': 0, 'api': 1},
+}
+SAMPLES = 5 # Har scenario ke itne updates; budget har ek par lagta hai (max dekha jaata hai)
+WARM_USERS = 100 # Score wale, pehle dekhe gaye users; har sample alag user (warna SPAM_MESSAGE_LIMIT lag jaata hai)
+
+CHAT_ID = -1002000000001
+POLL_ID = "budgetpoll"
+
+
+class IOCounter:
+    """Saare counters ka snapshot; diff() pichle snapshot se ab tak ki ginti."""
+
+    def __init__(self, fake_api, store):
+        self.fake_api = fake_api
+        self.connections = 0
+        if hasattr(store, 'get_db_connection'): # Postgres: har helper call apna connection kholta hai
+            connect = store.get_db_connection
+
+            def counted_connect():
+                self.connections += 1
+                return connect()
+            store.get_db_connection = counted_connect
+
+    def totals(self):
+        return {
+            'db': sum(metrics.DB_QUERIES.values.values()),
+            'connections': self.connections,
+            'http': sum(metrics.HTTP_LATENCY.count(*labels) for labels in list(metrics.HTTP_LATENCY.values)),
+            'api': sum(self.fake_api.calls.values()),
+        }
+
+
+def build_scenarios(factory):
+    """Scenario -> (setup, make_update). setup har sample se pehle chalta hai (counted nahi)."""
+    known_users = itertools.cycle(factory.user_ids[:WARM_USERS])
+    fresh_users = iter(factory.user_ids[WARM_USERS:])
+
+    def running_game():
+        main.save_hustle_game(CHAT_ID, {'word': loadtest.SECRET_WORD, 'running': True, 'guesses': []})
+
+    def open_poll():
+        main.add_quiz_poll(POLL_ID, 0)
+
+    def fresh_poll():
+        main.add_quiz_poll(f"{POLL_ID}-{factory.update_id}", 0)
+
+    return {
+        'chatter (known user)': (None, lambda: factory.group_message("hello everyone", CHAT_ID, next(known_users))),
+        'chatter (new user)': (None, lambda: factory.group_message("hello everyone", CHAT_ID, next(fresh_users))),
+        'hustle guess (wrong)': (running_game, lambda: factory.group_message("SLATE", CHAT_ID, next(known_users))),
+        'hustle guess (win)': (running_game, lambda: factory.group_message(loadtest.SECRET_WORD, CHAT_ID, next(known_users))),
+        '/hustle (already running)': (running_game, lambda: factory.group_message("/hustle", CHAT_ID, next(known_users))),
+        'poll answer (first)': (fresh_poll, lambda: factory.poll_answer(f"{POLL_ID}-{factory.update_id}", 0, next(known_users))),
+        'poll answer (repeat)': (open_poll, lambda: factory.poll_answer(POLL_ID, 0, next(known_users))),
+        '/ranking': (None, lambda: factory.group_message("/ranking", CHAT_ID, next(known_users))),
+        '/ranking daily': (None, lambda: factory.group_message("/ranking daily", CHAT_ID, next(known_users))),
+        'leaderboard page button': (None, lambda: factory.leaderboard_page(0)),
+        '/myscore': (None, lambda: factory.group_message("/myscore", CHAT_ID, next(known_users))),
+        '/profile': (None, lambda: factory.group_message("/profile", CHAT_ID, next(known_users))),
+    }
+
+
+async def measure(pattern=None, samples=SAMPLES):
+    """Returns {scenario: {'max': {...}, 'budget': {...}, 'over': [counter names]}}."""
+    fake_api = loadtest.FakeBotAPI()
+    await fake_api.start()
+    application = main.build_application(token=loadtest.FAKE_TOKEN, base_url=f"http://127.0.0.1:{fake_api.port}/bot", webhook=False)
+    await application.initialize()
+    await application.post_init(application) # Jobs schedule hote hain par job queue start nahi hoti, isliye chalte nahi
+    main.quiz_schedule.pause(3600)
+    counter = IOCounter(fake_api, main.get_store())
+
+    factory = loadtest.UpdateFactory(groups=1, users=WARM_USERS + 500, seed=1)
+    factory.group_ids = [CHAT_ID]
+    main.add_quiz_poll(POLL_ID, 0)
+    # Warm-up: chat aur known users pehle dekh liye gaye hon (steady state), first-time loads count na hon
+    for user_id in factory.user_ids[:WARM_USERS]:
+        db_manager.set_user_score(user_id, 10, first_name=f"User{user_id % 10000}", username=f"user{user_id}")
+        await application.process_update(Update.de_json(factory.group_message("hi", CHAT_ID, user_id), application.bot))
+        await application.process_update(Update.de_json(factory.poll_answer(POLL_ID, 0, user_id), application.bot))
+
+    results = {}
+    for name, (setup, make_update) in build_scenarios(factory).items():
+        if pattern and pattern not in name:
+            continue
+        worst = dict.fromkeys(BUDGETS[name], 0)
+        for _ in range(samples):
+            if setup: setup()
+            data = make_update()
+            before = counter.totals()
+            await application.process_update(Update.de_json(data, application.bot))
+            after = counter.totals()
+            for key in worst:
+                worst[key] = max(worst[key], after[key] - before[key])
+        over = [key for key, limit in BUDGETS[name].items() if worst[key] > limit]
+        results[name] = {'max': worst, 'budget': BUDGETS[name], 'over': over}
+
+    await application.shutdown()
+    await fake_api.stop()
+    return results
+
+
+def print_results(results):
+    keys = ('db', 'connections', 'http', 'api')
+    print(f"\n{'scenario':28}" + "".join(f"{key:>14}" for key in keys))
+    for name, result in results.items():
+        cells = "".join(f"{result['max'][key]:>6} / {result['budget'][key]:<5}{'!' if key in result['over'] else ' '}" for key in keys)
+        print(f"{name:28}{cells}")
+    failed = [name for name, result in results.items() if result['over']]
+    print(f"\n{len(results) - len(failed)}/{len(results)} scenarios within budget" + (f"; OVER: {', '.join(failed)}" if failed else ""))
+    return failed
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Check per-handler DB/HTTP/Bot API call budgets.")
+    parser.add_argument("-k", dest="pattern", help="only scenarios whose name contains this text")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--json", dest="json_path", help="write measured counts as JSON to this file")
+    parser.add_argument("--allow-remote-db", action="store_true")
+    args = parser.parse_args(argv)
+
+    loadtest.check_database_is_local(args.allow_remote_db)
+    snapshot.SNAPSHOT_DIR = loadtest.tempfile.mkdtemp(prefix="querybudget_snapshot_") # Cold start, jaisa loadtest mein
+    main.setup_database()
+    results = asyncio.run(measure(args.pattern, args.samples))
+    failed = print_results(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
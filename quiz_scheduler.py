@@ -0,0 +1,125 @@
+# quiz_scheduler.py (Per-chat quiz scheduling: har chat ka apna cooldown, heap mein next-due time)
+#
+# Pehle ek global cooldown tha: 10 minute baad koi bhi ek message saare chats mein ek saath broadcast
+# shuru kar deta tha. Ab har chat apne hisaab se chalta hai:
+# - Chat mein last quiz ke baad QUIZ_MIN_MESSAGES messages aa jaayein tabhi woh schedule hota hai
+#   (quiet chats ko poll nahi milte, busy chats ko har cooldown par).
+# - Due time = last quiz + cooldown (+/- jitter). Pehli baar dekhe gaye chats ka due time 0..cooldown
+#   mein random hota hai, taaki restart ke baad saare chats ek saath due na hon.
+# - Heap se har tick par sirf `limit` due chats nikalte hain, isliye sends time mein phaile rehte hain.
+#
+# Cooldown per chat alag ho sakta hai (cooldown_for callback, main.py mein /settings ka quiz_cooldown).
+#
+# Chat ka saara state isi process mein rehta hai (multi-worker mode mein chat hamesha ek hi worker par aata hai).
+
+import heapq
+import itertools
+import random
+import time
+
+QUIZ_CHAT_COOLDOWN = 600 # Ek chat mein do quizzes ke beech kam se kam itna time
+QUIZ_MIN_MESSAGES = 3 # Last quiz ke baad itne messages aayein tabhi agla quiz
+QUIZ_JITTER = 0.2 # Cooldown +/- 20%
+
+
+class QuizScheduler:
+    """Next-due time ke hisaab se min-heap; stale heap entries lazily skip hoti hain."""
+
+    def __init__(self, cooldown=QUIZ_CHAT_COOLDOWN, min_messages=QUIZ_MIN_MESSAGES, jitter=QUIZ_JITTER, rng=None, cooldown_for=None):
+        self.cooldown = cooldown
+        self.cooldown_for = cooldown_for # chat_id -> cooldown; None = sab chats ka `cooldown`
+        self.min_messages = min_messages
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.paused_until = 0
+        self._heap = [] # (due, seq, chat_id)
+        self._seq = itertools.count()
+        self._due = {} # chat_id -> due time (heap mein sirf yahi entry valid hai)
+        self._activity = {} # chat_id -> last quiz ke baad messages
+        self._last_sent = {} # chat_id -> last quiz time
+
+    def __len__(self):
+        return len(self._due)
+
+    def _schedule(self, chat_id, due):
+        self._due[chat_id] = due
+        heapq.heappush(self._heap, (due, next(self._seq), chat_id))
+
+    def chat_cooldown(self, chat_id):
+        return self.cooldown_for(chat_id) if self.cooldown_for else self.cooldown
+
+    def next_cooldown(self, chat_id=None):
+        return self.chat_cooldown(chat_id) * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def note_activity(self, chat_id, now=None):
+        """Chat mein message aaya. Kaafi activity ho gayi ho toh chat ko heap mein daalta hai."""
+        activity = self._activity.get(chat_id, 0) + 1
+        self._activity[chat_id] = activity
+        if activity < self.min_messages or chat_id in self._due:
+            return
+        now = time.time() if now is None else now
+        last_sent = self._last_sent.get(chat_id)
+        if last_sent is None:
+            due = now + self.rng.uniform(0, self.chat_cooldown(chat_id))
+        else:
+            due = max(now, last_sent + self.next_cooldown(chat_id))
+        self._schedule(chat_id, due)
+
+    def pop_due(self, now=None, limit=1):
+        """Zyada se zyada `limit` chats jinka time ho gaya (sabse purane due pehle)."""
+        now = time.time() if now is None else now
+        if now < self.paused_until:
+            return []
+        chats = []
+        while self._heap and len(chats) < limit and self._heap[0][0] <= now:
+            due, _, chat_id = heapq.heappop(self._heap)
+            if self._due.get(chat_id) != due:
+                continue # Stale entry (chat reschedule ya forget ho chuka)
+            del self._due[chat_id]
+            chats.append(chat_id)
+        return chats
+
+    def mark_sent(self, chat_id, now=None):
+        """Quiz chala gaya: activity reset, agla quiz naye messages ke baad."""
+        self._last_sent[chat_id] = time.time() if now is None else now
+        self._activity[chat_id] = 0
+        self._due.pop(chat_id, None)
+
+    def forget(self, chat_id):
+        """Chat deactivate hua (bot nikala gaya) - saara state hatao."""
+        self._due.pop(chat_id, None)
+        self._activity.pop(chat_id, None)
+        self._last_sent.pop(chat_id, None)
+
+    def export_state(self):
+        """Snapshot (warm restart) ke liye JSON-safe state."""
+        return {
+            'due': list(self._due.items()),
+            'activity': [item for item in self._activity.items() if item[1]],
+            'last_sent': list(self._last_sent.items()),
+        }
+
+    def load_state(self, state):
+        """export_state ka ulta; heap dobara banta hai. Restart ke dauraan due ho chuke chats agle tick par jaate hain."""
+        self._activity.update((int(chat_id), count) for chat_id, count in state.get('activity', []))
+        self._last_sent.update((int(chat_id), sent) for chat_id, sent in state.get('last_sent', []))
+        for chat_id, due in state.get('due', []):
+            self._schedule(int(chat_id), due)
+
+    def pause(self, seconds):
+        self.paused_until = time.time() + seconds
+
+    def overdue(self, now=None):
+        """Kitne scheduled chats ka time ho chuka hai (backlog)."""
+        now = time.time() if now is None else now
+        return sum(1 for due in self._due.values() if due <= now)
+
+    def stats(self, now=None):
+        now = time.time() if now is None else now
+        next_due = min(self._due.values()) if self._due else None
+        return {
+            'scheduled': len(self._due),
+            'overdue': self.overdue(now),
+            'next_in': max(0, next_due - now) if next_due is not None else None,
+            'last_sent': max(self._last_sent.values()) if self._last_sent else None,
+        }
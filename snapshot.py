@@ -0,0 +1,63 @@
+# snapshot.py (Warm restart: graceful shutdown par hot in-memory state ki gzip JSON file, startup par fresh ho toh load)
+#
+# Deploy/restart ke baad naya process pehle updates par hustle games, spam windows waghera ke liye DB par toot padta tha.
+# Ab shutdown par main.build_snapshot() ka state yahan likha jaata hai aur agla process use SNAPSHOT_MAX_AGE ke andar
+# ho toh wapas load karta hai. Purana snapshot (ya doosre worker layout ka) ignore hota hai - tab normal cold start.
+# File ek baar padhne ke baad delete hoti hai, taaki crash ke baad wala restart purana state dobara na uthaye.
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'game_bot_snapshot'))
+SNAPSHOT_MAX_AGE = int(os.environ.get('SNAPSHOT_MAX_AGE', '300')) # Isse purana snapshot DB se peeche ho sakta hai
+SNAPSHOT_FORMAT = 2 # v2: spam windows (chat_id, user_id) par; purana snapshot ignore
+
+
+def snapshot_path(worker_index=None, worker_count=1):
+    """Har worker ki apni file (chat sharding same rahe tabhi uska state kaam ka hai)."""
+    name = "single" if worker_index is None else f"worker-{worker_index}-of-{worker_count}"
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json.gz")
+
+
+def write_snapshot(state, path):
+    """State atomically likhta hai (tmp file + rename). Returns bytes written, fail ho toh None."""
+    payload = json.dumps({'format': SNAPSHOT_FORMAT, 'created_at': time.time(), 'state': state}, separators=(',', ':')).encode()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wb', compresslevel=5) as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+    except OSError as e:
+        logger.warning(f"Could not write state snapshot to {path}: {e}")
+        return None
+
+
+def read_snapshot(path, max_age=SNAPSHOT_MAX_AGE, now=None):
+    """Fresh snapshot ka state (aur file delete); na ho, purana ho ya kharab ho toh None."""
+    if not os.path.exists(path):
+        return None
+    now = time.time() if now is None else now
+    try:
+        with gzip.open(path, 'rb') as f:
+            snapshot = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable state snapshot {path}: {e}")
+        snapshot = None
+    finally:
+        try: os.remove(path)
+        except OSError: pass
+    if not snapshot or snapshot.get('format') != SNAPSHOT_FORMAT:
+        return None
+    age = now - snapshot.get('created_at', 0)
+    if not 0 <= age <= max_age:
+        logger.info(f"State snapshot is {age:.0f}s old (max {max_age}s), starting cold.")
+        return None
+    return snapshot['state']
@@ -0,0 +1,320 @@
+# stable_horde.py (Stable Horde /gen job manager: bounded queue + single poller)
+
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict
+
+import requests
+from telegram import constants
+from telegram.helpers import escape_markdown
+
+import file_id_cache
+import metrics
+
+logger = logging.getLogger(__name__)
+
+HORDE_API_BASE = "https://stablehorde.net/api/v2"
+HORDE_CLIENT_AGENT = "TelegramBot/1.0"
+
+GEN_QUEUE_MAXSIZE = 20 # Itne se zyada jobs pending hon toh naya /gen reject
+GEN_MAX_PER_USER = 1 # Ek user ke ek time par max jobs (queued + running)
+GEN_MAX_INFLIGHT = 5 # Horde par ek saath kitni generations submit ho sakti hain
+GEN_TIMEOUT = 300 # 5 minute baad job ko fail maan lo
+POLL_MIN_INTERVAL = 2
+POLL_MAX_INTERVAL = 15
+RESULT_CACHE_SIZE = 200
+RESULT_CACHE_TTL = 1800 # Horde ke image URLs kuch der hi valid rehte hain
+
+_queue = None # asyncio.Queue, pehli /gen par bana (running loop chahiye)
+_inflight = {} # generation_id -> job
+_jobs_by_prompt = {} # normalized prompt -> job (queued ya running)
+_user_jobs = Counter()
+_result_cache = OrderedDict() # normalized prompt -> (img_url, cached_at)
+_poll_wakeup = None
+_inflight_slots = None
+_tasks = []
+
+
+def normalize_prompt(prompt):
+    return " ".join(prompt.lower().split())
+
+
+def get_cached_result(prompt):
+    """Same prompt ka recent result (img URL) cache se deta hai, warna None."""
+    key = normalize_prompt(prompt)
+    entry = _result_cache.get(key)
+    if not entry:
+        return None
+    img_url, cached_at = entry
+    if time.time() - cached_at > RESULT_CACHE_TTL:
+        del _result_cache[key]
+        return None
+    _result_cache.move_to_end(key)
+    return img_url
+
+
+def _cache_result(prompt_key, img_url):
+    _result_cache[prompt_key] = (img_url, time.time())
+    _result_cache.move_to_end(prompt_key)
+    while len(_result_cache) > RESULT_CACHE_SIZE:
+        _result_cache.popitem(last=False)
+
+
+def get_queue_stats():
+    return {
+        'queued': _queue.qsize() if _queue else 0,
+        'inflight': len(_inflight),
+        'cached_results': len(_result_cache),
+    }
+
+
+def _ensure_started():
+    global _queue, _poll_wakeup, _inflight_slots
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue(maxsize=GEN_QUEUE_MAXSIZE)
+    _poll_wakeup = asyncio.Event()
+    _inflight_slots = asyncio.Semaphore(GEN_MAX_INFLIGHT)
+    _tasks.append(asyncio.create_task(_submit_worker()))
+    _tasks.append(asyncio.create_task(_poll_loop()))
+    logger.info("Stable Horde job manager started.")
+
+
+def queue_generation(prompt, user_id, api_key, status_msg, reply_to):
+    """
+    /gen request ko queue mein daalta hai.
+    Returns None agar job queue ho gaya, warna user ko dikhane wala error text.
+    """
+    _ensure_started()
+    if _user_jobs[user_id] >= GEN_MAX_PER_USER:
+        return f"⏳ You already have {_user_jobs[user_id]} generation(s) running. Please wait for it to finish."
+
+    prompt_key = normalize_prompt(prompt)
+    job = {
+        'prompt': prompt,
+        'prompt_key': prompt_key,
+        'user_id': user_id,
+        'api_key': api_key,
+        'status_msg': status_msg,
+        'reply_to': reply_to,
+        'followers': [],
+        'status_text': None,
+    }
+
+    # Same prompt pehle se chal raha hai? Toh usi ke result ka wait karo, dobara submit mat karo
+    leader = _jobs_by_prompt.get(prompt_key)
+    if leader:
+        leader['followers'].append(job)
+        _user_jobs[user_id] += 1
+        return None
+
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        return "🚦 Too many image generations are queued right now. Please try again in a few minutes."
+
+    _jobs_by_prompt[prompt_key] = job
+    _user_jobs[user_id] += 1
+    return None
+
+
+def _release_job(job):
+    if job.get('released'): # Error path par dobara call ho sakta hai; user count do baar na ghate
+        return
+    job['released'] = True
+    for j in [job] + job['followers']:
+        _user_jobs[j['user_id']] -= 1
+        if _user_jobs[j['user_id']] <= 0:
+            del _user_jobs[j['user_id']]
+    if _jobs_by_prompt.get(job['prompt_key']) is job:
+        del _jobs_by_prompt[job['prompt_key']]
+
+
+async def _set_status(job, text):
+    """Status message tabhi edit karo jab text badla ho (Telegram 'not modified' error se bachne ke liye)."""
+    if job['status_text'] == text:
+        return
+    job['status_text'] = text
+    for j in [job] + job['followers']:
+        try:
+            await j['status_msg'].edit_text(text)
+        except Exception as e:
+            logger.debug(f"Could not edit /gen status message: {e}")
+
+
+async def _fail_job(job, text):
+    _release_job(job)
+    job['status_text'] = None
+    await _set_status(job, text)
+
+
+async def _deliver(job, img_url):
+    _release_job(job)
+    for j in [job] + job['followers']:
+        try:
+            await j['status_msg'].delete()
+        except Exception as e:
+            logger.debug(f"Could not delete /gen status message: {e}")
+        try:
+            await deliver_photo(j['reply_to'], j['prompt'], img_url)
+        except Exception as e:
+            logger.error(f"Failed to deliver generated image: {e}")
+
+
+async def deliver_photo(reply_to, prompt, img_url):
+    """Generated image bhejta hai; same prompt ka Telegram file_id (RESULT_CACHE_TTL ke andar) ho toh wahi reuse hota hai."""
+    return await file_id_cache.reply_photo_cached(
+        reply_to, file_id_cache.prompt_key(prompt), img_url, ttl=RESULT_CACHE_TTL,
+        caption=f"*Prompt:* {escape_markdown(prompt, version=2)}", parse_mode=constants.ParseMode.MARKDOWN_V2
+    )
+
+
+async def _abandon_job(job, generation_id=None):
+    """Unexpected error ke baad job ko saaf band karo: slot aur user count wapas, user ko error dikhao."""
+    if generation_id is not None and _inflight.pop(generation_id, None) is not None:
+        _inflight_slots.release()
+    try:
+        await _fail_job(job, "Sorry, an error occurred while generating your image.")
+    except Exception:
+        logger.exception("Could not fail /gen job after an error")
+
+
+async def _submit(job):
+    await _inflight_slots.acquire()
+    try:
+        await _set_status(job, f"🎨 Submitting '{job['prompt']}'...")
+        headers = {"apikey": job['api_key'], "Client-Agent": HORDE_CLIENT_AGENT}
+        payload = {"prompt": job['prompt'], "params": {"n": 1, "width": 512, "height": 512}}
+        with metrics.track_http(HORDE_API_BASE):
+            response = await asyncio.to_thread(requests.post, f"{HORDE_API_BASE}/generate/async", json=payload, headers=headers, timeout=10)
+        response.raise_for_status()
+        generation_id = response.json()['id']
+    except Exception as e:
+        _inflight_slots.release()
+        logger.error(f"Stable Horde submit error: {e}")
+        await _fail_job(job, f"Sorry, an error occurred: {e}")
+        return
+
+    job['generation_id'] = generation_id
+    job['submitted_at'] = time.time()
+    _inflight[generation_id] = job
+    _poll_wakeup.set()
+
+
+async def _submit_worker():
+    """Queue se job leta hai aur Horde par submit karta hai (max GEN_MAX_INFLIGHT ek saath)."""
+    while True:
+        job = await _queue.get()
+        try:
+            await _submit(job)
+        except Exception:
+            # Loop kabhi band na ho: warna aage ke saare /gen "Queued" par atak jaate
+            logger.exception(f"Stable Horde submit worker failed for '{job['prompt']}'")
+            await _abandon_job(job)
+        finally:
+            _queue.task_done()
+
+
+async def _check_generation(generation_id):
+    with metrics.track_http(HORDE_API_BASE):
+        response = await asyncio.to_thread(requests.get, f"{HORDE_API_BASE}/generate/check/{generation_id}", timeout=5)
+    response.raise_for_status()
+    data = response.json()
+    if not isinstance(data, dict):
+        raise ValueError(f"unexpected check response: {data!r:.100}")
+    return data
+
+
+async def _finish_generation(generation_id, job):
+    del _inflight[generation_id]
+    _inflight_slots.release()
+    try:
+        with metrics.track_http(HORDE_API_BASE):
+            response = await asyncio.to_thread(requests.get, f"{HORDE_API_BASE}/generate/status/{generation_id}", timeout=10)
+        response.raise_for_status()
+        img_url = response.json()['generations'][0]['img']
+    except Exception as e:
+        logger.error(f"Stable Horde status error for {generation_id}: {e}")
+        await _fail_job(job, f"Sorry, an error occurred: {e}")
+        return
+    _cache_result(job['prompt_key'], img_url)
+    await _deliver(job, img_url)
+
+
+async def _drop_generation(generation_id, job, text):
+    del _inflight[generation_id]
+    _inflight_slots.release()
+    await _fail_job(job, text)
+    try:
+        # Horde ko bata do ki ab result nahi chahiye (kudos waste na ho)
+        await asyncio.to_thread(requests.delete, f"{HORDE_API_BASE}/generate/status/{generation_id}", timeout=5)
+    except Exception:
+        pass
+
+
+async def _poll_loop():
+    """
+    Ek hi loop saari in-flight generations ko ek saath check karta hai.
+    Interval adaptive hai: Horde ke wait_time ke hisaab se badhta/ghatta hai.
+    """
+    interval = POLL_MIN_INTERVAL
+    while True:
+        if not _inflight:
+            _poll_wakeup.clear()
+            await _poll_wakeup.wait()
+            interval = POLL_MIN_INTERVAL
+        await asyncio.sleep(interval)
+        try:
+            interval = await _poll_once()
+        except Exception:
+            # Loop kabhi band na ho: warna in-flight jobs aur unke users hamesha atke rehte
+            logger.exception("Stable Horde poll loop error")
+            interval = POLL_MAX_INTERVAL
+
+
+async def _poll_once():
+    """Saari in-flight generations ek baar check karta hai; agla poll interval return karta hai."""
+    generation_ids = list(_inflight)
+    results = await asyncio.gather(*(_check_generation(gid) for gid in generation_ids), return_exceptions=True)
+
+    finished_any = False
+    min_wait = None
+    for generation_id, check_data in zip(generation_ids, results):
+        job = _inflight.get(generation_id)
+        if not job:
+            continue
+        try:
+            if isinstance(check_data, Exception):
+                logger.warning(f"Stable Horde check failed for {generation_id}: {check_data}")
+                check_data = {}
+                min_wait = POLL_MAX_INTERVAL if min_wait is None else min_wait # Error par backoff
+
+            if check_data.get('done'):
+                finished_any = True
+                await _finish_generation(generation_id, job)
+            elif check_data.get('faulted') or check_data.get('is_possible') is False:
+                finished_any = True
+                await _drop_generation(generation_id, job, "Sorry, the generation failed on Stable Horde.")
+            elif time.time() - job['submitted_at'] > GEN_TIMEOUT:
+                finished_any = True
+                await _drop_generation(generation_id, job, "Generation timed out.")
+            elif check_data:
+                wait_time = check_data.get('wait_time', 0)
+                min_wait = wait_time if min_wait is None else min(min_wait, wait_time)
+                if check_data.get('processing'):
+                    text = f"🎨 Generating '{job['prompt']}'... (~{wait_time}s left)"
+                else:
+                    text = f"⏳ '{job['prompt']}' is in queue (position {check_data.get('queue_position', '?')}, ~{wait_time}s)"
+                await _set_status(job, text)
+        except Exception:
+            # Ek kharab response baaki jobs ya is job ke user ko hamesha ke liye na atkaaye
+            logger.exception(f"Stable Horde poll failed for {generation_id}")
+            finished_any = True
+            await _abandon_job(job, generation_id)
+
+    if finished_any or min_wait is None:
+        interval = POLL_MIN_INTERVAL
+    else:
+        interval = max(POLL_MIN_INTERVAL, min(POLL_MAX_INTERVAL, min_wait / 2))
+    return interval
@@ -0,0 +1,1023 @@
+# storage.py (Pluggable storage: Postgres, in-memory aur SQLite backends ek hi interface ke peeche)
+#
+# Backend DATABASE_URL ke scheme se chuna jaata hai:
+#   postgres://... / postgresql://...   -> PostgresStorage (production)
+#   sqlite:///path/to/bot.db            -> SQLiteStorage (single instance, bina DB server ke)
+#   memory://                           -> MemoryStorage (benchmarks, load harness, tests)
+
+import copy
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 7 # Tables/columns badlein toh yeh badhao; warna boot par DDL skip ho jaata hai
+SCHEMA_VERSION_KEY = 'schema_version'
+
+# Backup/restore (backup.py) wale tables: column -> merge rule. Pehla column primary key hai.
+#   text: import ki value (NULL ho toh purani), counter: merge mode ('max' ya 'sum'),
+#   flag: koi bhi side true ho toh true, latest: dono mein se bada (timestamps)
+BACKUP_TABLES = {
+    'user_data': {'user_id': 'key', 'username': 'text', 'first_name': 'text', 'quiz_score': 'counter', 'message_count': 'counter'},
+    'chat_data': {'chat_id': 'key', 'title': 'text', 'is_active': 'flag', 'message_count': 'counter', 'last_activity': 'latest'},
+}
+MERGE_MODES = ('max', 'sum')
+INSERT_DEFAULTS = {'counter': '0', 'flag': 'TRUE'} # Naye row ka khaali counter/flag = column ka default, NULL nahi
+BACKUP_BATCH_SIZE = 1000
+
+
+def merge_assignments(table, merge, greatest="GREATEST"):
+    """ON CONFLICT ... DO UPDATE SET ka hissa; SQLite mein greatest="MAX" (scalar MAX)."""
+    assignments = []
+    for column, rule in BACKUP_TABLES[table].items():
+        old, new = f"{table}.{column}", f"EXCLUDED.{column}"
+        if rule == 'text':
+            expr = f"COALESCE({new}, {old})"
+        elif rule == 'flag':
+            expr = f"{greatest}(COALESCE({old}, FALSE), COALESCE({new}, FALSE))"
+        elif rule == 'counter' and merge == 'sum':
+            expr = f"COALESCE({old}, 0) + COALESCE({new}, 0)"
+        elif rule in ('counter', 'latest'):
+            expr = f"{greatest}(COALESCE({old}, 0), COALESCE({new}, 0))"
+        else:
+            continue # key
+        assignments.append(f"{column} = {expr}")
+    return ", ".join(assignments)
+
+
+def insert_values(table, values):
+    """INSERT ki values/select list: counter aur flag columns COALESCE(value, default) mein (baaki jaisi hain)."""
+    rules = BACKUP_TABLES[table].values()
+    return ", ".join(f"COALESCE({value}, {INSERT_DEFAULTS[rule]})" if rule in INSERT_DEFAULTS else value for value, rule in zip(values, rules))
+
+
+class Storage:
+    """
+    Bot ka saara persistence isi interface se hota hai: bot values, cache versions, user scores,
+    spam state, chats, hustle games, chat settings aur quiz polls.
+    """
+
+    name = "base"
+
+    def setup(self, force=False):
+        """
+        Stored schema version current ho toh kuch nahi karta (cold start par DDL nahi chalta).
+        Warna tables create/verify karke version likhta hai. Returns True agar DDL chala.
+        """
+        if not force and self.schema_version() == SCHEMA_VERSION:
+            return False
+        self.create_schema()
+        self.set_value(SCHEMA_VERSION_KEY, SCHEMA_VERSION)
+        return True
+
+    def schema_version(self):
+        """DB mein likha schema version; tables hi na hon (pehla boot) toh 0."""
+        raise NotImplementedError
+    def create_schema(self): raise NotImplementedError
+
+    # --- Bot Data (Global Key/Value) ---
+    def get_value(self, key, default=None): raise NotImplementedError
+    def set_value(self, key, value): raise NotImplementedError
+    def delete_value(self, key): raise NotImplementedError
+
+    # --- Cache versions (cross-worker invalidation) ---
+    def bump_version(self, name):
+        """Cache `name` ka version badhata hai; doosre workers change dekh kar apni copy hata dete hain."""
+        raise NotImplementedError
+    def get_versions(self):
+        """Saare caches ke versions ek hi query mein: {name: version}."""
+        raise NotImplementedError
+
+    # --- Spam Blocks (per chat; sliding window sirf worker memory mein) ---
+    def get_spam(self, chat_id, user_id):
+        """Is chat mein user ka blocked_until (block nahi toh 0)."""
+        raise NotImplementedError
+    def set_spam(self, chat_id, user_id, blocked_until):
+        """Naya block likhta hai; expire ho chuke blocks saath mein saaf."""
+        raise NotImplementedError
+
+    # --- User Data (Score) ---
+    def get_score(self, user_id): raise NotImplementedError
+    def set_score(self, user_id, score, first_name=None, username=None): raise NotImplementedError
+    def add_score(self, user_id, delta, first_name=None, username=None, reason=None, day=None):
+        """
+        Score mein delta jodta hai (0 se neeche nahi jaata) aur naya score return karta hai.
+        reason diya ho toh usi write mein score_events mein (user, delta, reason, day) event bhi judta hai. Event mein
+        asli laga hua delta (naya - purana score) jaata hai, taaki 0 par clamp hui penalty daily/weekly ranking mein na gine.
+        """
+        raise NotImplementedError
+    def get_leaderboard(self, page=0, per_page=10): raise NotImplementedError
+    def get_score_and_rank(self, user_id): raise NotImplementedError
+
+    # --- Chat Data ---
+    def register_chat(self, chat_id, title):
+        """Naya chat ho toh last_activity = abhi (warna sirf title/is_active update)."""
+        raise NotImplementedError
+    def get_active_chat_ids(self, active_since=None):
+        """
+        Active chats, sabse recent activity pehle. active_since diya ho toh sirf woh chats jinki
+        last_activity uske baad hai (chat_data_recent index se, poori table scan nahi).
+        """
+        raise NotImplementedError
+    def deactivate_chat(self, chat_id): raise NotImplementedError
+    def add_message_counts(self, chat_counts, user_counts, seen_at=None, titles=None):
+        """
+        Batched upsert: {chat_id: n} aur {user_id: n} ko chat_data / user_data ke message_count mein jodta hai.
+        seen_at diya ho toh in chats ki last_activity bhi aage badhti hai. titles ({chat_id: title}) wale chats ka title
+        update hota hai aur woh dobara is_active ho jaate hain (unmein abhi messages aaye hain).
+        """
+        raise NotImplementedError
+
+    # --- Word Hustle Games (per chat) ---
+    def get_hustle_game(self, chat_id): raise NotImplementedError
+    def save_hustle_game(self, chat_id, game): raise NotImplementedError
+    def delete_hustle_game(self, chat_id): raise NotImplementedError
+    def count_hustle_games(self): raise NotImplementedError
+
+    # --- Per-chat Settings (sirf defaults se alag values; chat_settings.py inhe memory mein rakhta hai) ---
+    def get_all_chat_settings(self): raise NotImplementedError # {chat_id: {name: value}}
+    def save_chat_settings(self, chat_id, settings):
+        """Chat ke overrides poore replace; khali dict = row delete (sab defaults)."""
+        raise NotImplementedError
+
+    # --- Quiz Polls ---
+    def add_quiz_poll(self, poll_id, correct_option_id): raise NotImplementedError
+    def get_quiz_poll(self, poll_id): raise NotImplementedError
+    def mark_poll_answered(self, poll_id, user_id):
+        """User ko poll ke answered_users mein atomically jodta hai. Pehle se ho toh False."""
+        raise NotImplementedError
+    def count_quiz_polls(self): raise NotImplementedError
+    def prune_quiz_polls(self, older_than): raise NotImplementedError
+
+    # --- Score events + daily rollups (daily/weekly leaderboards) ---
+    def rollup_score_events(self, before, keep_from_day):
+        """
+        `before` se purane raw events score_daily (day, user) totals mein jodkar hata deta hai, aur
+        keep_from_day (YYYY-MM-DD) se purani daily rows bhi. Returns kitne events roll up hue.
+        """
+        raise NotImplementedError
+    def get_window_leaderboard(self, since_day, page=0, per_page=10):
+        """since_day se ab tak ke score_daily points ka leaderboard: ([(first_name, points)], total_users)."""
+        raise NotImplementedError
+
+    # --- Backup / restore (BACKUP_TABLES; constant memory, backup.py file format sambhalta hai) ---
+    def iter_table(self, table):
+        """Table ki saari rows (BACKUP_TABLES column order mein) ek-ek karke, poori table memory mein laaye bina."""
+        raise NotImplementedError
+    def merge_table(self, table, rows, merge):
+        """Rows ko upsert karta hai: naya key insert, pehle se ho toh BACKUP_TABLES rule se merge. Returns rows count."""
+        raise NotImplementedError
+
+
+# ======================================================================
+# --- Postgres ---
+# ======================================================================
+
+class PostgresStorage(Storage):
+    name = "postgres"
+
+    def __init__(self, database_url, cursor_factory=None):
+        import psycopg2 # Sirf Postgres backend ko driver chahiye
+        self._psycopg2 = psycopg2
+        self.database_url = database_url
+        self.cursor_factory = cursor_factory
+
+    def get_db_connection(self):
+        try:
+            result = urlparse(self.database_url)
+            conn = self._psycopg2.connect(
+                dbname=result.path[1:],
+                user=result.username,
+                password=result.password,
+                host=result.hostname,
+                port=result.port,
+                cursor_factory=self.cursor_factory
+            )
+            return conn
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            raise
+
+    @contextmanager
+    def _cursor(self, commit=False):
+        conn = self.get_db_connection()
+        cur = conn.cursor()
+        try:
+            yield cur
+            if commit: conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def schema_version(self):
+        with self._cursor() as cur:
+            try:
+                cur.execute("SELECT value FROM bot_data WHERE key = %s", (SCHEMA_VERSION_KEY,))
+            except self._psycopg2.errors.UndefinedTable:
+                return 0
+            result = cur.fetchone()
+        return result[0] if result else 0
+
+    def create_schema(self):
+        with self._cursor(commit=True) as cur:
+            cur.execute("CREATE TABLE IF NOT EXISTS bot_data (key TEXT PRIMARY KEY, value JSONB);")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS user_data (
+                    user_id TEXT PRIMARY KEY, username TEXT, first_name TEXT,
+                    quiz_score INTEGER DEFAULT 0,
+                    spam_blocked_until FLOAT DEFAULT 0, spam_timestamps JSONB DEFAULT '[]',
+                    message_count BIGINT DEFAULT 0
+                );""")
+            cur.execute("CREATE TABLE IF NOT EXISTS chat_data (chat_id TEXT PRIMARY KEY, title TEXT, is_active BOOLEAN DEFAULT TRUE, message_count BIGINT DEFAULT 0, last_activity DOUBLE PRECISION);")
+            cur.execute("DROP TABLE IF EXISTS bot_locks;") # v6: purani global quiz lease ki table
+            cur.execute("CREATE TABLE IF NOT EXISTS cache_versions (name TEXT PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0);")
+            cur.execute("CREATE TABLE IF NOT EXISTS hustle_games (chat_id TEXT PRIMARY KEY, state JSONB NOT NULL);")
+            cur.execute("CREATE TABLE IF NOT EXISTS spam_blocks (chat_id TEXT NOT NULL, user_id TEXT NOT NULL, blocked_until DOUBLE PRECISION NOT NULL, PRIMARY KEY (chat_id, user_id));")
+            cur.execute("CREATE TABLE IF NOT EXISTS chat_settings (chat_id TEXT PRIMARY KEY, settings JSONB NOT NULL, updated_at DOUBLE PRECISION);")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS quiz_polls (
+                    poll_id TEXT PRIMARY KEY, correct_option_id INTEGER NOT NULL,
+                    answered_users JSONB DEFAULT '[]', created_at FLOAT NOT NULL
+                );""")
+            cur.execute("CREATE TABLE IF NOT EXISTS score_events (user_id TEXT NOT NULL, delta INTEGER NOT NULL, reason TEXT, day TEXT NOT NULL, created_at DOUBLE PRECISION NOT NULL);")
+            cur.execute("CREATE INDEX IF NOT EXISTS score_events_created_at ON score_events (created_at);")
+            cur.execute("CREATE TABLE IF NOT EXISTS score_daily (day TEXT NOT NULL, user_id TEXT NOT NULL, points INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (day, user_id));")
+            # v3: purane tables mein naye columns
+            cur.execute("ALTER TABLE chat_data ADD COLUMN IF NOT EXISTS message_count BIGINT DEFAULT 0;")
+            cur.execute("ALTER TABLE user_data ADD COLUMN IF NOT EXISTS message_count BIGINT DEFAULT 0;")
+            # v4: purane chats ko abhi ka time milta hai (tracking se pehle ki activity pata nahi; broadcast window ke baad dormant)
+            cur.execute("ALTER TABLE chat_data ADD COLUMN IF NOT EXISTS last_activity DOUBLE PRECISION;")
+            cur.execute("UPDATE chat_data SET last_activity = EXTRACT(EPOCH FROM now()) WHERE last_activity IS NULL;")
+            cur.execute("CREATE INDEX IF NOT EXISTS chat_data_recent ON chat_data (last_activity DESC NULLS LAST) WHERE is_active;")
+        logger.info("Database tables verified/created successfully.")
+
+    def get_value(self, key, default=None):
+        with self._cursor() as cur:
+            cur.execute("SELECT value FROM bot_data WHERE key = %s", (key,))
+            result = cur.fetchone()
+        return result[0] if result else default
+
+    def set_value(self, key, value):
+        with self._cursor(commit=True) as cur:
+            cur.execute("INSERT INTO bot_data (key, value) VALUES (%s, %s) ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;", (key, json.dumps(value)))
+
+    def delete_value(self, key):
+        with self._cursor(commit=True) as cur:
+            cur.execute("DELETE FROM bot_data WHERE key = %s", (key,))
+
+    def bump_version(self, name):
+        with self._cursor(commit=True) as cur:
+            cur.execute("INSERT INTO cache_versions (name, version) VALUES (%s, 1) ON CONFLICT (name) DO UPDATE SET version = cache_versions.version + 1 RETURNING version", (name,))
+            return cur.fetchone()[0]
+
+    def get_versions(self):
+        with self._cursor() as cur:
+            cur.execute("SELECT name, version FROM cache_versions")
+            return dict(cur.fetchall())
+
+    def get_spam(self, chat_id, user_id):
+        with self._cursor() as cur:
+            cur.execute("SELECT blocked_until FROM spam_blocks WHERE chat_id = %s AND user_id = %s", (str(chat_id), str(user_id)))
+            result = cur.fetchone()
+        return result[0] if result else 0
+
+    def set_spam(self, chat_id, user_id, blocked_until):
+        with self._cursor(commit=True) as cur:
+            cur.execute("DELETE FROM spam_blocks WHERE blocked_until < %s", (time.time(),))
+            cur.execute("INSERT INTO spam_blocks (chat_id, user_id, blocked_until) VALUES (%s, %s, %s) ON CONFLICT (chat_id, user_id) DO UPDATE SET blocked_until = EXCLUDED.blocked_until;", (str(chat_id), str(user_id), blocked_until))
+
+    def get_score(self, user_id):
+        with self._cursor() as cur:
+            cur.execute("SELECT quiz_score FROM user_data WHERE user_id = %s", (str(user_id),))
+            result = cur.fetchone()
+        return result[0] if result else 0
+
+    def set_score(self, user_id, score, first_name=None, username=None):
+        with self._cursor(commit=True) as cur:
+            if first_name and username:
+                cur.execute("INSERT INTO user_data (user_id, quiz_score, first_name, username) VALUES (%s, %s, %s, %s) ON CONFLICT (user_id) DO UPDATE SET quiz_score = EXCLUDED.quiz_score, first_name = EXCLUDED.first_name, username = EXCLUDED.username;", (str(user_id), score, first_name, username))
+            else:
+                cur.execute("INSERT INTO user_data (user_id, quiz_score) VALUES (%s, %s) ON CONFLICT (user_id) DO UPDATE SET quiz_score = EXCLUDED.quiz_score;", (str(user_id), score))
+
+    def add_score(self, user_id, delta, first_name=None, username=None, reason=None, day=None):
+        # Ek hi statement: read-modify-write race nahi, aur do round-trips ki jagah ek (event bhi CTE mein).
+        # Event ke saath: pehle row pakki (naye user ka concurrent insert bhi commit ho chuka), phir `old` row lock
+        # leta hai aur upsert ke VALUES mein refer hota hai (isliye upsert se pehle chalta hai);
+        # applied delta = RETURNING wala naya score - purana score. Dono statements ek hi execute (ek round-trip).
+        upsert_sql = """
+            upd AS (
+                INSERT INTO user_data (user_id, quiz_score, first_name, username) VALUES (%s, GREATEST(0, {base} + %s), %s, %s)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    quiz_score = GREATEST(0, user_data.quiz_score + %s),
+                    first_name = COALESCE(EXCLUDED.first_name, user_data.first_name),
+                    username = COALESCE(EXCLUDED.username, user_data.username)
+                RETURNING quiz_score)"""
+        upsert_params = (str(user_id), delta, first_name, username, delta)
+        with self._cursor(commit=True) as cur:
+            if reason:
+                cur.execute(f"""
+                    INSERT INTO user_data (user_id) VALUES (%s) ON CONFLICT (user_id) DO NOTHING;
+                    WITH old AS (SELECT quiz_score FROM user_data WHERE user_id = %s FOR UPDATE),{upsert_sql.format(base="(SELECT quiz_score FROM old)")},
+                    event AS (
+                        INSERT INTO score_events (user_id, delta, reason, day, created_at)
+                        SELECT %s, upd.quiz_score - old.quiz_score, %s, %s, %s FROM upd, old WHERE upd.quiz_score <> old.quiz_score)
+                    SELECT quiz_score FROM upd;""", (str(user_id), str(user_id)) + upsert_params + (str(user_id), reason, day, time.time()))
+            else:
+                cur.execute(f"WITH{upsert_sql.format(base=0)} SELECT quiz_score FROM upd;", upsert_params)
+            return cur.fetchone()[0]
+
+    def get_leaderboard(self, page=0, per_page=10):
+        offset = page * per_page
+        with self._cursor() as cur:
+            cur.execute("SELECT first_name, quiz_score FROM user_data WHERE quiz_score > 0 ORDER BY quiz_score DESC LIMIT %s OFFSET %s", (per_page, offset))
+            top_users = cur.fetchall()
+            cur.execute("SELECT COUNT(*) FROM user_data WHERE quiz_score > 0")
+            total_users = cur.fetchone()[0]
+        return top_users, total_users
+
+    def get_score_and_rank(self, user_id):
+        with self._cursor() as cur:
+            cur.execute("SELECT quiz_score FROM user_data WHERE user_id = %s", (str(user_id),))
+            result = cur.fetchone()
+            quiz_score = result[0] if result else 0
+            cur.execute("SELECT rank FROM (SELECT user_id, ROW_NUMBER() OVER (ORDER BY quiz_score DESC) as rank FROM user_data WHERE quiz_score > 0) as ranked_users WHERE user_id = %s", (str(user_id),))
+            rank_result = cur.fetchone()
+        return quiz_score, (rank_result[0] if rank_result else "N/A")
+
+    def register_chat(self, chat_id, title):
+        with self._cursor(commit=True) as cur:
+            cur.execute("INSERT INTO chat_data (chat_id, title, is_active, last_activity) VALUES (%s, %s, TRUE, %s) ON CONFLICT (chat_id) DO UPDATE SET title = EXCLUDED.title, is_active = TRUE;", (str(chat_id), title, time.time()))
+
+    def get_active_chat_ids(self, active_since=None):
+        with self._cursor() as cur:
+            if active_since is None:
+                cur.execute("SELECT chat_id FROM chat_data WHERE is_active ORDER BY last_activity DESC NULLS LAST")
+            else:
+                cur.execute("SELECT chat_id FROM chat_data WHERE is_active AND last_activity >= %s ORDER BY last_activity DESC NULLS LAST", (active_since,))
+            results = cur.fetchall()
+        return [int(row[0]) for row in results]
+
+    def deactivate_chat(self, chat_id):
+        with self._cursor(commit=True) as cur:
+            cur.execute("UPDATE chat_data SET is_active = FALSE WHERE chat_id = %s", (str(chat_id),))
+
+    def add_message_counts(self, chat_counts, user_counts, seen_at=None, titles=None):
+        # Har table ke liye ek statement (unnest arrays), chahe kitne bhi chats/users hon
+        titles = titles or {}
+        with self._cursor(commit=True) as cur:
+            if chat_counts:
+                cur.execute("""
+                    INSERT INTO chat_data (chat_id, message_count, last_activity, title) SELECT c, n, %s, t FROM unnest(%s::text[], %s::bigint[], %s::text[]) AS u (c, n, t)
+                    ON CONFLICT (chat_id) DO UPDATE SET message_count = COALESCE(chat_data.message_count, 0) + EXCLUDED.message_count,
+                        last_activity = GREATEST(chat_data.last_activity, EXCLUDED.last_activity),
+                        title = COALESCE(EXCLUDED.title, chat_data.title), is_active = chat_data.is_active OR EXCLUDED.title IS NOT NULL;
+                """, (seen_at, [str(c) for c in chat_counts], list(chat_counts.values()), [titles.get(c) for c in chat_counts]))
+            if user_counts:
+                cur.execute("""
+                    INSERT INTO user_data (user_id, message_count) SELECT * FROM unnest(%s::text[], %s::bigint[])
+                    ON CONFLICT (user_id) DO UPDATE SET message_count = COALESCE(user_data.message_count, 0) + EXCLUDED.message_count;
+                """, ([str(u) for u in user_counts], list(user_counts.values())))
+
+    def get_hustle_game(self, chat_id):
+        with self._cursor() as cur:
+            cur.execute("SELECT state FROM hustle_games WHERE chat_id = %s", (str(chat_id),))
+            result = cur.fetchone()
+        return result[0] if result else None
+
+    def save_hustle_game(self, chat_id, game):
+        with self._cursor(commit=True) as cur:
+            cur.execute("INSERT INTO hustle_games (chat_id, state) VALUES (%s, %s) ON CONFLICT (chat_id) DO UPDATE SET state = EXCLUDED.state;", (str(chat_id), json.dumps(game)))
+
+    def delete_hustle_game(self, chat_id):
+        with self._cursor(commit=True) as cur:
+            cur.execute("DELETE FROM hustle_games WHERE chat_id = %s", (str(chat_id),))
+
+    def count_hustle_games(self):
+        with self._cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM hustle_games WHERE (state->>'running')::boolean")
+            return cur.fetchone()[0]
+
+    def get_all_chat_settings(self):
+        with self._cursor() as cur:
+            cur.execute("SELECT chat_id, settings FROM chat_settings")
+            return dict(cur.fetchall())
+
+    def save_chat_settings(self, chat_id, settings):
+        with self._cursor(commit=True) as cur:
+            if settings:
+                cur.execute("INSERT INTO chat_settings (chat_id, settings, updated_at) VALUES (%s, %s, %s) ON CONFLICT (chat_id) DO UPDATE SET settings = EXCLUDED.settings, updated_at = EXCLUDED.updated_at;", (str(chat_id), json.dumps(settings), time.time()))
+            else:
+                cur.execute("DELETE FROM chat_settings WHERE chat_id = %s", (str(chat_id),))
+
+    def add_quiz_poll(self, poll_id, correct_option_id):
+        with self._cursor(commit=True) as cur:
+            cur.execute("INSERT INTO quiz_polls (poll_id, correct_option_id, created_at) VALUES (%s, %s, %s) ON CONFLICT (poll_id) DO NOTHING;", (str(poll_id), correct_option_id, time.time()))
+
+    def get_quiz_poll(self, poll_id):
+        with self._cursor() as cur:
+            cur.execute("SELECT correct_option_id, answered_users FROM quiz_polls WHERE poll_id = %s", (str(poll_id),))
+            result = cur.fetchone()
+        return {'correct_option_id': result[0], 'answered_users': result[1]} if result else None
+
+    def mark_poll_answered(self, poll_id, user_id):
+        with self._cursor(commit=True) as cur:
+            cur.execute("""
+                UPDATE quiz_polls SET answered_users = answered_users || %s::jsonb
+                WHERE poll_id = %s AND NOT answered_users @> %s::jsonb RETURNING poll_id;""",
+                (json.dumps([user_id]), str(poll_id), json.dumps([user_id])))
+            return cur.fetchone() is not None
+
+    def count_quiz_polls(self):
+        with self._cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM quiz_polls")
+            return cur.fetchone()[0]
+
+    def prune_quiz_polls(self, older_than):
+        with self._cursor(commit=True) as cur:
+            cur.execute("DELETE FROM quiz_polls WHERE created_at < %s", (older_than,))
+            return cur.rowcount
+
+    def rollup_score_events(self, before, keep_from_day):
+        # DELETE ... RETURNING se events ek hi baar gine jaate hain, chahe do workers saath rollup karein
+        with self._cursor(commit=True) as cur:
+            cur.execute("""
+                WITH moved AS (DELETE FROM score_events WHERE created_at < %s RETURNING user_id, delta, day),
+                rolled AS (
+                    INSERT INTO score_daily (day, user_id, points)
+                    SELECT day, user_id, SUM(delta) FROM moved GROUP BY day, user_id
+                    ON CONFLICT (day, user_id) DO UPDATE SET points = score_daily.points + EXCLUDED.points
+                )
+                SELECT COUNT(*) FROM moved;""", (before,))
+            rolled_up = cur.fetchone()[0]
+            cur.execute("DELETE FROM score_daily WHERE day < %s", (keep_from_day,))
+        return rolled_up
+
+    def get_window_leaderboard(self, since_day, page=0, per_page=10):
+        with self._cursor() as cur:
+            cur.execute("""
+                SELECT u.first_name, t.points FROM (
+                    SELECT user_id, SUM(points) AS points FROM score_daily WHERE day >= %s GROUP BY user_id HAVING SUM(points) > 0
+                ) t LEFT JOIN user_data u ON u.user_id = t.user_id
+                ORDER BY t.points DESC LIMIT %s OFFSET %s""", (since_day, per_page, page * per_page))
+            top_users = cur.fetchall()
+            cur.execute("SELECT COUNT(*) FROM (SELECT user_id FROM score_daily WHERE day >= %s GROUP BY user_id HAVING SUM(points) > 0) t", (since_day,))
+            total_users = cur.fetchone()[0]
+        return top_users, total_users
+
+    # COPY: rows seedhe server aur file ke beech stream hoti hain (psycopg2 8 KB chunks), Python objects nahi bante.
+    # JSONL bhi COPY se: row_to_json ka text CSV mode mein aise quote/delimiter (\x01/\x02) ke saath jo JSON mein
+    # kabhi raw nahi aate, isliye koi escaping nahi hoti.
+    _JSONL_COPY = "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+
+    def copy_table_out(self, table, fileobj, fmt):
+        columns = ", ".join(BACKUP_TABLES[table])
+        if fmt == 'csv':
+            sql = f"COPY (SELECT {columns} FROM {table}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+        else:
+            sql = f"COPY (SELECT row_to_json(t) FROM (SELECT {columns} FROM {table}) t) TO STDOUT {self._JSONL_COPY}"
+        with self._cursor() as cur:
+            cur.copy_expert(sql, fileobj)
+            return cur.rowcount
+
+    def copy_table_in(self, table, fileobj, fmt, merge):
+        """File temp table mein COPY, phir ek INSERT ... ON CONFLICT se merge (ek hi transaction)."""
+        columns = ", ".join(BACKUP_TABLES[table])
+        key = next(iter(BACKUP_TABLES[table]))
+        with self._cursor(commit=True) as cur:
+            cur.execute(f"CREATE TEMP TABLE backup_import ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+            if fmt == 'csv':
+                cur.copy_expert(f"COPY backup_import ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true)", fileobj)
+            else:
+                cur.execute("CREATE TEMP TABLE backup_import_json (doc json) ON COMMIT DROP")
+                cur.copy_expert(f"COPY backup_import_json FROM STDIN {self._JSONL_COPY}", fileobj)
+                cur.execute("INSERT INTO backup_import SELECT r.* FROM backup_import_json, json_populate_record(NULL::backup_import, doc) r")
+            # DISTINCT ON: file mein ek key do baar ho toh bhi ON CONFLICT ek row ko ek hi baar chhue
+            cur.execute(f"""
+                INSERT INTO {table} ({columns})
+                SELECT DISTINCT ON ({key}) {insert_values(table, BACKUP_TABLES[table])} FROM backup_import WHERE {key} IS NOT NULL ORDER BY {key}
+                ON CONFLICT ({key}) DO UPDATE SET {merge_assignments(table, merge)}""")
+            return cur.rowcount
+
+
+# ======================================================================
+# --- In-memory ---
+# ======================================================================
+
+class MemoryStorage(Storage):
+    """Process ke andar dicts. Restart par sab khatam - sirf single instance / benchmarks ke liye."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bot_data = {}
+        self.users = {} # user_id -> {'username', 'first_name', 'quiz_score', 'spam_blocked_until', 'spam_timestamps', 'message_count'}
+        self.chats = {} # chat_id -> {'title', 'is_active', 'message_count', 'last_activity'}
+        self.versions = {}
+        self.hustle_games = {}
+        self.spam_blocks = {} # (chat_id, user_id) -> blocked_until
+        self.chat_settings = {}
+        self.quiz_polls = {}
+        self.score_events = [] # (user_id, delta, reason, day, created_at)
+        self.score_daily = {} # (day, user_id) -> points
+
+    def schema_version(self):
+        return self.bot_data.get(SCHEMA_VERSION_KEY, 0)
+
+    def create_schema(self):
+        logger.info("Using in-memory storage (data is lost on restart).")
+
+    def _user(self, user_id):
+        return self.users.setdefault(str(user_id), {'username': None, 'first_name': None, 'quiz_score': 0, 'spam_blocked_until': 0, 'spam_timestamps': [], 'message_count': 0})
+
+    def get_value(self, key, default=None):
+        with self._lock:
+            return copy.deepcopy(self.bot_data[key]) if key in self.bot_data else default
+
+    def set_value(self, key, value):
+        with self._lock:
+            self.bot_data[key] = copy.deepcopy(value)
+
+    def delete_value(self, key):
+        with self._lock:
+            self.bot_data.pop(key, None)
+
+    def bump_version(self, name):
+        with self._lock:
+            self.versions[name] = self.versions.get(name, 0) + 1
+            return self.versions[name]
+
+    def get_versions(self):
+        with self._lock:
+            return dict(self.versions)
+
+    def get_spam(self, chat_id, user_id):
+        with self._lock:
+            return self.spam_blocks.get((str(chat_id), str(user_id)), 0)
+
+    def set_spam(self, chat_id, user_id, blocked_until):
+        with self._lock:
+            now = time.time()
+            self.spam_blocks = {key: until for key, until in self.spam_blocks.items() if until >= now}
+            self.spam_blocks[(str(chat_id), str(user_id))] = blocked_until
+
+    def get_score(self, user_id):
+        with self._lock:
+            user = self.users.get(str(user_id))
+            return user['quiz_score'] if user else 0
+
+    def set_score(self, user_id, score, first_name=None, username=None):
+        with self._lock:
+            user = self._user(user_id)
+            user['quiz_score'] = score
+            if first_name and username:
+                user['first_name'], user['username'] = first_name, username
+
+    def add_score(self, user_id, delta, first_name=None, username=None, reason=None, day=None):
+        with self._lock:
+            user = self._user(user_id)
+            old_score = user['quiz_score']
+            user['quiz_score'] = max(0, old_score + delta)
+            user['first_name'] = first_name or user['first_name']
+            user['username'] = username or user['username']
+            if reason and user['quiz_score'] != old_score:
+                self.score_events.append((str(user_id), user['quiz_score'] - old_score, reason, day, time.time()))
+            return user['quiz_score']
+
+    def _ranked(self):
+        return sorted((u for u in self.users.items() if u[1]['quiz_score'] > 0), key=lambda u: -u[1]['quiz_score'])
+
+    def get_leaderboard(self, page=0, per_page=10):
+        with self._lock:
+            ranked = self._ranked()
+            rows = [(u['first_name'], u['quiz_score']) for _, u in ranked[page * per_page:(page + 1) * per_page]]
+            return rows, len(ranked)
+
+    def get_score_and_rank(self, user_id):
+        with self._lock:
+            user = self.users.get(str(user_id))
+            score = user['quiz_score'] if user else 0
+            for rank, (uid, _) in enumerate(self._ranked(), start=1):
+                if uid == str(user_id):
+                    return score, rank
+            return score, "N/A"
+
+    def _chat(self, chat_id):
+        return self.chats.setdefault(str(chat_id), {'title': None, 'is_active': True, 'message_count': 0, 'last_activity': time.time()})
+
+    def register_chat(self, chat_id, title):
+        with self._lock:
+            chat = self._chat(chat_id)
+            chat['title'], chat['is_active'] = title, True
+
+    def get_active_chat_ids(self, active_since=None):
+        with self._lock:
+            chats = [(chat['last_activity'] or 0, int(chat_id)) for chat_id, chat in self.chats.items()
+                     if chat['is_active'] and (active_since is None or (chat['last_activity'] or 0) >= active_since)]
+        return [chat_id for _, chat_id in sorted(chats, reverse=True)]
+
+    def deactivate_chat(self, chat_id):
+        with self._lock:
+            if str(chat_id) in self.chats:
+                self.chats[str(chat_id)]['is_active'] = False
+
+    def add_message_counts(self, chat_counts, user_counts, seen_at=None, titles=None):
+        with self._lock:
+            for chat_id, count in chat_counts.items():
+                chat = self._chat(chat_id)
+                chat['message_count'] += count
+                if titles and titles.get(chat_id) is not None: chat['title'], chat['is_active'] = titles[chat_id], True
+                if seen_at is not None: chat['last_activity'] = max(chat['last_activity'] or 0, seen_at)
+            for user_id, count in user_counts.items():
+                self._user(user_id)['message_count'] += count
+
+    def get_hustle_game(self, chat_id):
+        with self._lock:
+            game = self.hustle_games.get(str(chat_id))
+            return copy.deepcopy(game) if game else None
+
+    def save_hustle_game(self, chat_id, game):
+        with self._lock:
+            self.hustle_games[str(chat_id)] = copy.deepcopy(game)
+
+    def delete_hustle_game(self, chat_id):
+        with self._lock:
+            self.hustle_games.pop(str(chat_id), None)
+
+    def count_hustle_games(self):
+        with self._lock:
+            return sum(1 for game in self.hustle_games.values() if game.get('running'))
+
+    def get_all_chat_settings(self):
+        with self._lock:
+            return copy.deepcopy(self.chat_settings)
+
+    def save_chat_settings(self, chat_id, settings):
+        with self._lock:
+            if settings:
+                self.chat_settings[str(chat_id)] = dict(settings)
+            else:
+                self.chat_settings.pop(str(chat_id), None)
+
+    def add_quiz_poll(self, poll_id, correct_option_id):
+        with self._lock:
+            self.quiz_polls.setdefault(str(poll_id), {'correct_option_id': correct_option_id, 'answered_users': [], 'created_at': time.time()})
+
+    def get_quiz_poll(self, poll_id):
+        with self._lock:
+            poll = self.quiz_polls.get(str(poll_id))
+            return {'correct_option_id': poll['correct_option_id'], 'answered_users': list(poll['answered_users'])} if poll else None
+
+    def mark_poll_answered(self, poll_id, user_id):
+        with self._lock:
+            poll = self.quiz_polls.get(str(poll_id))
+            if not poll or user_id in poll['answered_users']:
+                return False
+            poll['answered_users'].append(user_id)
+            return True
+
+    def count_quiz_polls(self):
+        with self._lock:
+            return len(self.quiz_polls)
+
+    def prune_quiz_polls(self, older_than):
+        with self._lock:
+            old = [poll_id for poll_id, poll in self.quiz_polls.items() if poll['created_at'] < older_than]
+            for poll_id in old:
+                del self.quiz_polls[poll_id]
+            return len(old)
+
+    def rollup_score_events(self, before, keep_from_day):
+        with self._lock:
+            moved = [event for event in self.score_events if event[4] < before]
+            self.score_events = [event for event in self.score_events if event[4] >= before]
+            for user_id, delta, _, day, _ in moved:
+                self.score_daily[(day, user_id)] = self.score_daily.get((day, user_id), 0) + delta
+            for key in [key for key in self.score_daily if key[0] < keep_from_day]:
+                del self.score_daily[key]
+            return len(moved)
+
+    def get_window_leaderboard(self, since_day, page=0, per_page=10):
+        with self._lock:
+            totals = {}
+            for (day, user_id), points in self.score_daily.items():
+                if day >= since_day:
+                    totals[user_id] = totals.get(user_id, 0) + points
+            ranked = sorted(((user_id, points) for user_id, points in totals.items() if points > 0), key=lambda item: -item[1])
+            rows = [(self.users.get(user_id, {}).get('first_name'), points) for user_id, points in ranked[page * per_page:(page + 1) * per_page]]
+            return rows, len(ranked)
+
+    def _backup_rows(self, table):
+        return self.users if table == 'user_data' else self.chats
+
+    def iter_table(self, table):
+        columns = list(BACKUP_TABLES[table])[1:]
+        with self._lock:
+            rows = [(key,) + tuple(row.get(column) for column in columns) for key, row in self._backup_rows(table).items()]
+        return iter(rows)
+
+    def merge_table(self, table, rows, merge):
+        rules = BACKUP_TABLES[table]
+        count = 0
+        with self._lock:
+            for row in rows:
+                key, values = str(row[0]), dict(zip(list(rules)[1:], row[1:]))
+                existing = self._backup_rows(table).get(key)
+                target = self._user(key) if table == 'user_data' else self._chat(key)
+                for column, new in values.items():
+                    old, rule = existing.get(column) if existing else None, rules[column]
+                    if new is None:
+                        continue # Naye row mein default, purane mein purani value
+                    if existing is None or rule == 'text':
+                        target[column] = new
+                    elif rule == 'flag':
+                        target[column] = bool(old) or bool(new)
+                    elif rule == 'counter' and merge == 'sum':
+                        target[column] = (old or 0) + (new or 0)
+                    else:
+                        target[column] = max(old or 0, new or 0)
+                count += 1
+        return count
+
+
+# ======================================================================
+# --- SQLite ---
+# ======================================================================
+
+class SQLiteStorage(Storage):
+    """Ek file mein sab kuch. Single instance deployments ke liye, bina DB server ke."""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def _execute(self, sql, params=(), fetch=None):
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            if fetch == "one": return cur.fetchone()
+            if fetch == "all": return cur.fetchall()
+            return cur.rowcount
+
+    def schema_version(self):
+        try:
+            result = self._execute("SELECT value FROM bot_data WHERE key = ?", (SCHEMA_VERSION_KEY,), fetch="one")
+        except sqlite3.OperationalError: # no such table
+            return 0
+        return json.loads(result[0]) if result else 0
+
+    def create_schema(self):
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS bot_data (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS user_data (
+                    user_id TEXT PRIMARY KEY, username TEXT, first_name TEXT,
+                    quiz_score INTEGER DEFAULT 0,
+                    spam_blocked_until REAL DEFAULT 0, spam_timestamps TEXT DEFAULT '[]',
+                    message_count INTEGER DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS chat_data (chat_id TEXT PRIMARY KEY, title TEXT, is_active INTEGER DEFAULT 1, message_count INTEGER DEFAULT 0, last_activity REAL);
+                DROP TABLE IF EXISTS bot_locks;
+                CREATE TABLE IF NOT EXISTS cache_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0);
+                CREATE TABLE IF NOT EXISTS hustle_games (chat_id TEXT PRIMARY KEY, state TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS spam_blocks (chat_id TEXT NOT NULL, user_id TEXT NOT NULL, blocked_until REAL NOT NULL, PRIMARY KEY (chat_id, user_id));
+                CREATE TABLE IF NOT EXISTS chat_settings (chat_id TEXT PRIMARY KEY, settings TEXT NOT NULL, updated_at REAL);
+                CREATE TABLE IF NOT EXISTS quiz_polls (
+                    poll_id TEXT PRIMARY KEY, correct_option_id INTEGER NOT NULL,
+                    answered_users TEXT DEFAULT '[]', created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS score_events (user_id TEXT NOT NULL, delta INTEGER NOT NULL, reason TEXT, day TEXT NOT NULL, created_at REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS score_events_created_at ON score_events (created_at);
+                CREATE TABLE IF NOT EXISTS score_daily (day TEXT NOT NULL, user_id TEXT NOT NULL, points INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (day, user_id));
+            """)
+            # v3: purane tables mein naye columns (SQLite mein ADD COLUMN IF NOT EXISTS nahi hota)
+            for table, column in (('chat_data', 'message_count INTEGER DEFAULT 0'), ('user_data', 'message_count INTEGER DEFAULT 0'), ('chat_data', 'last_activity REAL')):
+                try:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+                except sqlite3.OperationalError: # duplicate column
+                    pass
+            self._conn.execute("UPDATE chat_data SET last_activity = ? WHERE last_activity IS NULL", (time.time(),))
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chat_data_recent ON chat_data (last_activity DESC) WHERE is_active")
+        logger.info(f"SQLite storage ready at {self.path}.")
+
+    def get_value(self, key, default=None):
+        result = self._execute("SELECT value FROM bot_data WHERE key = ?", (key,), fetch="one")
+        return json.loads(result[0]) if result else default
+
+    def set_value(self, key, value):
+        self._execute("INSERT INTO bot_data (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, json.dumps(value)))
+
+    def delete_value(self, key):
+        self._execute("DELETE FROM bot_data WHERE key = ?", (key,))
+
+    def bump_version(self, name):
+        return self._execute("INSERT INTO cache_versions (name, version) VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET version = cache_versions.version + 1 RETURNING version", (name,), fetch="one")[0]
+
+    def get_versions(self):
+        return dict(self._execute("SELECT name, version FROM cache_versions", fetch="all"))
+
+    def get_spam(self, chat_id, user_id):
+        result = self._execute("SELECT blocked_until FROM spam_blocks WHERE chat_id = ? AND user_id = ?", (str(chat_id), str(user_id)), fetch="one")
+        return result[0] if result else 0
+
+    def set_spam(self, chat_id, user_id, blocked_until):
+        self._execute("DELETE FROM spam_blocks WHERE blocked_until < ?", (time.time(),))
+        self._execute("INSERT INTO spam_blocks (chat_id, user_id, blocked_until) VALUES (?, ?, ?) ON CONFLICT (chat_id, user_id) DO UPDATE SET blocked_until = excluded.blocked_until", (str(chat_id), str(user_id), blocked_until))
+
+    def get_score(self, user_id):
+        result = self._execute("SELECT quiz_score FROM user_data WHERE user_id = ?", (str(user_id),), fetch="one")
+        return result[0] if result else 0
+
+    def set_score(self, user_id, score, first_name=None, username=None):
+        if first_name and username:
+            self._execute("INSERT INTO user_data (user_id, quiz_score, first_name, username) VALUES (?, ?, ?, ?) ON CONFLICT (user_id) DO UPDATE SET quiz_score = excluded.quiz_score, first_name = excluded.first_name, username = excluded.username", (str(user_id), score, first_name, username))
+        else:
+            self._execute("INSERT INTO user_data (user_id, quiz_score) VALUES (?, ?) ON CONFLICT (user_id) DO UPDATE SET quiz_score = excluded.quiz_score", (str(user_id), score))
+
+    def add_score(self, user_id, delta, first_name=None, username=None, reason=None, day=None):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                old = self._conn.execute("SELECT quiz_score FROM user_data WHERE user_id = ?", (str(user_id),)).fetchone()
+                new_score = self._conn.execute("""
+                    INSERT INTO user_data (user_id, quiz_score, first_name, username) VALUES (?, MAX(0, ?), ?, ?)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        quiz_score = MAX(0, user_data.quiz_score + ?),
+                        first_name = COALESCE(excluded.first_name, user_data.first_name),
+                        username = COALESCE(excluded.username, user_data.username)
+                    RETURNING quiz_score""", (str(user_id), delta, first_name, username, delta)).fetchone()[0]
+                applied = new_score - ((old[0] or 0) if old else 0)
+                if reason and applied:
+                    self._conn.execute("INSERT INTO score_events (user_id, delta, reason, day, created_at) VALUES (?, ?, ?, ?, ?)", (str(user_id), applied, reason, day, time.time()))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return new_score
+
+    def get_leaderboard(self, page=0, per_page=10):
+        top_users = self._execute("SELECT first_name, quiz_score FROM user_data WHERE quiz_score > 0 ORDER BY quiz_score DESC LIMIT ? OFFSET ?", (per_page, page * per_page), fetch="all")
+        total_users = self._execute("SELECT COUNT(*) FROM user_data WHERE quiz_score > 0", fetch="one")[0]
+        return top_users, total_users
+
+    def get_score_and_rank(self, user_id):
+        score = self.get_score(user_id)
+        rank_result = self._execute("SELECT rank FROM (SELECT user_id, ROW_NUMBER() OVER (ORDER BY quiz_score DESC) as rank FROM user_data WHERE quiz_score > 0) WHERE user_id = ?", (str(user_id),), fetch="one")
+        return score, (rank_result[0] if rank_result else "N/A")
+
+    def register_chat(self, chat_id, title):
+        self._execute("INSERT INTO chat_data (chat_id, title, is_active, last_activity) VALUES (?, ?, 1, ?) ON CONFLICT (chat_id) DO UPDATE SET title = excluded.title, is_active = 1", (str(chat_id), title, time.time()))
+
+    def get_active_chat_ids(self, active_since=None):
+        # SQLite mein DESC order par NULL khud aakhir mein aate hain
+        if active_since is None:
+            rows = self._execute("SELECT chat_id FROM chat_data WHERE is_active ORDER BY last_activity DESC", fetch="all")
+        else:
+            rows = self._execute("SELECT chat_id FROM chat_data WHERE is_active AND last_activity >= ? ORDER BY last_activity DESC", (active_since,), fetch="all")
+        return [int(row[0]) for row in rows]
+
+    def deactivate_chat(self, chat_id):
+        self._execute("UPDATE chat_data SET is_active = 0 WHERE chat_id = ?", (str(chat_id),))
+
+    def add_message_counts(self, chat_counts, user_counts, seen_at=None, titles=None):
+        titles = titles or {}
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("""
+                    INSERT INTO chat_data (chat_id, message_count, last_activity, title) VALUES (?, ?, ?, ?) ON CONFLICT (chat_id) DO UPDATE SET
+                        message_count = COALESCE(message_count, 0) + excluded.message_count, last_activity = MAX(COALESCE(last_activity, 0), COALESCE(excluded.last_activity, 0)),
+                        title = COALESCE(excluded.title, title), is_active = is_active OR excluded.title IS NOT NULL""",
+                    [(str(c), n, seen_at, titles.get(c)) for c, n in chat_counts.items()])
+                self._conn.executemany("INSERT INTO user_data (user_id, message_count) VALUES (?, ?) ON CONFLICT (user_id) DO UPDATE SET message_count = COALESCE(message_count, 0) + excluded.message_count", [(str(u), n) for u, n in user_counts.items()])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_hustle_game(self, chat_id):
+        result = self._execute("SELECT state FROM hustle_games WHERE chat_id = ?", (str(chat_id),), fetch="one")
+        return json.loads(result[0]) if result else None
+
+    def save_hustle_game(self, chat_id, game):
+        self._execute("INSERT INTO hustle_games (chat_id, state) VALUES (?, ?) ON CONFLICT (chat_id) DO UPDATE SET state = excluded.state", (str(chat_id), json.dumps(game)))
+
+    def delete_hustle_game(self, chat_id):
+        self._execute("DELETE FROM hustle_games WHERE chat_id = ?", (str(chat_id),))
+
+    def count_hustle_games(self):
+        return self._execute("SELECT COUNT(*) FROM hustle_games WHERE json_extract(state, '$.running')", fetch="one")[0]
+
+    def get_all_chat_settings(self):
+        return {chat_id: json.loads(settings) for chat_id, settings in self._execute("SELECT chat_id, settings FROM chat_settings", fetch="all")}
+
+    def save_chat_settings(self, chat_id, settings):
+        if settings:
+            self._execute("INSERT INTO chat_settings (chat_id, settings, updated_at) VALUES (?, ?, ?) ON CONFLICT (chat_id) DO UPDATE SET settings = excluded.settings, updated_at = excluded.updated_at", (str(chat_id), json.dumps(settings), time.time()))
+        else:
+            self._execute("DELETE FROM chat_settings WHERE chat_id = ?", (str(chat_id),))
+
+    def add_quiz_poll(self, poll_id, correct_option_id):
+        self._execute("INSERT INTO quiz_polls (poll_id, correct_option_id, created_at) VALUES (?, ?, ?) ON CONFLICT (poll_id) DO NOTHING", (str(poll_id), correct_option_id, time.time()))
+
+    def get_quiz_poll(self, poll_id):
+        result = self._execute("SELECT correct_option_id, answered_users FROM quiz_polls WHERE poll_id = ?", (str(poll_id),), fetch="one")
+        return {'correct_option_id': result[0], 'answered_users': json.loads(result[1])} if result else None
+
+    def mark_poll_answered(self, poll_id, user_id):
+        with self._lock:
+            result = self._conn.execute("SELECT answered_users FROM quiz_polls WHERE poll_id = ?", (str(poll_id),)).fetchone()
+            if not result:
+                return False
+            answered = json.loads(result[0])
+            if user_id in answered:
+                return False
+            answered.append(user_id)
+            self._conn.execute("UPDATE quiz_polls SET answered_users = ? WHERE poll_id = ?", (json.dumps(answered), str(poll_id)))
+            return True
+
+    def count_quiz_polls(self):
+        return self._execute("SELECT COUNT(*) FROM quiz_polls", fetch="one")[0]
+
+    def prune_quiz_polls(self, older_than):
+        return self._execute("DELETE FROM quiz_polls WHERE created_at < ?", (older_than,))
+
+    def rollup_score_events(self, before, keep_from_day):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("""
+                    INSERT INTO score_daily (day, user_id, points)
+                    SELECT day, user_id, SUM(delta) FROM score_events WHERE created_at < ? GROUP BY day, user_id
+                    ON CONFLICT (day, user_id) DO UPDATE SET points = score_daily.points + excluded.points""", (before,))
+                rolled_up = self._conn.execute("DELETE FROM score_events WHERE created_at < ?", (before,)).rowcount
+                self._conn.execute("DELETE FROM score_daily WHERE day < ?", (keep_from_day,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rolled_up
+
+    def get_window_leaderboard(self, since_day, page=0, per_page=10):
+        top_users = self._execute("""
+            SELECT u.first_name, t.points FROM (
+                SELECT user_id, SUM(points) AS points FROM score_daily WHERE day >= ? GROUP BY user_id HAVING SUM(points) > 0
+            ) t LEFT JOIN user_data u ON u.user_id = t.user_id
+            ORDER BY t.points DESC LIMIT ? OFFSET ?""", (since_day, per_page, page * per_page), fetch="all")
+        total_users = self._execute("SELECT COUNT(*) FROM (SELECT user_id FROM score_daily WHERE day >= ? GROUP BY user_id HAVING SUM(points) > 0)", (since_day,), fetch="one")[0]
+        return top_users, total_users
+
+    def iter_table(self, table):
+        # Alag read connection: WAL mein lamba export bot ke writes (aur self._lock) ko nahi rokta
+        conn = sqlite3.connect(self.path)
+        try:
+            cur = conn.execute(f"SELECT {', '.join(BACKUP_TABLES[table])} FROM {table}")
+            while True:
+                batch = cur.fetchmany(BACKUP_BATCH_SIZE)
+                if not batch: break
+                yield from batch
+        finally:
+            conn.close()
+
+    def merge_table(self, table, rows, merge):
+        columns = list(BACKUP_TABLES[table])
+        sql = f"""
+            INSERT INTO {table} ({', '.join(columns)}) VALUES ({insert_values(table, '?' * len(columns))})
+            ON CONFLICT ({columns[0]}) DO UPDATE SET {merge_assignments(table, merge, greatest='MAX')}"""
+        count = 0
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, BACKUP_BATCH_SIZE)) # Har batch apna transaction; memory mein sirf ek batch
+            if not batch: return count
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(sql, batch)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            count += len(batch)
+
+
+def open_storage(database_url, cursor_factory=None):
+    """DATABASE_URL ke scheme se sahi backend banata hai."""
+    scheme = urlparse(database_url).scheme if database_url else ""
+    if scheme in ("postgres", "postgresql"):
+        return PostgresStorage(database_url, cursor_factory=cursor_factory)
+    if scheme == "sqlite":
+        path = database_url.split("://", 1)[1]
+        return SQLiteStorage(path[1:] if path.startswith("/") and not path.startswith("//") else path)
+    if scheme == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unsupported DATABASE_URL scheme: '{scheme}' (use postgres://, sqlite:/// or memory://)")
@@ -2,6 +2,7 @@
 
 import requests
 import random
+import functools
 import asyncio
 import time
 import html
@@ -10,26 +11,71 @@ import logging
 from telegram import Update, constants
 from telegram.ext import ContextTypes
 from db_manager import get_bot_value, set_bot_value, set_user_score, get_user_score
+import wordlist
 
 logger = logging.getLogger(__name__)
 
 HUSTLE_GAME_KEY = 'current_hustle_game'
 HUSTLE_TIMEOUT = 90 # 90 seconds to answer
+SCRAMBLE_MIN_LENGTH = 5
+SCRAMBLE_MAX_LENGTH = 10
+SCRAMBLE_ATTEMPTS = 8 # Itne shuffles mein achha scramble na mile toh rotation (hamesha alag hota hai)
+
+def anagram_key(word):
+    return "".join(sorted(word.lower()))
+
+@functools.lru_cache(maxsize=None)
+def get_anagram_index():
+    """Sorted letters -> us letters se bane saare dictionary words. Pehli call par ek baar banta hai."""
+    index = {}
+    for word in wordlist.load_all_words():
+        if SCRAMBLE_MIN_LENGTH <= len(word) <= SCRAMBLE_MAX_LENGTH:
+            index.setdefault(anagram_key(word), []).append(word.lower())
+    return {key: tuple(sorted(words)) for key, words in index.items()}
+
+@functools.lru_cache(maxsize=None)
+def get_unique_solution_words():
+    """Woh words jinka koi doosra dictionary anagram nahi - scramble ka ek hi sahi jawab hota hai."""
+    return tuple(words[0] for words in get_anagram_index().values() if len(words) == 1 and len(set(words[0])) > 1)
+
+async def ensure_anagram_index():
+    """
+    Poori dictionary ka index banne mein time lagta hai; pehli baar thread mein banao taaki event loop (baaki
+    saare updates) na ruke. Ban jaane ke baad lru_cache se turant, thread hop bhi nahi.
+    """
+    if get_unique_solution_words.cache_info().currsize == 0:
+        await asyncio.to_thread(get_unique_solution_words)
 
 def scramble_word(word):
-    """Word ko scramble karta hai."""
+    """Word ko scramble karta hai (bounded: SCRAMBLE_ATTEMPTS shuffles, phir rotation)."""
+    if len(set(word.lower())) < 2:
+        return word # Saare letters same (jaise 'aaaa') - koi alag arrangement hai hi nahi
     word_list = list(word)
-    # Ensure the scrambled word is not the same as the original (for words > 3 chars)
+    # Scramble khud original ya koi doosra valid anagram na ho (words > 3 chars)
     if len(word) > 3:
-        while True:
+        answers = get_anagram_index().get(anagram_key(word), ())
+        for _ in range(SCRAMBLE_ATTEMPTS):
             random.shuffle(word_list)
             scrambled = "".join(word_list)
-            if scrambled.lower() != word.lower():
+            if scrambled.lower() != word.lower() and scrambled.lower() not in answers:
                 return scrambled
+        return word[1:] + word[0] # Kam se kam do alag letters hain, isliye rotation original se alag hai
     else:
         random.shuffle(word_list)
         return "".join(word_list)
 
+def is_correct_guess(guess, word):
+    """Original word ya usi letters ka koi bhi dictionary word sahi jawab hai."""
+    guess = guess.lower()
+    if guess == word:
+        return True
+    return anagram_key(guess) == anagram_key(word) and guess in get_anagram_index().get(anagram_key(word), ())
+
+def pick_scramble_word():
+    """Dictionary ho toh local unique-solution word (API call nahi), warna None."""
+    words = get_unique_solution_words()
+    return random.choice(words) if words else None
+
 async def fetch_random_word():
     """API se ek random word fetch karta hai."""
     try:
@@ -57,7 +103,8 @@ async def start_hustle_game(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⏳ **Word Hustle** already running! Guess the word or wait for it to end.", parse_mode=constants.ParseMode.MARKDOWN_V2)
         return
 
-    original_word = await fetch_random_word()
+    await ensure_anagram_index()
+    original_word = pick_scramble_word() or await fetch_random_word()
     if not original_word:
         await update.message.reply_text("❌ Sorry, could not fetch a word right now. Try again later.")
         return
@@ -124,8 +171,9 @@ async def handle_hustle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE
         return # Koi active game nahi hai
         
     game_info = active_games[str(chat_id)]
+    await ensure_anagram_index() # Restart ke baad chal rahe game ka pehla guess
     
-    if guess == game_info['word']:
+    if is_correct_guess(guess, game_info['word']):
         # Sahi guess!
         
         # Game ko deactivate karo
@@ -140,7 +188,7 @@ async def handle_hustle_guess(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Confirmation message
         mention = user.mention_html()
         await update.message.reply_text(
-            f"🎉 **Correct!** {mention} unscrambled the word: **{game_info['word'].upper()}**\n\n"
+            f"🎉 **Correct!** {mention} unscrambled the word: **{guess.upper()}**\n\n"
             f"🏆 **Point earned!** Your total score is now **{new_score}**.",
             parse_mode=constants.ParseMode.HTML
         )
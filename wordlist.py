@@ -0,0 +1,38 @@
+# wordlist.py (Word Hustle ki dictionary: HUSTLE_WORDLIST file ya system dictionary se, length wise)
+#
+# File mein ek line par ek word. Sirf A-Z wale words rakhe jaate hain (upper case, unique, sorted),
+# taaki word ka index har process mein same rahe (feedback matrix isi order par bani hoti hai).
+
+import functools
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+WORDLIST_PATHS = (os.environ.get('HUSTLE_WORDLIST', ''), '/usr/share/dict/words')
+
+
+def wordlist_path():
+    """Pehli maujood dictionary file ka path, ya None."""
+    for path in WORDLIST_PATHS:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def load_all_words():
+    """Dictionary ke saare A-Z words (upper case, frozenset); file ek hi baar padhi jaati hai."""
+    path = wordlist_path()
+    if not path:
+        return frozenset()
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        words = frozenset(word for word in (line.strip().upper() for line in f) if word.isascii() and word.isalpha())
+    logger.info(f"Loaded {len(words)} words from {path}.")
+    return words
+
+
+@functools.lru_cache(maxsize=None)
+def load_words(length):
+    """`length` letters ke saare dictionary words (sorted tuple). Koi dictionary na mile toh empty tuple."""
+    return tuple(sorted(word for word in load_all_words() if len(word) == length))
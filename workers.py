@@ -0,0 +1,248 @@
+# workers.py (Multi-worker mode: ek dispatcher webhook leta hai, updates chat_id hash se worker processes mein jaate hain)
+#
+# BOT_WORKERS=4 python main.py
+#
+# - Dispatcher (parent process) PORT par Telegram ka webhook sunta hai, update ka shard key nikalta hai
+#   aur use worker ki inbox (multiprocessing.Queue) mein daal deta hai. Khud koi handler nahi chalata.
+# - Har worker ek poora Application chalata hai (updater ke bina) aur sirf apne chats ke updates paata hai,
+#   isliye per-chat state (hustle games, spam window) worker ki memory mein reh sakti hai.
+# - Quiz scheduling bhi per-chat hai (quiz_scheduler): har worker sirf apne chats ko polls bhejta hai, koi global lease nahi.
+# - Worker process mar jaaye toh dispatcher use dobara chalata hai; baar baar mare toh dispatcher exit 1 (platform restart).
+# - Redelivered update_ids dispatcher par hi drop ho jaate hain (dedup.RecentIds), workers tak nahi pahunchte.
+# - Shared caches cache_versions table ke through invalidate hote hain (main.sync_cache_versions_job).
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+from telegram import Bot, Update
+
+import dedup
+import metrics
+
+logger = logging.getLogger(__name__)
+
+WORKER_COUNT = int(os.environ.get('BOT_WORKERS', '1'))
+WORKER_QUEUE_SIZE = 1000 # Har worker ki inbox; bhar jaaye toh dispatcher 503 deta hai aur Telegram baad mein retry karta hai
+WORKER_INDEX = os.environ.get('BOT_WORKER_INDEX') # Worker process mein set hota hai
+WORKER_CHECK_INTERVAL = 5 # Itne seconds mein dispatcher workers ko zinda check karta hai (route par bhi check hota hai)
+WORKER_MAX_RESTARTS = 5 # Ek worker WORKER_RESTART_WINDOW mein isse zyada baar mare toh dispatcher hi exit (platform restart kare)
+WORKER_RESTART_WINDOW = 300
+
+_CHAT_UPDATE_FIELDS = ('message', 'edited_message', 'channel_post', 'edited_channel_post', 'my_chat_member', 'chat_member', 'chat_join_request')
+
+
+def shard_key(data):
+    """
+    Update ka routing key: chat wale updates ke liye chat_id, poll answers ke liye user_id
+    (poll answer mein chat nahi hota, aur score per-user hai).
+    """
+    for field in _CHAT_UPDATE_FIELDS:
+        if field in data:
+            return data[field]['chat']['id']
+    if 'callback_query' in data:
+        callback = data['callback_query']
+        message = callback.get('message')
+        return message['chat']['id'] if message else callback['from']['id']
+    if 'poll_answer' in data:
+        answer = data['poll_answer']
+        return (answer.get('user') or answer.get('voter_chat') or {}).get('id', 0)
+    return data.get('update_id', 0)
+
+
+def pick_worker(data, count):
+    return shard_key(data) % count
+
+
+# ======================================================================
+# --- Worker process ---
+# ======================================================================
+
+def worker_process(index, inbox):
+    """Worker process ka entry point (spawn se chalta hai, isliye main yahin import hota hai)."""
+    os.environ['BOT_WORKER_INDEX'] = str(index)
+    import main
+    try:
+        asyncio.run(_run_worker(main, index, inbox))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_worker(main, index, inbox):
+    # Shutdown dispatcher karta hai (inbox mein None bhej kar), taaki pending updates drain ho sakein
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    if main.METRICS_PORT:
+        metrics.start_metrics_server(main.METRICS_PORT + 1 + index, main.METRICS_HOST)
+    application = main.build_application(webhook=False)
+    main.mark_boot_phase('build_application')
+    loop = asyncio.get_running_loop()
+    async with application:
+        await main.post_init(application)
+        await application.start()
+        logger.info(f"Worker {index} ready.")
+        while True:
+            data = await loop.run_in_executor(None, inbox.get)
+            if data is None:
+                break
+            await application.update_queue.put(Update.de_json(data, application.bot))
+        await application.stop()
+        await main.post_shutdown(application)
+    logger.info(f"Worker {index} stopped.")
+
+
+# ======================================================================
+# --- Dispatcher (parent process) ---
+# ======================================================================
+
+class Dispatcher:
+    """Webhook POSTs leta hai aur har update ko uske shard wale worker ki inbox mein daalta hai."""
+
+    def __init__(self, token, count):
+        self.path = f"/{token}"
+        self.count = count
+        self.recent_updates = dedup.RecentIds() # Saare workers ke liye ek hi jagah dedup (ingress yahi hai)
+        self.context = multiprocessing.get_context('spawn')
+        self.inboxes = [self.context.Queue(maxsize=WORKER_QUEUE_SIZE) for _ in range(count)]
+        self.processes = [self._new_process(i) for i in range(count)]
+        self.restarts = [[] for _ in range(count)] # Har worker ke restart timestamps
+        self.failed = False # Koi worker baar baar mar raha hai; serve() band ho kar exit 1 deta hai
+        self.stop = None
+
+    def _new_process(self, index):
+        return self.context.Process(target=worker_process, args=(index, self.inboxes[index]), name=f"bot-worker-{index}", daemon=True)
+
+    def ensure_alive(self, index):
+        """
+        Worker mar gaya ho toh naya process chalata hai. Returns False agar worker baar baar mar raha hai
+        (tab dispatcher band hota hai taaki platform poora service restart kare).
+        """
+        process = self.processes[index]
+        if self.failed:
+            return False
+        if process.is_alive() or process.exitcode is None: # exitcode None = abhi start hi nahi hua
+            return True
+        now = time.time()
+        self.restarts[index] = [ts for ts in self.restarts[index] if ts > now - WORKER_RESTART_WINDOW] + [now]
+        if len(self.restarts[index]) > WORKER_MAX_RESTARTS:
+            logger.error(f"Worker {index} died {len(self.restarts[index])} times in {WORKER_RESTART_WINDOW}s (exit code {process.exitcode}), stopping dispatcher.")
+            self.failed = True
+            if self.stop: self.stop.set()
+            return False
+        logger.error(f"Worker {index} died (exit code {process.exitcode}), restarting it.")
+        metrics.WORKER_RESTARTS.inc(str(index))
+        # Nayi inbox: mara hua process purani queue ka read lock pakde reh sakta hai. Pending updates (jo lock ke bina
+        # nikal sakein) nayi inbox mein aa jaate hain.
+        old_inbox, self.inboxes[index] = self.inboxes[index], self.context.Queue(maxsize=WORKER_QUEUE_SIZE)
+        moved = 0
+        try:
+            while True:
+                self.inboxes[index].put_nowait(old_inbox.get_nowait())
+                moved += 1
+        except (queue.Empty, queue.Full):
+            pass
+        old_inbox.close()
+        if moved: logger.info(f"Moved {moved} pending updates to the restarted worker {index}.")
+        self.processes[index] = self._new_process(index)
+        self.processes[index].start()
+        return True
+
+    async def supervise(self):
+        """Bina traffic ke bhi mare hue workers restart hon."""
+        while True:
+            await asyncio.sleep(WORKER_CHECK_INTERVAL)
+            for index in range(self.count):
+                self.ensure_alive(index)
+
+    def collect_inbox_depth(self):
+        for index, inbox in enumerate(self.inboxes):
+            metrics.QUEUE_DEPTH.set(inbox.qsize(), f"worker_{index}")
+
+    def route(self, data):
+        """Returns True agar update kisi worker ki inbox mein chala gaya (ya duplicate tha aur drop hua)."""
+        if self.recent_updates.seen(data['update_id']):
+            metrics.DUPLICATE_UPDATES.inc('dispatcher')
+            return True # 200 do taaki Telegram retry band kare
+        index = pick_worker(data, self.count)
+        if not self.ensure_alive(index):
+            self.recent_updates.forget(data['update_id'])
+            metrics.DISPATCHED_UPDATES.inc(str(index), 'worker_down')
+            return False
+        try:
+            self.inboxes[index].put_nowait(data)
+        except queue.Full:
+            self.recent_updates.forget(data['update_id']) # Retry aane par dobara try ho
+            metrics.DISPATCHED_UPDATES.inc(str(index), 'rejected')
+            logger.warning(f"Worker {index} inbox full, rejecting update {data.get('update_id')} (Telegram will retry).")
+            return False
+        metrics.DISPATCHED_UPDATES.inc(str(index), 'routed')
+        return True
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if method != "POST" or path != self.path:
+                    status = b"404 Not Found"
+                else:
+                    try:
+                        status = b"200 OK" if self.route(json.loads(body)) else b"503 Service Unavailable"
+                    except (ValueError, KeyError, TypeError):
+                        status = b"400 Bad Request"
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, token, webhook_url, port, metrics_port=0, metrics_host="127.0.0.1"):
+        for process in self.processes:
+            process.start()
+        if metrics_port:
+            metrics.register_collector(self.collect_inbox_depth)
+            metrics.start_metrics_server(metrics_port, metrics_host) # Workers METRICS_PORT+1+index par
+        server = await asyncio.start_server(self._handle_connection, "0.0.0.0", port)
+        async with Bot(token) as bot:
+            await bot.set_webhook(url=webhook_url)
+        logger.info(f"Dispatcher listening on :{port}, routing to {self.count} workers.")
+
+        self.stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop.set)
+        supervisor = asyncio.create_task(self.supervise())
+        await self.stop.wait()
+        supervisor.cancel()
+
+        server.close()
+        await server.wait_closed()
+        for index, inbox in enumerate(self.inboxes):
+            if self.processes[index].is_alive():
+                inbox.put(None)
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join, 30)
+        logger.info("Dispatcher stopped.")
+        return not self.failed
+
+
+def run_dispatcher(token, webhook_url, port, metrics_port=0, metrics_host="127.0.0.1", count=WORKER_COUNT):
+    if not asyncio.run(Dispatcher(token, count).serve(token, webhook_url, port, metrics_port, metrics_host)):
+        raise SystemExit(1) # Worker baar baar crash: non-zero exit taaki platform restart kare